@@ -84,6 +84,16 @@ DATABASES = {
     )
 }
 
+# Optional throwaway database for `manage.py benchmark_quotation_queries
+# --database benchmark`; the benchmark refuses to seed the default one
+if os.getenv("BENCHMARK_DATABASE_URL"):
+    DATABASES['benchmark'] = dj_database_url.parse(os.getenv("BENCHMARK_DATABASE_URL"))
+
+# SQLite's in-memory test database cannot be shared between threads; keep it
+# on disk so the concurrency tests exercise real database locking
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,3 +146,48 @@ AUTH_USER_MODEL = 'quotes.CustomUser'
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Rendered quotation PDFs, keyed by a hash of their input and LRU-evicted
+QUOTATION_PDF_CACHE_DIR = os.path.join(BASE_DIR, 'pdf_cache')
+QUOTATION_PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Seconds before a worker re-reads which letterhead file each country uses
+# (uploads in the same worker apply at once)
+LETTERHEAD_REFRESH_SECONDS = 60
+
+# Size of the per-worker process pool that renders background PDF jobs
+QUOTATION_PDF_WORKERS = 2
+
+# Process pool size for bulk ZIP exports of quotation PDFs
+QUOTATION_EXPORT_WORKERS = 4
+
+# Concurrent ZIP exports per web worker, and the most quotations one may
+# hold (larger exports: manage.py export_quotations)
+QUOTATION_WEB_EXPORT_SLOTS = 1
+QUOTATION_WEB_EXPORT_LIMIT = 500
+
+# Rows per page on the quotation listings (keyset pagination)
+QUOTATION_PAGE_SIZE = 50
+
+# Results per page from the product type-ahead on the quotation form
+PRODUCT_SEARCH_PAGE_SIZE = 20
+
+# Results per page from the site-wide client/product/quotation search
+SEARCH_PAGE_SIZE = 20
+
+# Most create/update/delete operations accepted by one client batch request
+CLIENT_BATCH_LIMIT = 1000
+
+# Seconds a cached dashboard may live before it is recomputed
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Login IP geolocation: resolver class or factory (see quotes/geolocation.py)
+# and the background threads that run it after each login
+LOGIN_IP_RESOLVER = 'quotes.geolocation.build_default_resolver'
+LOGIN_IP_RESOLVER_WORKERS = 2
+
+# Resolved locations are reused for this long (seconds)
+LOGIN_IP_CACHE_TTL = 30 * 24 * 3600
+
+# Optional offline range file: "<cidr>,<location>" or "<first>,<last>,<location>" per line
+LOGIN_IP_CIDR_FILE = os.getenv("LOGIN_IP_CIDR_FILE") or None
+
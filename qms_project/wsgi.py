@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'qms_project.settings')
 
 application = get_wsgi_application()
+
+# Parse every country's letterhead once per worker, before the first request
+from quotes.letterheads import preload_letterheads  # noqa: E402
+
+preload_letterheads()
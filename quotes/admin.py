@@ -1,10 +1,21 @@
-from django.contrib import admin
+import tempfile
+
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .forms import ProductImportForm
+from .pricing import price_as_of, revalue_drafts
+from .product_io import export_rows, file_format, import_products, read_products, stream_csv, write_xlsx
 
 from .models import (
     CustomUser,
     LoginIP,
+    LoginDailyRollup,
     Client,
     Quotation,
     Country,
@@ -14,6 +25,7 @@ from .models import (
     QuotationCounter,
     DraftQuotation,
     ProductNew,     # ← NEW MODEL ADDED HERE
+    ProductPrice,
 )
 
 
@@ -54,10 +66,23 @@ class CustomUserAdmin(UserAdmin):
 @admin.register(LoginIP)
 class LoginIPAdmin(admin.ModelAdmin):
     list_display = ["user", "ip_address", "location", "timestamp"]
-    list_filter = ["user", "location", "timestamp"]
+    # Filtering on user/location ran a DISTINCT over the whole table on every
+    # page load; drill down by date (timestamp index) and search instead
+    list_filter = ["timestamp"]
+    date_hierarchy = "timestamp"
+    list_select_related = ["user"]
+    show_full_result_count = False
     search_fields = ["user__username", "ip_address", "location"]
 
 
+@admin.register(LoginDailyRollup)
+class LoginDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ["day", "user", "location", "logins", "first_login", "last_login"]
+    date_hierarchy = "day"
+    list_select_related = ["user"]
+    search_fields = ["user__username", "location"]
+
+
 # ============================
 # Client & Quotation
 # ============================
@@ -118,6 +143,98 @@ class ProductNewAdmin(admin.ModelAdmin):
     list_display = ("name", "pack_size", "unit_price", "unit", "country", "created_at")
     search_fields = ("name", "pack_size", "country")
     list_filter = ("country", "unit")
+    change_list_template = "admin/quotes/productnew/change_list.html"
+    actions = ["revalue_open_drafts"]
+
+    @admin.action(description="Reprice open drafts quoting the selected products")
+    def revalue_open_drafts(self, request, queryset):
+        revalued = revalue_drafts(list(queryset.values_list("id", flat=True)))
+        self.message_user(request, f"{len(revalued)} draft quotation(s) repriced.", messages.SUCCESS)
+
+    def get_urls(self):
+        return [
+            path("import/", self.admin_site.admin_view(self.import_view), name="quotes_productnew_import"),
+            path("export/", self.admin_site.admin_view(self.export_view), name="quotes_productnew_export"),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_change_permission(request) or not self.has_add_permission(request):
+            return redirect("admin:quotes_productnew_changelist")
+
+        report = None
+        form = ProductImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                report = import_products(
+                    read_products(upload, file_format(upload.name)),
+                    dry_run=form.cleaned_data["dry_run"],
+                )
+            except ValueError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, report.summary())
+
+        return TemplateResponse(request, "admin/quotes/productnew/import.html", {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import products",
+            "form": form,
+            "report": report,
+        })
+
+    def export_view(self, request):
+        try:
+            fmt = file_format("", request.GET.get("format", "csv"))
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("admin:quotes_productnew_changelist")
+
+        rows = export_rows(request.GET.get("country"))
+        if fmt == "csv":
+            response = StreamingHttpResponse(stream_csv(rows), content_type="text/csv")
+            response["Content-Disposition"] = 'attachment; filename="products.csv"'
+            return response
+
+        # XLSX has to be finished before it can be sent; spill it to disk, not memory
+        try:
+            fh = tempfile.SpooledTemporaryFile(max_size=5 * 1024 * 1024)
+            write_xlsx(rows, fh)
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("admin:quotes_productnew_changelist")
+        fh.seek(0)
+        return FileResponse(fh, as_attachment=True, filename="products.xlsx")
+
+# ============================
+# PRODUCT PRICE HISTORY
+# ============================
+@admin.register(ProductPrice)
+class ProductPriceAdmin(admin.ModelAdmin):
+    # Append-only: new (possibly future-dated) prices can be added, never edited
+    list_display = ("product", "unit_price", "effective_from", "created_by", "created_at")
+    list_select_related = ("product", "created_by")
+    search_fields = ("product__name", "product__pack_size")
+    date_hierarchy = "effective_from"
+    autocomplete_fields = ("product",)
+    exclude = ("created_by",)
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request)
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+        # Past/immediate prices show up in the catalog now; future ones wait
+        # for `manage.py revalue_drafts`
+        current = price_as_of(obj.product_id)
+        if current is not None and current != obj.product.unit_price:
+            obj.product.unit_price = current
+            obj.product.save(update_fields=["unit_price"])
 
 from django.contrib import admin
 from .models import Country
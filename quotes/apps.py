@@ -4,3 +4,17 @@ class QuotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quotes'
 
+    def ready(self):
+        # Connects the Country save/delete receivers that keep the
+        # per-country letterhead registry in sync with admin uploads
+        from . import letterheads  # noqa: F401
+        # Drops cached dashboard KPIs when a quotation changes
+        from . import dashboard  # noqa: F401
+        # Records each login's IP; the location is resolved in the background
+        from . import signals  # noqa: F401
+        # Bumps the product catalog version so every worker reloads its copy
+        from . import catalog  # noqa: F401
+        # Appends a ProductPrice row whenever a product's price changes
+        from . import pricing  # noqa: F401
+        # Keeps the client/product/quotation full-text index in step with saves
+        from . import search  # noqa: F401
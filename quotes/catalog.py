@@ -0,0 +1,166 @@
+# quotes/catalog.py
+import threading
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CacheVersion, ProductNew
+
+GLOBAL = "Global"
+
+SEARCH_PAGE_SIZE = getattr(settings, "PRODUCT_SEARCH_PAGE_SIZE", 20)
+MAX_SEARCH_PAGE_SIZE = 100
+
+CATALOG_VERSION = "product_catalog"
+
+# get_catalog() key for every product in every country; only admins see it
+ALL_PRODUCTS = "*"
+
+
+# -----------------------------------------------------
+# IN-PROCESS CATALOG
+# -----------------------------------------------------
+class CatalogProduct(NamedTuple):
+    """The fields of a ProductNew the quotation pages need, without the model overhead."""
+    id: int
+    name: str
+    description: str
+    pack_size: str
+    unit_price: Decimal
+    unit: str
+    country: str
+
+    def __str__(self):
+        return f"{self.name} - {self.pack_size}" if self.pack_size else self.name
+
+
+class Catalog:
+    """One country's products: that country plus Global, or everything for ``ALL_PRODUCTS``."""
+
+    def __init__(self, version, products):
+        self.version = version
+        self.products = products
+        self.by_id = {p.id: p for p in products}
+        self._haystacks = [
+            f"{p.name}\n{p.pack_size}\n{p.description}".lower() for p in products
+        ]
+
+    def __len__(self):
+        return len(self.products)
+
+    def search(self, query):
+        """
+        Products where every word of ``query`` appears in the name, pack size
+        or description. Names starting with the first word come first, then
+        catalog (alphabetical) order.
+        """
+        terms = (query or "").lower().split()
+        if not terms:
+            return list(self.products)
+
+        matches = [
+            p for p, haystack in zip(self.products, self._haystacks)
+            if all(term in haystack for term in terms)
+        ]
+        return sorted(matches, key=lambda p: not p.name.lower().startswith(terms[0]))
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def _load_catalog(country, version):
+    products = ProductNew.objects.all()
+    if country != ALL_PRODUCTS:
+        # A user without a country (None) matches no country, so Global only
+        products = products.filter(Q(country=country) | Q(country=GLOBAL))
+
+    rows = products.order_by("name", "id").values_list(
+        "id", "name", "description", "pack_size", "unit_price", "unit", "country"
+    )
+    return Catalog(version, [
+        CatalogProduct(pk, name, desc or "", pack or "", price, unit, product_country)
+        for pk, name, desc, pack, price, unit, product_country in rows
+    ])
+
+
+def get_catalog(country):
+    """
+    The cached catalog for ``country`` (``ALL_PRODUCTS`` for every
+    country's products). Costs one indexed read of the
+    version counter; the products are reloaded only after a ProductNew
+    save/delete (in any worker) has bumped it.
+    """
+    version = CacheVersion.current(CATALOG_VERSION)
+
+    catalog = _catalogs.get(country)
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    catalog = _load_catalog(country, version)
+    with _catalogs_lock:
+        for key in [k for k, c in _catalogs.items() if c.version != version]:
+            del _catalogs[key]
+        _catalogs[country] = catalog
+    return catalog
+
+
+def catalog_for(user):
+    """Products ``user`` may quote: all of them for admins, else their country plus Global."""
+    return get_catalog(ALL_PRODUCTS if user.role == "admin" else user.country)
+
+
+def invalidate_catalog():
+    """Tell every worker to reload; call after bulk writes that skip the signals."""
+    CacheVersion.bump(CATALOG_VERSION)
+
+
+def clear_catalog_cache():
+    """Drop this process's copies (tests)."""
+    with _catalogs_lock:
+        _catalogs.clear()
+
+
+@receiver(post_save, sender=ProductNew)
+@receiver(post_delete, sender=ProductNew)
+def product_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+# -----------------------------------------------------
+# TYPE-AHEAD SEARCH
+# -----------------------------------------------------
+def search_page(products, params):
+    """
+    One page of ``products`` per ``page``/``limit`` in ``params``. Returns
+    ``(rows, page, has_more)``.
+    """
+    try:
+        size = max(1, min(int(params.get("limit", SEARCH_PAGE_SIZE)), MAX_SEARCH_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = SEARCH_PAGE_SIZE
+    try:
+        page = max(1, int(params.get("page", 1)))
+    except (TypeError, ValueError):
+        page = 1
+
+    offset = (page - 1) * size
+    rows = products[offset:offset + size + 1]
+    return rows[:size], page, len(rows) > size
+
+
+def product_row(product):
+    """JSON shape of one product in search results."""
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description or "",
+        "pack_size": product.pack_size or "",
+        "unit_price": str(product.unit_price),
+        "unit": product.unit,
+        "country": product.country,
+    }
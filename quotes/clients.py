@@ -0,0 +1,196 @@
+# quotes/clients.py
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .dashboard import adjust_stat
+from .models import Client
+from .search import index_clients
+
+# Operations accepted in one batch request; an 800-client book fits in one
+MAX_BATCH_SIZE = getattr(settings, "CLIENT_BATCH_LIMIT", 1000)
+
+# What a batch may set; salesperson comes from the requesting user
+FIELDS = ["company_name", "contact_person", "email", "phone", "address"]
+
+
+def visible_clients(user):
+    """Clients ``user`` may see and quote: a salesperson's own, everyone's for managers and admins."""
+    if user.role == "salesperson":
+        return Client.objects.filter(salesperson=user)
+    return Client.objects.all()
+
+
+def search_clients(user, query):
+    """
+    Visible clients whose company name starts with ``query``, by name. For
+    a salesperson this is a range scan of client_sp_company_idx.
+    """
+    clients = visible_clients(user)
+    query = (query or "").strip()
+    if query:
+        clients = clients.filter(company_name__istartswith=query)
+    return clients.order_by("company_name", "id")
+
+
+def client_row(client):
+    """JSON shape of one client, contact details included."""
+    return {
+        "id": client.id,
+        "company_name": client.company_name,
+        "contact_person": client.contact_person or "",
+        "email": client.email,
+        "phone": client.phone,
+        "address": client.address,
+    }
+
+
+# -----------------------------------------------------
+# BATCH CREATE / UPDATE / DELETE
+# -----------------------------------------------------
+class ClientBatch:
+    """
+    ``{"create": [{field: value}], "update": [{"id": n, field: value}],
+    "delete": [id]}`` for one user. ``validate()`` checks every item in one
+    pass (one query for all the ids); ``apply()`` writes them in a single
+    transaction. ``results()`` has one entry per item: creates, updates,
+    then deletes, each in request order.
+    """
+
+    def __init__(self, user, payload):
+        self.user = user
+        self.payload = payload if isinstance(payload, dict) else {}
+        self.errors = {}     # (op, index) -> result
+        self.to_create, self.to_update, self.to_delete = [], [], []
+        self._updated_fields = set()
+        self._renamed = []
+        self.applied = False
+
+    def _error(self, op, index, errors, id=None):
+        self.errors[(op, index)] = {"op": op, "index": index, "id": id, "status": "error", "errors": errors}
+
+    def _fields(self, op, index, item, allowed):
+        if not isinstance(item, dict):
+            self._error(op, index, {"__all__": ["Expected an object."]})
+            return None
+        unknown = sorted(set(item) - set(allowed))
+        if unknown:
+            self._error(op, index, {name: ["Unknown field."] for name in unknown}, id=item.get("id"))
+            return None
+        return {name: item[name] for name in FIELDS if name in item}
+
+    def _clean(self, op, index, client):
+        try:
+            # No unique fields on Client, so this runs no queries
+            client.full_clean(exclude=["salesperson"])
+        except ValidationError as exc:
+            self._error(op, index, exc.message_dict, id=client.pk)
+            return False
+        return True
+
+    def _ids(self, items, key=None):
+        ids = []
+        for item in items:
+            value = item.get(key) if key and isinstance(item, dict) else item
+            if isinstance(value, int) and not isinstance(value, bool):
+                ids.append(value)
+        return ids
+
+    def validate(self):
+        creates, updates, deletes = (self.payload.get(op) or [] for op in ("create", "update", "delete"))
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            raise ValueError("create, update and delete must be lists.")
+        if len(creates) + len(updates) + len(deletes) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} operations per request.")
+
+        # 🔒 Only clients the user owns (all, for managers); others read as missing
+        owned = visible_clients(self.user).in_bulk(self._ids(updates, "id") + self._ids(deletes))
+        touched = set()
+
+        def target(op, index, pk):
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                self._error(op, index, {"id": ["A client id is required."]})
+            elif pk not in owned:
+                self._error(op, index, {"id": ["Client not found."]}, id=pk)
+            elif pk in touched:
+                self._error(op, index, {"id": ["Client appears more than once in this request."]}, id=pk)
+            else:
+                touched.add(pk)
+                return owned[pk]
+            return None
+
+        for index, item in enumerate(creates):
+            values = self._fields("create", index, item, FIELDS)
+            if values is None:
+                continue
+            client = Client(salesperson=self.user, **values)
+            if self._clean("create", index, client):
+                self.to_create.append((index, client))
+
+        for index, item in enumerate(updates):
+            values = self._fields("update", index, item, FIELDS + ["id"])
+            client = values is not None and target("update", index, item.get("id"))
+            if not client:
+                continue
+            old_name = client.company_name
+            for name, value in values.items():
+                setattr(client, name, value)
+            if self._clean("update", index, client):
+                self.to_update.append((index, client))
+                self._updated_fields.update(values)
+                if client.company_name != old_name:
+                    self._renamed.append(client)
+
+        for index, pk in enumerate(deletes):
+            client = target("delete", index, pk)
+            if client:
+                self.to_delete.append((index, client))
+
+        return not self.errors
+
+    def apply(self):
+        """Write a validated batch; every operation or none."""
+        if self.errors:
+            raise ValueError("The batch has invalid items; nothing was written.")
+        created = [client for _, client in self.to_create]
+        updated = [client for _, client in self.to_update]
+        deleted_ids = [client.pk for _, client in self.to_delete]
+
+        with transaction.atomic():
+            Client.objects.bulk_create(created)
+            if updated and self._updated_fields:
+                Client.objects.bulk_update(updated, sorted(self._updated_fields), batch_size=500)
+            if deleted_ids:
+                # Sends post_delete per client, which keeps the counters and
+                # search index right; quotations are detached with one UPDATE
+                Client.objects.filter(pk__in=deleted_ids).delete()
+
+            # bulk_create/bulk_update skip the model signals
+            adjust_stat("clients", len(created))
+            index_clients(created + updated, renamed=self._renamed)
+
+        self.applied = True
+
+    def results(self):
+        """
+        One entry per item. Items that failed carry their ``errors``; when
+        anything failed the rest were not written and read ``"skipped"``.
+        """
+        done = {"create": "created", "update": "updated", "delete": "deleted"}
+        valid = {(op, index): client for op, items in (
+            ("create", self.to_create), ("update", self.to_update), ("delete", self.to_delete),
+        ) for index, client in items}
+
+        rows = []
+        for op in ("create", "update", "delete"):
+            for index in range(len(self.payload.get(op) or [])):
+                if (op, index) in self.errors:
+                    rows.append(self.errors[(op, index)])
+                    continue
+                client = valid[(op, index)]
+                row = {"op": op, "index": index, "id": client.pk,
+                       "status": done[op] if self.applied else "skipped"}
+                if self.applied and op != "delete":
+                    row["client"] = client_row(client)
+                rows.append(row)
+        return rows
@@ -0,0 +1,290 @@
+# quotes/dashboard.py
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import CacheVersion, Client, DashboardStat, ProductNew, Quotation
+
+User = get_user_model()
+
+# Cached KPIs are keyed by a per-salesperson CacheVersion, so a change handled
+# by any worker retires every worker's copy even with a per-process (LocMem)
+# cache; the timeout only bounds how long unused entries linger
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300)
+
+TREND_MONTHS = 12
+
+
+def _salesperson_version(user_id):
+    return f"dashboard:salesperson:{user_id}"
+
+
+def _salesperson_key(user_id, version):
+    return f"dashboard:salesperson:{user_id}:v{version}"
+
+
+# -----------------------------------------------------
+# SALESPERSON KPIs
+# -----------------------------------------------------
+def _month_starts(today, months=TREND_MONTHS):
+    """First day of each of the last ``months`` months, oldest first."""
+    year, month = today.year, today.month
+    starts = []
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def compute_salesperson_stats(user, today=None):
+    quotations = Quotation.objects.filter(salesperson=user)
+
+    # One pass over the user's rows for every status count
+    counts = quotations.aggregate(
+        total=Count("id"),
+        draft=Count("id", filter=Q(status="draft")),
+        sent=Count("id", filter=Q(status="sent")),
+        approved=Count("id", filter=Q(status="approved")),
+        rejected=Count("id", filter=Q(status="rejected")),
+    )
+
+    months = _month_starts(today or date.today())
+    trend = {
+        row["month"]: row
+        for row in quotations.filter(date_created__gte=months[0])
+        .annotate(month=TruncMonth("date_created"))
+        .values("month")
+        .annotate(count=Count("id"), amount=Sum("total_amount"))
+        .order_by("month")
+    }
+
+    return {
+        **counts,
+        "monthly_labels": [m.strftime("%b %Y") for m in months],
+        "monthly_counts": [trend[m]["count"] if m in trend else 0 for m in months],
+        "monthly_amounts": [float(trend[m]["amount"] or 0) if m in trend else 0 for m in months],
+    }
+
+
+def salesperson_stats(user):
+    """
+    Cached dashboard KPIs for ``user``; see ``compute_salesperson_stats``.
+    Costs one indexed read of the user's version counter on a hit.
+    """
+    key = _salesperson_key(user.pk, CacheVersion.current(_salesperson_version(user.pk)))
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_salesperson_stats(user)
+        cache.set(key, stats, DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_salesperson_stats(user_id, using=DEFAULT_DB_ALIAS):
+    """Retire ``user_id``'s cached KPIs in every worker."""
+    # Only the default database's KPIs are cached
+    if user_id and using == DEFAULT_DB_ALIAS:
+        CacheVersion.bump(_salesperson_version(user_id))
+
+
+# -----------------------------------------------------
+# ADMIN / MANAGER SUMMARY COUNTERS
+# -----------------------------------------------------
+# Each row counts the objects that fall in one (metric, key) bucket. Saves
+# and deletes move an object between buckets; `rebuild_stats` recounts from
+# scratch (bulk_create and queryset.update() bypass the signals).
+def _quotation_buckets(status, salesperson_id, date_created):
+    return [
+        ("quotations", ""),
+        ("quotations_by_status", status or ""),
+        ("quotations_by_salesperson", str(salesperson_id or "")),
+        ("quotations_by_date", date_created.isoformat() if date_created else ""),
+    ]
+
+
+def _user_buckets(role, country):
+    buckets = [("users", ""), ("users_by_role", role or "")]
+    if role == "salesperson":
+        buckets.append(("salespersons_by_country", country or ""))
+    return buckets
+
+
+def _apply(deltas, using=DEFAULT_DB_ALIAS):
+    """Add each non-zero ``{(metric, key): delta}`` to its counter row in ``using``."""
+    deltas = {bucket: delta for bucket, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    stats = DashboardStat.objects.using(using)
+    with transaction.atomic(using=using):
+        for (metric, key), delta in deltas.items():
+            counter = stats.filter(metric=metric, key=key)
+            if counter.update(value=F("value") + delta):
+                continue
+            try:
+                # First object in this bucket; a racing insert falls back to the update
+                with transaction.atomic(using=using):
+                    stats.create(metric=metric, key=key, value=delta)
+            except IntegrityError:
+                counter.update(value=F("value") + delta)
+
+
+def adjust_stat(metric, delta, key=""):
+    """Shift one counter by ``delta``; for bulk writes that skip the signals."""
+    _apply({(metric, key): delta})
+
+
+def _move(old_buckets, new_buckets, using=DEFAULT_DB_ALIAS):
+    deltas = Counter(new_buckets)
+    deltas.subtract(Counter(old_buckets))
+    _apply(deltas, using)
+
+
+def rebuild_stats():
+    """Recount every summary counter from the source tables."""
+    rows = Counter()
+
+    rows[("users", "")] = User.objects.count()
+    for role, total in User.objects.values_list("role").annotate(total=Count("id")).order_by():
+        rows[("users_by_role", role or "")] += total
+    for country, total in (
+        User.objects.filter(role="salesperson").values_list("country").annotate(total=Count("id")).order_by()
+    ):
+        rows[("salespersons_by_country", country or "")] += total
+
+    rows[("clients", "")] = Client.objects.count()
+    rows[("products", "")] = ProductNew.objects.count()
+
+    rows[("quotations", "")] = Quotation.objects.count()
+    for field, metric in (
+        ("status", "quotations_by_status"),
+        ("salesperson", "quotations_by_salesperson"),
+        ("date_created", "quotations_by_date"),
+    ):
+        for value, total in Quotation.objects.values_list(field).annotate(total=Count("id")).order_by():
+            key = value.isoformat() if isinstance(value, date) else str(value or "")
+            rows[(metric, key)] += total
+
+    with transaction.atomic():
+        DashboardStat.objects.all().delete()
+        DashboardStat.objects.bulk_create(
+            [DashboardStat(metric=metric, key=key, value=value) for (metric, key), value in rows.items() if value],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def dashboard_stats():
+    """All summary counters as ``{metric: {key: value}}``, in one query."""
+    stats = defaultdict(dict)
+    for metric, key, value in DashboardStat.objects.filter(value__gt=0).values_list("metric", "key", "value"):
+        stats[metric][key] = value
+    return stats
+
+
+def salesperson_breakdown(stats):
+    """``[(username, total), ...]`` busiest first, from the salesperson counters."""
+    counts = stats.get("quotations_by_salesperson", {})
+    names = dict(
+        User.objects.filter(pk__in=[int(k) for k in counts if k.isdigit()]).values_list("pk", "username")
+    )
+    rows = [(names.get(int(k)) if k.isdigit() else None, total) for k, total in counts.items()]
+    return sorted(((name or "Unassigned", total) for name, total in rows), key=lambda row: -row[1])
+
+
+# -----------------------------------------------------
+# SIGNALS
+# -----------------------------------------------------
+# Counters are kept in the database the change was written to (``using``),
+# so a scratch database (see benchmark_quotation_queries) never touches them
+QUOTATION_FIELDS = ("status", "salesperson_id", "date_created")
+USER_FIELDS = ("role", "country")
+
+
+def _remember_previous(sender, instance, fields, update_fields, using):
+    # Where the row sat before this save, so post_save can move it. Saves
+    # that touch none of the bucket fields (e.g. last_login) are skipped.
+    instance._dashboard_skip = update_fields is not None and not (
+        {f.removesuffix("_id") for f in fields} & set(update_fields)
+    )
+    instance._dashboard_previous = (
+        sender.objects.using(using).filter(pk=instance.pk).values_list(*fields).first()
+        if instance.pk and not instance._dashboard_skip else None
+    )
+
+
+@receiver(pre_save, sender=Quotation)
+def quotation_before_save(sender, instance, update_fields=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    _remember_previous(sender, instance, QUOTATION_FIELDS, update_fields, using)
+
+
+@receiver(post_save, sender=Quotation)
+def quotation_saved(sender, instance, created, using=DEFAULT_DB_ALIAS, **kwargs):
+    previous = getattr(instance, "_dashboard_previous", None)
+    if not getattr(instance, "_dashboard_skip", False):
+        _move(
+            _quotation_buckets(*previous) if previous else [],
+            _quotation_buckets(instance.status, instance.salesperson_id, instance.date_created),
+            using,
+        )
+
+    # Status changes (send/approve/reject) and edits both move the numbers
+    invalidate_salesperson_stats(instance.salesperson_id, using)
+    if previous and previous[1] != instance.salesperson_id:
+        invalidate_salesperson_stats(previous[1], using)
+
+
+@receiver(post_delete, sender=Quotation)
+def quotation_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    _move(_quotation_buckets(instance.status, instance.salesperson_id, instance.date_created), [], using)
+    invalidate_salesperson_stats(instance.salesperson_id, using)
+
+
+@receiver(pre_save, sender=User)
+def user_before_save(sender, instance, update_fields=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    _remember_previous(sender, instance, USER_FIELDS, update_fields, using)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, using=DEFAULT_DB_ALIAS, **kwargs):
+    previous = getattr(instance, "_dashboard_previous", None)
+    if getattr(instance, "_dashboard_skip", False):
+        return
+    _move(
+        _user_buckets(*previous) if previous else [],
+        _user_buckets(instance.role, instance.country),
+        using,
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    _move(_user_buckets(instance.role, instance.country), [], using)
+
+    # SET_NULL detached their quotations with a plain UPDATE (no signals)
+    key = ("quotations_by_salesperson", str(instance.pk))
+    orphaned = (
+        DashboardStat.objects.using(using).filter(metric=key[0], key=key[1]).values_list("value", flat=True).first()
+    )
+    if orphaned:
+        _apply({key: -orphaned, ("quotations_by_salesperson", ""): orphaned}, using)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=ProductNew)
+def counted_object_saved(sender, instance, created, using=DEFAULT_DB_ALIAS, **kwargs):
+    if created:
+        _apply({("clients" if sender is Client else "products", ""): 1}, using)
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=ProductNew)
+def counted_object_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    _apply({("clients" if sender is Client else "products", ""): -1}, using)
@@ -40,3 +40,8 @@ class QuotationForm(forms.ModelForm):
             'terms_text',
             'valid_until',
         ]
+
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX with columns name, unit_price, pack_size, country, description, unit")
+    dry_run = forms.BooleanField(required=False, initial=True, label="Dry run (only report the changes)")
@@ -0,0 +1,376 @@
+# quotes/geolocation.py
+import bisect
+import ipaddress
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import IPLocation, LoginIP
+
+logger = logging.getLogger(__name__)
+
+PENDING = "Pending"
+UNKNOWN = "Unknown"
+LOCALHOST = "Localhost, Development"
+
+RESOLVER_WORKERS = getattr(settings, "LOGIN_IP_RESOLVER_WORKERS", 2)
+CACHE_TTL = timedelta(seconds=getattr(settings, "LOGIN_IP_CACHE_TTL", 30 * 24 * 3600))
+CIDR_FILE = getattr(settings, "LOGIN_IP_CIDR_FILE", None)
+
+
+# -----------------------------------------------------
+# RESOLVERS
+# -----------------------------------------------------
+class LocationResolver:
+    """
+    Turns an IP address into a display location such as "Muscat, Oman".
+    Return ``None`` when the address cannot be resolved.
+    """
+
+    def resolve(self, ip):
+        raise NotImplementedError
+
+    def resolve_many(self, ips):
+        """``{ip: location}`` for the addresses that could be resolved."""
+        found = {}
+        for ip in ips:
+            location = self.resolve(ip)
+            if location:
+                found[ip] = location
+        return found
+
+
+class IpApiResolver(LocationResolver):
+    """ip-api.com JSON endpoint (the original lookup)."""
+
+    url = "http://ip-api.com/json/{ip}"
+    batch_url = "http://ip-api.com/batch?fields=status,country,city,query"
+    batch_size = 100   # ip-api's per-request maximum
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    @staticmethod
+    def _location(data):
+        if data.get("status") != "success":
+            return None
+        country = data.get("country", "")
+        city = data.get("city", "")
+        return f"{city}, {country}" if city else country
+
+    def resolve(self, ip):
+        try:
+            response = requests.get(self.url.format(ip=ip), timeout=self.timeout)
+            data = response.json()
+        except (requests.RequestException, ValueError):
+            return None
+
+        return self._location(data)
+
+    def resolve_many(self, ips):
+        """One POST to the batch endpoint per 100 addresses."""
+        found = {}
+        ips = list(ips)
+        for start in range(0, len(ips), self.batch_size):
+            chunk = ips[start:start + self.batch_size]
+            try:
+                response = requests.post(self.batch_url, json=chunk, timeout=self.timeout)
+                response.raise_for_status()
+                results = response.json()
+            except (requests.RequestException, ValueError):
+                logger.warning("ip-api batch lookup failed for %s address(es)", len(chunk))
+                continue
+            for data in results:
+                location = self._location(data)
+                if location:
+                    found[data.get("query")] = location
+        return found
+
+
+class StaticResolver(LocationResolver):
+    """Fixed IP -> location table; a local stand-in for tests and offline use."""
+
+    def __init__(self, locations=None, default=None):
+        self.locations = dict(locations or {})
+        self.default = default
+
+    def resolve(self, ip):
+        return self.locations.get(ip, self.default)
+
+
+class CidrFileResolver(LocationResolver):
+    """
+    Offline lookups against a local range file. Each line is either
+    ``<cidr>,<location>`` or ``<first ip>,<last ip>,<location>``; blank lines
+    and ``#`` comments are skipped. Ranges must not overlap. The file is
+    loaded once into sorted arrays and searched with ``bisect``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        ranges = {4: [], 6: []}
+
+        with open(path, encoding="utf-8") as fh:
+            for line_no, line in enumerate(fh, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    first, last, location = self._parse(line)
+                except ValueError:
+                    logger.warning("Skipping bad line %s in %s: %r", line_no, path, line)
+                    continue
+                ranges[first.version].append((int(first), int(last), location))
+
+        self._tables = {}
+        for version, rows in ranges.items():
+            rows.sort()
+            self._tables[version] = (
+                [row[0] for row in rows],
+                [row[1] for row in rows],
+                [row[2] for row in rows],
+            )
+
+    @staticmethod
+    def _parse(line):
+        first, rest = (part.strip() for part in line.split(",", 1))
+        if "/" in first:
+            network = ipaddress.ip_network(first, strict=False)
+            return network.network_address, network.broadcast_address, rest
+
+        last, location = (part.strip() for part in rest.split(",", 1))
+        first, last = ipaddress.ip_address(first), ipaddress.ip_address(last)
+        if first.version != last.version or last < first:
+            raise ValueError(line)
+        return first, last, location
+
+    def __len__(self):
+        return sum(len(starts) for starts, _ends, _locations in self._tables.values())
+
+    def resolve(self, ip):
+        address = ipaddress.ip_address(ip)
+        starts, ends, locations = self._tables[address.version]
+        value = int(address)
+
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return locations[i]
+        return None
+
+
+class ChainResolver(LocationResolver):
+    """Ask each resolver in turn; the first answer wins."""
+
+    def __init__(self, resolvers):
+        self.resolvers = list(resolvers)
+
+    def resolve(self, ip):
+        for resolver in self.resolvers:
+            location = resolver.resolve(ip)
+            if location:
+                return location
+        return None
+
+    def resolve_many(self, ips):
+        found = {}
+        remaining = list(ips)
+        for resolver in self.resolvers:
+            if not remaining:
+                break
+            found.update(resolver.resolve_many(remaining))
+            remaining = [ip for ip in remaining if ip not in found]
+        return found
+
+
+class CachedResolver(LocationResolver):
+    """
+    Persistent IP -> location cache (the IPLocation table) in front of
+    another resolver, plus an in-process memo so repeat logins from the same
+    office never touch the database or the network. Entries expire after
+    ``ttl``. Failed lookups are not cached, so they are retried.
+    """
+
+    MEMO_SIZE = 4096
+
+    def __init__(self, resolver, ttl=CACHE_TTL):
+        self.resolver = resolver
+        self.ttl = ttl
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def _remember(self, ip, location, resolved_at):
+        with self._memo_lock:
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            self._memo[ip] = (location, resolved_at + self.ttl)
+
+    def resolve(self, ip):
+        now = timezone.now()
+
+        hit = self._memo.get(ip)
+        if hit and hit[1] > now:
+            return hit[0]
+
+        try:
+            row = IPLocation.objects.filter(ip_address=ip, resolved_at__gt=now - self.ttl).first()
+        except DatabaseError:
+            row = None
+        if row:
+            self._remember(ip, row.location, row.resolved_at)
+            return row.location
+
+        location = self.resolver.resolve(ip)
+        if location:
+            try:
+                IPLocation.objects.update_or_create(
+                    ip_address=ip, defaults={"location": location, "resolved_at": now}
+                )
+            except DatabaseError:
+                logger.exception("Could not cache location for %s", ip)
+            self._remember(ip, location, now)
+        return location
+
+    def resolve_many(self, ips):
+        now = timezone.now()
+        ips = list(dict.fromkeys(ips))
+
+        found = dict(
+            IPLocation.objects.filter(ip_address__in=ips, resolved_at__gt=now - self.ttl)
+            .values_list("ip_address", "location")
+        )
+        fresh = self.resolver.resolve_many([ip for ip in ips if ip not in found])
+
+        if fresh:
+            cached = set(IPLocation.objects.filter(ip_address__in=fresh).values_list("ip_address", flat=True))
+            IPLocation.objects.bulk_create([
+                IPLocation(ip_address=ip, location=location, resolved_at=now)
+                for ip, location in fresh.items() if ip not in cached
+            ], ignore_conflicts=True)
+            stale = list(IPLocation.objects.filter(ip_address__in=cached).only("id", "ip_address"))
+            for row in stale:
+                row.location, row.resolved_at = fresh[row.ip_address], now
+            IPLocation.objects.bulk_update(stale, ["location", "resolved_at"])
+
+        found.update(fresh)
+        for ip, location in found.items():
+            self._remember(ip, location, now)
+        return found
+
+
+def build_default_resolver():
+    """Cached lookups; the offline range file (if configured) before ip-api."""
+    resolvers = []
+    if CIDR_FILE:
+        try:
+            resolvers.append(CidrFileResolver(CIDR_FILE))
+        except OSError:
+            logger.exception("Could not load LOGIN_IP_CIDR_FILE %s", CIDR_FILE)
+    resolvers.append(IpApiResolver())
+    return CachedResolver(ChainResolver(resolvers))
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """The resolver built by ``LOGIN_IP_RESOLVER`` (dotted path to a class or factory)."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            path = getattr(settings, "LOGIN_IP_RESOLVER", "quotes.geolocation.build_default_resolver")
+            _resolver = import_string(path)()
+        return _resolver
+
+
+def set_resolver(resolver):
+    """Swap the active resolver (tests, management commands); ``None`` resets."""
+    global _resolver
+    with _resolver_lock:
+        _resolver = resolver
+
+
+def resolve_location(ip):
+    try:
+        if ipaddress.ip_address(ip).is_loopback:
+            return LOCALHOST
+    except ValueError:
+        return UNKNOWN
+
+    try:
+        return get_resolver().resolve(ip) or UNKNOWN
+    except Exception:
+        logger.exception("Location lookup failed for %s", ip)
+        return UNKNOWN
+
+
+def resolve_locations(ips, resolver=None):
+    """
+    Batch form of ``resolve_location``: ``{ip: location}`` for every address,
+    ``UNKNOWN`` where nothing could be found.
+    """
+    resolver = resolver or get_resolver()
+    result, lookup = {}, []
+    for ip in dict.fromkeys(ips):
+        try:
+            result[ip] = LOCALHOST if ipaddress.ip_address(ip).is_loopback else None
+        except ValueError:
+            result[ip] = UNKNOWN
+        if result[ip] is None:
+            lookup.append(ip)
+
+    try:
+        found = resolver.resolve_many(lookup) if lookup else {}
+    except Exception:
+        logger.exception("Batch location lookup failed")
+        found = {}
+
+    for ip in lookup:
+        result[ip] = found.get(ip) or UNKNOWN
+    return result
+
+
+# -----------------------------------------------------
+# BACKGROUND RESOLUTION
+# -----------------------------------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RESOLVER_WORKERS, thread_name_prefix="login-ip")
+        return _executor
+
+
+def resolve_and_store(login_ip_id, ip):
+    location = resolve_location(ip)
+    # Only fill rows that are still pending; a backfill may have got there first
+    LoginIP.objects.filter(pk=login_ip_id, location=PENDING).update(location=location)
+    return location
+
+
+def _resolve_in_background(login_ip_id, ip):
+    try:
+        resolve_and_store(login_ip_id, ip)
+    except Exception:
+        logger.exception("Could not store location for login %s", login_ip_id)
+    finally:
+        # Runs on a pool thread, which owns its own connection
+        connection.close()
+
+
+def schedule_resolution(login_ip):
+    """Resolve ``login_ip``'s location off the request thread, after commit."""
+    transaction.on_commit(
+        lambda: _get_executor().submit(_resolve_in_background, login_ip.pk, login_ip.ip_address)
+    )
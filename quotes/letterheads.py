@@ -0,0 +1,131 @@
+# quotes/letterheads.py
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Country
+from .pdf_generator import Letterhead, get_letterhead
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a worker re-reads which file each country uses, so
+# uploads handled by another worker are picked up without a query per PDF
+REFRESH_SECONDS = getattr(settings, "LETTERHEAD_REFRESH_SECONDS", 60)
+
+
+# -----------------------------------------------------
+# PER-COUNTRY LETTERHEAD REGISTRY
+# -----------------------------------------------------
+# (country name, storage name) -> parsed Letterhead, or None if the upload
+# could not be parsed. CountryAdmin always stores an upload under a new
+# name, so the pair identifies one version of one country's letterhead.
+_registry = {}
+# Country name -> storage name of its current upload
+_files = {}
+_files_loaded_at = None
+_registry_lock = threading.Lock()
+
+
+def parse_upload(file_name):
+    """Parse an uploaded Country.letterhead file by its storage name."""
+    storage = Country._meta.get_field("letterhead").storage
+    with storage.open(file_name, "rb") as fh:
+        return Letterhead(fh, file_name)
+
+
+def _load(country_name, file_name):
+    try:
+        letterhead = parse_upload(file_name)
+    except Exception:
+        logger.exception("Could not load letterhead %s for %s", file_name, country_name)
+        letterhead = None
+
+    with _registry_lock:
+        for key in [key for key in _registry if key[0] == country_name]:
+            del _registry[key]
+        _registry[(country_name, file_name)] = letterhead
+    return letterhead
+
+
+def _refresh_files():
+    global _files, _files_loaded_at
+    try:
+        files = dict(
+            Country.objects.exclude(letterhead="")
+            .exclude(letterhead__isnull=True)
+            .values_list("name", "letterhead")
+        )
+    except DatabaseError:
+        # Fresh deployment before `migrate`; try again on the next refresh
+        files = {}
+
+    with _registry_lock:
+        _files = files
+        _files_loaded_at = time.monotonic()
+    return files
+
+
+def letterhead_file_for_country(country_name):
+    """Storage name of the country's uploaded letterhead, or "" for the default."""
+    files = _files
+    if _files_loaded_at is None or time.monotonic() - _files_loaded_at >= REFRESH_SECONDS:
+        files = _refresh_files()
+    return files.get(country_name) or ""
+
+
+def letterhead_for_country(country_name):
+    """
+    Return the parsed letterhead for a quotation's ``country``, falling back
+    to the default GIC letterhead when the country has no usable upload.
+    """
+    file_name = letterhead_file_for_country(country_name)
+    if not file_name:
+        return get_letterhead()
+
+    key = (country_name, file_name)
+    if key in _registry:
+        letterhead = _registry[key]
+    else:
+        letterhead = _load(country_name, file_name)
+    return letterhead or get_letterhead()
+
+
+def preload_letterheads():
+    """Parse every uploaded country letterhead up front (run once per worker)."""
+    get_letterhead()
+    for name, file_name in _refresh_files().items():
+        _load(name, file_name)
+
+
+def invalidate_letterhead(country_name):
+    with _registry_lock:
+        _files.pop(country_name, None)
+        for key in [key for key in _registry if key[0] == country_name]:
+            del _registry[key]
+
+
+def clear_letterhead_registry():
+    global _files_loaded_at
+    with _registry_lock:
+        _registry.clear()
+        _files.clear()
+        _files_loaded_at = None
+
+
+@receiver(post_save, sender=Country)
+def reload_country_letterhead(sender, instance, **kwargs):
+    invalidate_letterhead(instance.name)
+    if instance.letterhead:
+        with _registry_lock:
+            _files[instance.name] = instance.letterhead.name
+        _load(instance.name, instance.letterhead.name)
+
+
+@receiver(post_delete, sender=Country)
+def drop_country_letterhead(sender, instance, **kwargs):
+    invalidate_letterhead(instance.name)
@@ -0,0 +1,108 @@
+# quotes/listing.py
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+PAGE_SIZE = getattr(settings, "QUOTATION_PAGE_SIZE", 50)
+MAX_PAGE_SIZE = 200
+
+FILTER_FIELDS = ("status", "salesperson", "client", "date_from", "date_to")
+
+
+# -----------------------------------------------------
+# SERVER-SIDE FILTERS
+# -----------------------------------------------------
+def filter_quotations(quotations, params):
+    """
+    Apply the listing filters from ``params`` (a QueryDict). Unparseable
+    values are ignored rather than failing the page. Returns the filtered
+    queryset and the filters that were applied.
+    """
+    applied = {}
+
+    status = params.get("status")
+    if status:
+        quotations = quotations.filter(status=status)
+        applied["status"] = status
+
+    salesperson = params.get("salesperson")
+    if salesperson:
+        quotations = quotations.filter(salesperson__username=salesperson)
+        applied["salesperson"] = salesperson
+
+    client = params.get("client")
+    if client and client.isdigit():
+        quotations = quotations.filter(client_id=int(client))
+        applied["client"] = client
+
+    for name, lookup in (("date_from", "date_created__gte"), ("date_to", "date_created__lte")):
+        try:
+            value = parse_date(params.get(name) or "")
+        except ValueError:
+            value = None
+        if value:
+            quotations = quotations.filter(**{lookup: value})
+            applied[name] = value.isoformat()
+
+    return quotations, applied
+
+
+# -----------------------------------------------------
+# KEYSET (CURSOR) PAGINATION ON (date_created, id)
+# -----------------------------------------------------
+def encode_cursor(quotation):
+    return f"{quotation.date_created.isoformat()}_{quotation.id}"
+
+
+def decode_cursor(cursor):
+    """Return ``(date, id)`` for a cursor, or ``None`` when it is malformed."""
+    try:
+        day, pk = cursor.split("_", 1)
+        day = parse_date(day)
+        return (day, int(pk)) if day else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def keyset_page(quotations, cursor=None, size=PAGE_SIZE):
+    """
+    Newest-first page of ``quotations`` that follows ``cursor``. Returns
+    ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    Each page is an index range scan, however deep the reader scrolls.
+    """
+    quotations = quotations.order_by("-date_created", "-id")
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        day, pk = position
+        quotations = quotations.filter(
+            Q(date_created__lt=day) | Q(date_created=day, id__lt=pk)
+        )
+
+    rows = list(quotations[:size + 1])
+    if len(rows) > size:
+        rows = rows[:size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def page_size(params):
+    try:
+        return max(1, min(int(params.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+
+
+def quotation_row(quotation):
+    """JSON shape of one listing row (infinite scroll)."""
+    client = quotation.client
+    return {
+        "id": quotation.id,
+        "client": client.company_name if client else None,
+        "client_id": quotation.client_id,
+        "salesperson": quotation.salesperson_username,
+        "date_created": quotation.date_created.isoformat(),
+        "total_amount": str(quotation.total_amount),
+        "currency": quotation.currency,
+        "status": quotation.status,
+    }
@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from quotes.geolocation import PENDING, UNKNOWN, get_resolver, resolve_locations
+from quotes.models import LoginIP
+
+
+class RateLimiter:
+    """Allow at most ``per_minute`` calls per minute across all threads."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        time.sleep(max(0, slot - now))
+
+
+class Command(BaseCommand):
+    help = (
+        "Resolve LoginIP rows whose location is Unknown (or stuck Pending). "
+        "Works through distinct IPs in batches; each batch is committed, so an "
+        "interrupted run can simply be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Distinct IPs per lookup (ip-api's batch endpoint takes 100)")
+        parser.add_argument("--workers", type=int, default=2, help="Concurrent lookups")
+        parser.add_argument("--rate", type=float, default=15,
+                            help="Max lookups per minute across workers (ip-api free tier: 15 batch requests); 0 = unlimited")
+        parser.add_argument("--resolver", help="Dotted path to a resolver class/factory (default LOGIN_IP_RESOLVER)")
+        parser.add_argument("--pending-minutes", type=int, default=10,
+                            help="Treat Pending rows older than this as stuck")
+        parser.add_argument("--limit", type=int, help="Stop after this many distinct IPs")
+        parser.add_argument("--dry-run", action="store_true", help="Resolve and report, but do not update rows")
+
+    def unresolved(self, pending_minutes):
+        stuck_before = timezone.now() - timedelta(minutes=pending_minutes)
+        return LoginIP.objects.filter(
+            Q(location__in=[UNKNOWN, ""]) | Q(location=PENDING, timestamp__lt=stuck_before)
+        )
+
+    def ip_batches(self, rows, batch_size, limit):
+        # Keyset over the distinct addresses so every query stays small
+        last, seen = None, 0
+        while limit is None or seen < limit:
+            ips = rows.order_by("ip_address").values_list("ip_address", flat=True).distinct()
+            if last is not None:
+                ips = ips.filter(ip_address__gt=last)
+            size = batch_size if limit is None else min(batch_size, limit - seen)
+            batch = list(ips[:size])
+            if not batch:
+                return
+            last = batch[-1]
+            seen += len(batch)
+            yield batch
+
+    def handle(self, *args, **options):
+        resolver = import_string(options["resolver"])() if options["resolver"] else get_resolver()
+        limiter = RateLimiter(options["rate"])
+        rows = self.unresolved(options["pending_minutes"])
+        pending_minutes = options["pending_minutes"]
+
+        totals = {"ips": 0, "resolved": 0, "rows": 0}
+        totals_lock = threading.Lock()
+
+        def process(batch):
+            try:
+                limiter.wait()
+                locations = resolve_locations(batch, resolver)
+                resolved = {ip: loc for ip, loc in locations.items() if loc != UNKNOWN}
+
+                # One UPDATE per distinct location in the batch
+                by_location = {}
+                for ip, location in resolved.items():
+                    by_location.setdefault(location, []).append(ip)
+
+                updated = 0
+                for location, ips in by_location.items():
+                    matching = self.unresolved(pending_minutes).filter(ip_address__in=ips)
+                    updated += matching.count() if options["dry_run"] else matching.update(location=location)
+
+                with totals_lock:
+                    totals["ips"] += len(batch)
+                    totals["resolved"] += len(resolved)
+                    totals["rows"] += updated
+                    self.stdout.write(
+                        f"  {totals['ips']} IPs looked up, {totals['resolved']} resolved, {totals['rows']} rows updated"
+                    )
+            finally:
+                connection.close()
+
+        batches = self.ip_batches(rows, options["batch_size"], options["limit"])
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            # Keep only a couple of batches queued so memory stays flat on big tables
+            in_flight = []
+            for batch in batches:
+                in_flight.append(pool.submit(process, batch))
+                if len(in_flight) >= options["workers"] * 2:
+                    in_flight.pop(0).result()
+            for future in in_flight:
+                future.result()
+
+        verb = "would update" if options["dry_run"] else "updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['resolved']}/{totals['ips']} IPs resolved, {verb} {totals['rows']} row(s)."
+        ))
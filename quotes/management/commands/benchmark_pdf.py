@@ -0,0 +1,97 @@
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PyPDF2 import PdfReader, PdfWriter, PageObject
+
+from quotes.pdf_generator import (
+    LETTERHEAD_PATH, build_quotation_content, clear_letterhead_cache, generate_quotation_pdf, get_letterhead,
+    stamp_letterhead,
+)
+
+
+def sample_quotation(lines):
+    return {
+        "date": "01-01-2025",
+        "qtn_no": "QTN-BENCH",
+        "client_company": "Benchmark Trading LLC",
+        "client_email": "purchasing@example.com",
+        "client_name": "Procurement Team",
+        "client_phone": "+968 2444 6800",
+        "products": [
+            {
+                "name": f"Product {i}",
+                "desc": "Industrial grade, drum packed",
+                "pack_size": "200L",
+                "unit_price": 12.5 + i,
+                "qty": 1 + i % 7,
+            }
+            for i in range(lines)
+        ],
+        "salesperson": "benchmark",
+        "validity": "30 days",
+        "delivery": "Ex-Rusayl",
+        "payment_terms": "30 days LPO",
+    }
+
+
+def render_uncached(data):
+    """The original render path: parse the letterhead and merge it into every page."""
+    content_pdf = PdfReader(build_quotation_content(data))
+    letterhead_pdf = PdfReader(LETTERHEAD_PATH)
+
+    output = PdfWriter()
+    for page in content_pdf.pages:
+        merged_page = PageObject.create_blank_page(
+            width=letterhead_pdf.pages[0].mediabox.width,
+            height=letterhead_pdf.pages[0].mediabox.height
+        )
+        merged_page.merge_page(letterhead_pdf.pages[0])
+        merged_page.merge_page(page)
+        output.add_page(merged_page)
+
+    final_buffer = BytesIO()
+    output.write(final_buffer)
+    final_buffer.seek(0)
+    return final_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time quotation PDF rendering: the original merge reading the letterhead "
+        "file, the same merge from the cached file (single_pass=False), the "
+        "cached two-pass XObject stamp and the single-pass ReportLab page template."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[1, 5, 50])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _time(self, render, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pdf = render(data)
+            timings.append(time.perf_counter() - start)
+        return min(timings), sum(timings) / len(timings), len(pdf.getvalue())
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+
+        # Warm the cache once so the cached modes measure steady-state renders
+        clear_letterhead_cache()
+        generate_quotation_pdf(sample_quotation(1))
+
+        self.stdout.write(f"{'lines':>6} {'mode':>9} {'best ms':>9} {'mean ms':>9} {'bytes':>9}")
+        for lines in options["lines"]:
+            data = sample_quotation(lines)
+            for mode, render in (
+                ("uncached", render_uncached),
+                ("merge", lambda d: generate_quotation_pdf(d, single_pass=False)),
+                ("stamp", lambda d: stamp_letterhead(build_quotation_content(d), get_letterhead())),
+                ("single", generate_quotation_pdf),
+            ):
+                best, mean, size = self._time(render, data, repeat)
+                self.stdout.write(
+                    f"{lines:>6} {mode:>9} {best * 1000:>9.1f} {mean * 1000:>9.1f} {size:>9}"
+                )
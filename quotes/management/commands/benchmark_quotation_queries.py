@@ -0,0 +1,190 @@
+"""
+EXPLAIN-based check that the hot Quotation queries use the composite indexes.
+
+It only runs against a scratch database configured as a separate alias
+(``BENCHMARK_DATABASE_URL`` in settings) and refuses the default one:
+
+    export BENCHMARK_DATABASE_URL=sqlite:////tmp/qms-bench.sqlite3
+    python manage.py migrate --database benchmark
+    python manage.py benchmark_quotation_queries --database benchmark
+
+It seeds ``--rows`` quotations (100k by default) spread over two years,
+fifty salesperson accounts and every status, then prints each query's
+plan, the index it used and its median time. Seeded rows are deleted
+afterwards unless ``--keep`` is given.
+"""
+import random
+import re
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from django.db.models.signals import post_delete
+from django.core.management.base import BaseCommand, CommandError
+
+from quotes import dashboard, search
+from quotes.listing import keyset_page
+from quotes.models import CustomUser, Quotation
+
+BENCH_PREFIX = "bench_sp_"
+STATUSES = ["draft", "sent", "approved", "rejected"]
+# SQLite: "USING [COVERING] INDEX name"; PostgreSQL: "Index [Only] Scan [Backward] using name"
+INDEX_IN_PLAN = re.compile(r"(?:INDEX|Index (?:Only )?Scan (?:Backward )?using) (\w+)")
+
+
+def scratch_database(alias):
+    """Validate ``alias`` as a scratch database: configured, and not the default one."""
+    if alias not in settings.DATABASES:
+        raise CommandError(f"Unknown database '{alias}'; set BENCHMARK_DATABASE_URL and pass --database benchmark.")
+
+    def identity(config):
+        return tuple(config.get(key) for key in ("ENGINE", "NAME", "HOST", "PORT"))
+
+    if alias == DEFAULT_DB_ALIAS or identity(settings.DATABASES[alias]) == identity(settings.DATABASES[DEFAULT_DB_ALIAS]):
+        raise CommandError("Refusing to seed the default database; point --database at a scratch one.")
+    return alias
+
+
+def seed(rows, using, salespeople=50, batch_size=5000):
+    rng = random.Random(42)
+    today = date.today()
+
+    CustomUser.objects.using(using).bulk_create([
+        CustomUser(username=f"{BENCH_PREFIX}{i}", role="salesperson", country="Oman")
+        for i in range(salespeople)
+    ])
+    users = list(CustomUser.objects.using(using).filter(username__startswith=BENCH_PREFIX))
+
+    for start in range(0, rows, batch_size):
+        batch = [
+            Quotation(
+                salesperson=rng.choice(users),
+                status=rng.choice(STATUSES),
+                country="Oman",
+                total_amount=rng.randrange(10, 50000),
+            )
+            for _ in range(min(batch_size, rows - start))
+        ]
+        Quotation.objects.using(using).bulk_create(batch)
+
+    # auto_now_add ignores explicit values; spread the dates afterwards
+    quotations = Quotation.objects.using(using)
+    ids = list(
+        quotations.filter(salesperson__username__startswith=BENCH_PREFIX).values_list("id", flat=True)
+    )
+    for days_ago in range(0, 730, 7):
+        chunk = ids[days_ago * len(ids) // 730:(days_ago + 7) * len(ids) // 730]
+        quotations.filter(id__in=chunk).update(date_created=today - timedelta(days=days_ago))
+
+
+# Seeding bypasses these (bulk_create), so the cleanup does too: per row they
+# would cost several queries, and with no listeners left delete() runs in bulk
+CLEANUP_MUTED = [
+    (post_delete, Quotation, dashboard.quotation_deleted),
+    (post_delete, Quotation, search.object_deleted),
+    (post_delete, CustomUser, dashboard.user_deleted),
+]
+
+
+@contextmanager
+def disconnected(receivers):
+    for signal, sender, handler in receivers:
+        signal.disconnect(handler, sender=sender)
+    try:
+        yield
+    finally:
+        for signal, sender, handler in receivers:
+            signal.connect(handler, sender=sender)
+
+
+def cleanup(using):
+    """Delete the seeded rows from the scratch database ``using``."""
+    users = CustomUser.objects.using(using).filter(username__startswith=BENCH_PREFIX)
+    with disconnected(CLEANUP_MUTED):
+        Quotation.objects.using(using).filter(salesperson__in=users).delete()
+        users.delete()
+
+
+def hot_queries(using):
+    """The Quotation access paths behind the busiest pages."""
+    quotations = Quotation.objects.using(using)
+    salesperson = CustomUser.objects.using(using).get(username=f"{BENCH_PREFIX}7")
+    return [
+        ("draft_list",
+         lambda: quotations.filter(status="draft", salesperson=salesperson).order_by("-date_created")),
+        ("my_quotations (salesperson, page 1)",
+         lambda: quotations.filter(salesperson=salesperson).order_by("-date_created", "-id")[:51]),
+        ("all_quotations (status filter, page 1)",
+         lambda: quotations.filter(status="sent").order_by("-date_created", "-id")[:51]),
+        ("admin_quotations (unfiltered, page 1)",
+         lambda: quotations.order_by("-date_created", "-id")[:51]),
+        ("salesperson_dashboard status counts",
+         lambda: quotations.filter(salesperson=salesperson).values("status").annotate(total=Count("id")).order_by()),
+        ("manager status distribution",
+         lambda: quotations.values("status").annotate(total=Count("id")).order_by()),
+        ("salesperson vs quotations",
+         lambda: quotations.values("salesperson__username").annotate(total=Count("id")).order_by("-total")),
+        ("today's quotations",
+         lambda: quotations.filter(date_created=date.today())),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Seed quotations and EXPLAIN the hot Quotation queries to confirm index usage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", required=True, help="Alias of a scratch database (never the default)")
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--keep", action="store_true", help="Leave the seeded rows in place")
+        parser.add_argument("--no-seed", action="store_true", help="Reuse rows kept by an earlier run")
+
+    def handle(self, *args, **options):
+        using = scratch_database(options["database"])
+
+        if not options["no_seed"]:
+            self.stdout.write(f"Seeding {options['rows']:,} quotations ...")
+            started = time.perf_counter()
+            seed(options["rows"], using)
+            self.stdout.write(f"  done in {time.perf_counter() - started:.1f}s")
+
+        connection = connections[using]
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        try:
+            for label, build in hot_queries(using):
+                plan = build().explain()
+                used = list(dict.fromkeys(INDEX_IN_PLAN.findall(plan))) or ["-- full table scan --"]
+
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    list(build())
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(f"  index: {', '.join(used)}")
+                self.stdout.write(f"  median: {statistics.median(timings):.2f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+            # The keyset helper itself, deep into the listing
+            mine = Quotation.objects.using(using).filter(salesperson__username=f"{BENCH_PREFIX}7")
+            rows, cursor = keyset_page(mine, size=50)
+            for _ in range(20):
+                if not cursor:
+                    break
+                rows, cursor = keyset_page(mine, cursor, 50)
+            self.stdout.write(self.style.MIGRATE_HEADING("keyset page 21 (salesperson)"))
+            started = time.perf_counter()
+            keyset_page(mine, cursor, 50)
+            self.stdout.write(f"  {(time.perf_counter() - started) * 1000:.2f} ms")
+        finally:
+            if not options["keep"]:
+                cleanup(using)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quotes.product_io import export_rows, file_format, stream_csv, write_xlsx
+
+
+class Command(BaseCommand):
+    help = "Write the product catalog to a CSV or XLSX file that import_products can read back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to write (.csv or .xlsx)")
+        parser.add_argument("--format", choices=["csv", "xlsx"], help="Override the format taken from the extension")
+        parser.add_argument("--country", help="Only products of this country (e.g. Oman, Global)")
+
+    def handle(self, *args, **options):
+        count = -1   # the header row
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        try:
+            fmt = file_format(options["path"], options["format"])
+            rows = counted(export_rows(options["country"]))
+            if fmt == "xlsx":
+                with open(options["path"], "wb") as fh:
+                    write_xlsx(rows, fh)
+            else:
+                with open(options["path"], "w", encoding="utf-8", newline="") as fh:
+                    fh.writelines(stream_csv(rows))
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} product(s) to {options['path']}"))
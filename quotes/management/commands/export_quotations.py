@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quotes.pdf_export import export_queryset, render_quotations, stream_zip
+
+
+class Command(BaseCommand):
+    help = "Render a filtered set of quotations to PDF and write them into a ZIP archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the ZIP file to write")
+        parser.add_argument("--status", default="approved", help="Quotation status ('' for all)")
+        parser.add_argument("--month", help="Only quotations created in this month (YYYY-MM)")
+        parser.add_argument("--salesperson", help="Only quotations of this salesperson (username)")
+        parser.add_argument("--workers", type=int, help="Render processes (default QUOTATION_EXPORT_WORKERS)")
+
+    def handle(self, *args, **options):
+        try:
+            quotations = export_queryset(
+                status=options["status"],
+                month=options["month"],
+                salesperson=options["salesperson"],
+            )
+        except ValueError:
+            raise CommandError("--month must look like YYYY-MM")
+
+        count = 0
+
+        def counted(files):
+            nonlocal count
+            for name, data in files:
+                count += 1
+                yield name, data
+
+        with open(options["output"], "wb") as fh:
+            for chunk in stream_zip(counted(render_quotations(quotations, options["workers"]))):
+                fh.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} quotation(s) to {options['output']}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quotes.product_io import CHUNK_SIZE, file_format, import_products, read_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update products from a CSV or XLSX price list, matching on "
+        "name + pack_size + country. Columns: name, unit_price (required), "
+        "pack_size, country, description, unit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file to import")
+        parser.add_argument("--format", choices=["csv", "xlsx"], help="Override the format taken from the extension")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+
+    def handle(self, *args, **options):
+        try:
+            fmt = file_format(options["path"], options["format"])
+            with open(options["path"], "rb") as fh:
+                report = import_products(
+                    read_products(fh, fmt),
+                    dry_run=options["dry_run"],
+                    chunk_size=options["chunk_size"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        lines = list(report.lines())
+        for line in lines[1:]:
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(lines[0]))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from quotes.models import PdfRenderJob
+from quotes.pdf_jobs import run_inline
+
+
+class Command(BaseCommand):
+    help = (
+        "Render PDF jobs that never reached the process pool, or whose pool "
+        "worker died (running for longer than --stale-minutes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-minutes", type=int, default=10)
+        parser.add_argument("--limit", type=int, default=100)
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options["stale_minutes"])
+
+        jobs = (
+            PdfRenderJob.objects
+            .filter(Q(status="queued") | Q(status="running", created_at__lt=stale_before))
+            .order_by("created_at")[:options["limit"]]
+        )
+
+        done = failed = 0
+        for job in jobs:
+            run_inline(job)
+            if job.status == "done":
+                done += 1
+            else:
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {done} job(s), {failed} failed."))
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from quotes.models import LoginDailyRollup, LoginIP
+
+
+def roll_up_and_delete(ids):
+    """
+    Fold the LoginIP rows ``ids`` into LoginDailyRollup and delete them, in
+    one transaction: a chunk is either fully counted and gone, or untouched.
+    """
+    with transaction.atomic():
+        groups = list(
+            LoginIP.objects.filter(id__in=ids)
+            .annotate(day=TruncDate("timestamp"))
+            .values("day", "user_id", "location")
+            .annotate(logins=Count("id"), first_login=Min("timestamp"), last_login=Max("timestamp"))
+            .order_by()
+        )
+
+        existing = {
+            (row.day, row.user_id, row.location): row
+            for row in LoginDailyRollup.objects.select_for_update().filter(
+                day__in={g["day"] for g in groups},
+                user_id__in={g["user_id"] for g in groups},
+            )
+        }
+
+        created, updated = [], []
+        for g in groups:
+            row = existing.get((g["day"], g["user_id"], g["location"]))
+            if row is None:
+                created.append(LoginDailyRollup(**g))
+                continue
+            row.logins += g["logins"]
+            row.first_login = min(row.first_login, g["first_login"])
+            row.last_login = max(row.last_login, g["last_login"])
+            updated.append(row)
+
+        LoginDailyRollup.objects.bulk_create(created)
+        LoginDailyRollup.objects.bulk_update(updated, ["logins", "first_login", "last_login"])
+        deleted, _ = LoginIP.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll LoginIP rows older than --keep-days up into daily per-user/location "
+        "counts, then delete them in chunks. Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-days", type=int, default=90, help="Raw rows newer than this are kept")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would go")
+
+    def handle(self, *args, **options):
+        if options["keep_days"] < 1:
+            raise CommandError("--keep-days must be at least 1")
+
+        # Whole days only, so a day's rollup is never split across runs
+        cutoff = (timezone.now() - timedelta(days=options["keep_days"])).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        old_rows = LoginIP.objects.filter(timestamp__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{old_rows.count()} login row(s) before {cutoff:%Y-%m-%d} would be rolled up.")
+            return
+
+        total = 0
+        while True:
+            ids = list(old_rows.order_by("id").values_list("id", flat=True)[:options["chunk_size"]])
+            if not ids:
+                break
+            total += roll_up_and_delete(ids)
+            self.stdout.write(f"  {total} row(s) rolled up and deleted")
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {total} login row(s) before {cutoff:%Y-%m-%d}."))
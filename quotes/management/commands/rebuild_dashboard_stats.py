@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from quotes.dashboard import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the admin/manager dashboard counters from the source tables. "
+        "Run after bulk imports or raw SQL changes, which bypass the signals "
+        "that normally keep them current."
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} dashboard counter(s)."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from quotes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the client/product/quotation search index from the source "
+        "tables. Run after raw SQL or queryset.update() changes, which bypass "
+        "the signals that normally keep it current."
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {rows} search entr{'y' if rows == 1 else 'ies'}."))
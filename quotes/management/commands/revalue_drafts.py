@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from quotes.pricing import REVALUE_CHUNK_SIZE, end_of_day, revalue_drafts, sync_catalog_prices
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring product list prices and open draft quotations in line with the "
+        "ProductPrice history: copy prices that have taken effect onto the "
+        "catalog, then reprice draft lines (discounts and quantities are kept)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--product", type=int, action="append", dest="products",
+                            help="Only drafts quoting this product id (repeatable)")
+        parser.add_argument("--as-of", help="Price drafts as of this date (YYYY-MM-DD) instead of now")
+        parser.add_argument("--chunk-size", type=int, default=REVALUE_CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+
+    def handle(self, *args, **options):
+        when = None
+        if options["as_of"]:
+            day = parse_date(options["as_of"])
+            if not day:
+                raise CommandError("--as-of must look like YYYY-MM-DD")
+            when = end_of_day(day)
+
+        verb = "would be" if options["dry_run"] else "were"
+
+        synced = sync_catalog_prices(dry_run=options["dry_run"])
+        self.stdout.write(f"{len(synced)} catalog price(s) {verb} updated to the current list price.")
+
+        revalued = revalue_drafts(
+            options["products"],
+            when=when,
+            dry_run=options["dry_run"],
+            chunk_size=options["chunk_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{len(revalued)} draft quotation(s) {verb} repriced."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0004_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuotationLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('pack_size', models.CharField(blank=True, max_length=50)),
+                ('qty', models.DecimalField(decimal_places=3, default=1, max_digits=12)),
+                ('unit_price', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('discount', models.DecimalField(decimal_places=3, default=0, max_digits=6)),
+                ('line_total', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('product', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quotation_lines', to='quotes.productnew')),
+                ('quotation', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='quotes.quotation')),
+            ],
+            options={
+                'ordering': ['quotation', 'position'],
+                'indexes': [models.Index(fields=['quotation', 'position'], name='quotes_quot_quotati_e29a0c_idx'), models.Index(fields=['product', 'quotation'], name='quotes_quot_product_1f7b2c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _decimal(value, default="0"):
+    try:
+        return Decimal(str(value if value not in (None, "") else default))
+    except InvalidOperation:
+        return Decimal(default)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def backfill_lines(apps, schema_editor):
+    Quotation = apps.get_model("quotes", "Quotation")
+    QuotationLine = apps.get_model("quotes", "QuotationLine")
+    ProductNew = apps.get_model("quotes", "ProductNew")
+
+    # Older JSON lines only carry the product name; match it within the
+    # quotation's country first, then against Global products. A name shared
+    # by several products is ambiguous (None) and leaves the line unlinked
+    product_ids = {}
+    known_ids = set()
+    for pk, name, country in ProductNew.objects.values_list("id", "name", "country"):
+        product_ids[(name, country)] = None if (name, country) in product_ids else pk
+        known_ids.add(pk)
+
+    # Collect ids up front so inserting lines never disturbs the scan
+    pending = list(
+        Quotation.objects.filter(lines__isnull=True).order_by("id").values_list("id", flat=True)
+    )
+
+    for start in range(0, len(pending), BATCH_SIZE):
+        quotations = Quotation.objects.filter(id__in=pending[start:start + BATCH_SIZE]).only("id", "country", "products")
+        lines = []
+        for quotation in quotations:
+            lines.extend(_lines_for(QuotationLine, quotation, product_ids, known_ids))
+        QuotationLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+
+
+def _lines_for(QuotationLine, quotation, product_ids, known_ids):
+    for position, item in enumerate(quotation.products or []):
+        if not isinstance(item, dict):
+            continue
+        name = item.get("name") or ""
+        product_id = _int(item.get("product_id"))
+        if product_id not in known_ids:
+            key = (name, quotation.country)
+            product_id = product_ids[key] if key in product_ids else product_ids.get((name, "Global"))
+        yield QuotationLine(
+            quotation_id=quotation.id,
+            product_id=product_id,
+            position=position,
+            name=name,
+            description=item.get("desc") or "",
+            pack_size=item.get("pack_size") or "",
+            qty=_decimal(item.get("qty"), "1"),
+            unit_price=_decimal(item.get("unit_price")),
+            discount=_decimal(item.get("discount")),
+            line_total=_decimal(item.get("total")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0005_quotationline'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:28
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def merge_duplicate_years(apps, schema_editor):
+    # The old read-increment-save could create several rows per year; keep
+    # the highest counter so no number is ever handed out twice
+    QuotationCounter = apps.get_model("quotes", "QuotationCounter")
+    for row in QuotationCounter.objects.values("year").annotate(last=Max("counter"), rows=models.Count("id")):
+        if row["rows"] > 1:
+            QuotationCounter.objects.filter(year=row["year"]).delete()
+            QuotationCounter.objects.create(year=row["year"], counter=row["last"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0006_backfill_quotationline'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_years, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quotationcounter',
+            name='year',
+            field=models.IntegerField(unique=True),
+        ),
+    ]
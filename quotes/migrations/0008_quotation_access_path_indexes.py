@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0007_quotationcounter_unique_year'),
+    ]
+
+    # The per-salesperson indexes are created on the FK column in 0011
+    operations = [
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['status', 'date_created', 'id'], name='qtn_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['date_created', 'id'], name='qtn_date_idx'),
+        ),
+    ]
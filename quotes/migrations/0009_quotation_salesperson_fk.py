@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0008_quotation_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='quotation',
+            old_name='salesperson',
+            new_name='salesperson_name',
+        ),
+        migrations.AlterField(
+            model_name='quotation',
+            name='salesperson_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        # No standalone index: qtn_sp_* (0011) lead with this column
+        migrations.AddField(
+            model_name='quotation',
+            name='salesperson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, db_index=False, related_name='quotations', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def backfill_salesperson(apps, schema_editor):
+    Quotation = apps.get_model("quotes", "Quotation")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+
+    user_ids = dict(User.objects.values_list("username", "id"))
+    # Hand-typed names may differ in case; match those only when unambiguous
+    folded = defaultdict(set)
+    for username, pk in user_ids.items():
+        folded[username.casefold()].add(pk)
+    folded_ids = {name: pks.pop() for name, pks in folded.items() if len(pks) == 1}
+
+    # Each batch commits on its own and only unmapped rows are selected, so
+    # an interrupted run simply continues where it stopped when re-run
+    last_id = 0
+    while True:
+        batch = list(
+            Quotation.objects.filter(id__gt=last_id, salesperson__isnull=True)
+            .exclude(salesperson_name="")
+            .order_by("id")
+            .values_list("id", "salesperson_name")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        by_user = defaultdict(list)
+        for pk, username in batch:
+            user_id = user_ids.get(username) or folded_ids.get(username.casefold())
+            if user_id:
+                by_user[user_id].append(pk)
+
+        with transaction.atomic():
+            for user_id, pks in by_user.items():
+                Quotation.objects.filter(id__in=pks).update(salesperson_id=user_id)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('quotes', '0009_quotation_salesperson_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_salesperson, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0010_backfill_quotation_salesperson'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['salesperson', 'status', 'date_created', 'id'], name='qtn_sp_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['salesperson', 'date_created', 'id'], name='qtn_sp_date_idx'),
+        ),
+    ]
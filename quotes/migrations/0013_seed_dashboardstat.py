@@ -0,0 +1,54 @@
+from collections import Counter
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    # Same counts as quotes.dashboard.rebuild_stats, against historical models
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Client = apps.get_model("quotes", "Client")
+    ProductNew = apps.get_model("quotes", "ProductNew")
+    Quotation = apps.get_model("quotes", "Quotation")
+    DashboardStat = apps.get_model("quotes", "DashboardStat")
+
+    rows = Counter()
+    rows[("users", "")] = User.objects.count()
+    for role, total in User.objects.values_list("role").annotate(total=Count("id")).order_by():
+        rows[("users_by_role", role or "")] += total
+    for country, total in (
+        User.objects.filter(role="salesperson").values_list("country").annotate(total=Count("id")).order_by()
+    ):
+        rows[("salespersons_by_country", country or "")] += total
+
+    rows[("clients", "")] = Client.objects.count()
+    rows[("products", "")] = ProductNew.objects.count()
+
+    rows[("quotations", "")] = Quotation.objects.count()
+    for field, metric in (
+        ("status", "quotations_by_status"),
+        ("salesperson", "quotations_by_salesperson"),
+        ("date_created", "quotations_by_date"),
+    ):
+        for value, total in Quotation.objects.values_list(field).annotate(total=Count("id")).order_by():
+            key = value.isoformat() if isinstance(value, date) else str(value or "")
+            rows[(metric, key)] += total
+
+    DashboardStat.objects.bulk_create(
+        [DashboardStat(metric=metric, key=key, value=value) for (metric, key), value in rows.items() if value],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0012_dashboardstat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
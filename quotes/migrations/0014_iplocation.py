@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0013_seed_dashboardstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IPLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(unique=True)),
+                ('location', models.CharField(max_length=100)),
+                ('resolved_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0014_iplocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('logins', models.PositiveIntegerField(default=0)),
+                ('first_login', models.DateTimeField()),
+                ('last_login', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='loginip',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='loginip',
+            index=models.Index(fields=['user', '-timestamp'], name='loginip_user_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='logindailyrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='logindailyrollup',
+            index=models.Index(fields=['user', 'day'], name='login_rollup_user_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='logindailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'user', 'location'), name='login_rollup_day_user_location'),
+        ),
+    ]
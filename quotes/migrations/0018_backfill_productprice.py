@@ -0,0 +1,28 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_prices(apps, schema_editor):
+    ProductNew = apps.get_model("quotes", "ProductNew")
+    ProductPrice = apps.get_model("quotes", "ProductPrice")
+
+    # Today's price is the only one known; date it from the product's creation
+    priced = set(ProductPrice.objects.values_list("product_id", flat=True))
+    rows = [
+        ProductPrice(product_id=pk, unit_price=price, effective_from=created_at)
+        for pk, price, created_at in ProductNew.objects.order_by("id").values_list("id", "unit_price", "created_at")
+        if pk not in priced
+    ]
+    ProductPrice.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0017_productprice'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
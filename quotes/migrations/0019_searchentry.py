@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0018_backfill_productprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('client', 'Client'), ('product', 'Product'), ('quotation', 'Quotation')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('country', models.CharField(blank=True, max_length=50)),
+                ('salesperson', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['salesperson', 'kind'], name='search_entry_sp_kind_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_kind_object')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+from django.db import migrations
+
+# PostgreSQL: a weighted tsvector kept by the database itself, GIN-indexed
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE quotes_searchentry ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX search_entry_vector_idx ON quotes_searchentry USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS search_entry_vector_idx",
+    "ALTER TABLE quotes_searchentry DROP COLUMN IF EXISTS search_vector",
+]
+
+# SQLite: an external-content FTS5 table over the same rows, synced by triggers.
+# A later AlterField on SearchEntry makes SQLite rebuild the table, which
+# drops the triggers; such a migration has to run these statements again.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE quotes_searchentry_fts USING fts5(
+        title, body, content='quotes_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER quotes_searchentry_fts_insert AFTER INSERT ON quotes_searchentry BEGIN
+        INSERT INTO quotes_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER quotes_searchentry_fts_delete AFTER DELETE ON quotes_searchentry BEGIN
+        INSERT INTO quotes_searchentry_fts(quotes_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER quotes_searchentry_fts_update AFTER UPDATE ON quotes_searchentry BEGIN
+        INSERT INTO quotes_searchentry_fts(quotes_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO quotes_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    # Index rows already in the table (when re-applied after a rollback)
+    "INSERT INTO quotes_searchentry_fts(quotes_searchentry_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS quotes_searchentry_fts_update",
+    "DROP TRIGGER IF EXISTS quotes_searchentry_fts_delete",
+    "DROP TRIGGER IF EXISTS quotes_searchentry_fts_insert",
+    "DROP TABLE IF EXISTS quotes_searchentry_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    # Other databases fall back to substring matching in quotes/search.py
+    _run(schema_editor, {"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0019_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
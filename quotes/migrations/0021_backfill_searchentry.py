@@ -0,0 +1,49 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _join(*parts):
+    return "\n".join(str(part) for part in parts if part)
+
+
+def backfill_entries(apps, schema_editor):
+    # Same documents as quotes.search.rebuild_index, against historical models;
+    # the FTS triggers / generated column from 0020 index them on insert
+    Client = apps.get_model("quotes", "Client")
+    ProductNew = apps.get_model("quotes", "ProductNew")
+    Quotation = apps.get_model("quotes", "Quotation")
+    SearchEntry = apps.get_model("quotes", "SearchEntry")
+
+    def entries():
+        for c in Client.objects.iterator(chunk_size=BATCH_SIZE):
+            yield SearchEntry(
+                kind="client", object_id=c.pk, title=c.company_name[:255],
+                body=_join(c.contact_person, c.email, c.phone), salesperson_id=c.salesperson_id,
+            )
+        for p in ProductNew.objects.iterator(chunk_size=BATCH_SIZE):
+            yield SearchEntry(
+                kind="product", object_id=p.pk, title=p.name[:255],
+                body=_join(p.pack_size, p.description), country=p.country or "",
+            )
+        for q in Quotation.objects.select_related("client").iterator(chunk_size=BATCH_SIZE):
+            lines = [_join(i.get("name"), i.get("desc")) for i in q.products or [] if isinstance(i, dict)]
+            yield SearchEntry(
+                kind="quotation", object_id=q.pk, title=f"Quotation #{q.pk}",
+                body=_join(q.pk, q.client.company_name if q.client else "", *lines),
+                salesperson_id=q.salesperson_id, country=q.country or "",
+            )
+
+    SearchEntry.objects.all().delete()   # re-applied after a rollback
+    SearchEntry.objects.bulk_create(entries(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0020_searchentry_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0021_backfill_searchentry'),
+    ]
+
+    operations = [
+        # The new index leads with salesperson, so the FK's own index is dropped after it exists
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['salesperson', 'company_name', 'id'], name='client_sp_company_idx'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='salesperson',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
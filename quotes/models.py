@@ -1,6 +1,11 @@
-from django.db import models
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 
 # -----------------------------------------------------
@@ -39,12 +44,56 @@ class LoginIP(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     ip_address = models.GenericIPAddressField()
     location = models.CharField(max_length=100, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # Raw rows are append-only and pruned by timestamp range
+        # (`manage.py prune_login_ips`), so the table can be range-partitioned
+        # on timestamp without code changes
+        indexes = [
+            models.Index(fields=['user', '-timestamp'], name='loginip_user_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.ip_address} - {self.location}"
 
 
+# -----------------------------------------------------
+# LOGIN DAILY ROLLUP
+# -----------------------------------------------------
+class LoginDailyRollup(models.Model):
+    """Logins per user, location and day, kept after the raw LoginIP rows are pruned."""
+    day = models.DateField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='login_rollups')
+    location = models.CharField(max_length=100, blank=True)
+    logins = models.PositiveIntegerField(default=0)
+    first_login = models.DateTimeField()
+    last_login = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user', 'location'], name='login_rollup_day_user_location'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='login_rollup_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.user_id} {self.location}: {self.logins}"
+
+
+# -----------------------------------------------------
+# IP -> LOCATION CACHE
+# -----------------------------------------------------
+class IPLocation(models.Model):
+    ip_address = models.GenericIPAddressField(unique=True)
+    location = models.CharField(max_length=100)
+    resolved_at = models.DateTimeField()   # entries older than LOGIN_IP_CACHE_TTL are looked up again
+
+    def __str__(self):
+        return f"{self.ip_address} - {self.location}"
+
+
 # -----------------------------------------------------
 # CLIENT
 # -----------------------------------------------------
@@ -54,7 +103,14 @@ class Client(models.Model):
     email = models.EmailField()
     phone = models.CharField(max_length=20)
     address = models.TextField()
-    salesperson = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    # Covered by client_sp_company_idx, which leads with salesperson
+    salesperson = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, db_index=False)
+
+    class Meta:
+        # The per-salesperson client type-ahead filters and sorts on these
+        indexes = [
+            models.Index(fields=['salesperson', 'company_name', 'id'], name='client_sp_company_idx'),
+        ]
 
     def __str__(self):
         return self.company_name
@@ -82,6 +138,35 @@ class ProductNew(models.Model):
         return self.name
 
 
+# -----------------------------------------------------
+# PRODUCT PRICE HISTORY
+# -----------------------------------------------------
+class ProductPrice(models.Model):
+    """
+    One list price and the moment it takes effect. Rows are only ever added:
+    the price on a date is the latest row effective by then (see
+    quotes/pricing.py). ProductNew.unit_price mirrors the current one.
+    """
+    product = models.ForeignKey(ProductNew, on_delete=models.CASCADE, related_name='prices', db_index=False)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=3)
+    effective_from = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'effective_from'], name='product_price_effective_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Product prices are append-only; add a new row instead.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.unit_price} from {self.effective_from:%Y-%m-%d}"
+
+
 
 # -----------------------------------------------------
 # INTRO TEXT
@@ -133,8 +218,13 @@ class Quotation(models.Model):
 
     client = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True)
 
-    # ⚠️ Stored as username (string) – matches your current system
-    salesperson = models.CharField(max_length=255)
+    # Covered by the qtn_sp_* indexes, which lead with salesperson
+    salesperson = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='quotations', db_index=False
+    )
+    # Username at creation (the pre-FK column); still shown once the user is deleted
+    salesperson_name = models.CharField(max_length=255, blank=True)
 
     intro_text = models.TextField(blank=True)
     closing_text = models.TextField(blank=True)
@@ -156,15 +246,260 @@ class Quotation(models.Model):
     date_created = models.DateField(auto_now_add=True)
     valid_until = models.DateField(null=True, blank=True)
 
+    class Meta:
+        # Match the hot access paths: per-salesperson lists/drafts/dashboards,
+        # manager status queues, and the (date_created, id) keyset listings
+        indexes = [
+            models.Index(fields=['salesperson', 'status', 'date_created', 'id'], name='qtn_sp_status_date_idx'),
+            models.Index(fields=['salesperson', 'date_created', 'id'], name='qtn_sp_date_idx'),
+            models.Index(fields=['status', 'date_created', 'id'], name='qtn_status_date_idx'),
+            models.Index(fields=['date_created', 'id'], name='qtn_date_idx'),
+        ]
+
+    @property
+    def salesperson_username(self):
+        return self.salesperson.username if self.salesperson_id else self.salesperson_name
+
     def __str__(self):
         return f"Quotation #{self.id} ({self.status})"
 
+# -----------------------------------------------------
+# QUOTATION LINE ITEMS
+# -----------------------------------------------------
+class QuotationLine(models.Model):
+    quotation = models.ForeignKey(Quotation, on_delete=models.CASCADE, related_name='lines', db_index=False)
+    # Kept when the catalog entry is deleted; `name` preserves what was quoted
+    product = models.ForeignKey(ProductNew, on_delete=models.SET_NULL, null=True, blank=True, related_name='quotation_lines', db_index=False)
+
+    position = models.PositiveIntegerField(default=0)   # order on the quotation
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    pack_size = models.CharField(max_length=50, blank=True)
+
+    qty = models.DecimalField(max_digits=12, decimal_places=3, default=1)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    discount = models.DecimalField(max_digits=6, decimal_places=3, default=0)   # percent
+    line_total = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+
+    class Meta:
+        ordering = ['quotation', 'position']
+        indexes = [
+            models.Index(fields=['quotation', 'position']),
+            models.Index(fields=['product', 'quotation']),
+        ]
+
+    @staticmethod
+    def _decimal(value, default="0"):
+        try:
+            return Decimal(str(value if value not in (None, "") else default))
+        except InvalidOperation:
+            return Decimal(default)
+
+    @classmethod
+    def from_item(cls, quotation, position, item):
+        """Build (unsaved) a line from one ``Quotation.products`` dict."""
+        return cls(
+            quotation=quotation,
+            product_id=item.get("product_id"),
+            position=position,
+            name=item.get("name") or "",
+            description=item.get("desc") or "",
+            pack_size=item.get("pack_size") or "",
+            qty=cls._decimal(item.get("qty"), "1"),
+            unit_price=cls._decimal(item.get("unit_price")),
+            discount=cls._decimal(item.get("discount")),
+            line_total=cls._decimal(item.get("total")),
+        )
+
+    @classmethod
+    def build_for(cls, quotations):
+        """
+        Build (unsaved) the lines of ``quotations`` from their stored
+        ``products``. Products deleted since the JSON was written leave
+        their lines unlinked rather than failing the foreign key.
+        """
+        lines = [
+            cls.from_item(quotation, position, item)
+            for quotation in quotations
+            for position, item in enumerate(quotation.products or [])
+            if isinstance(item, dict)
+        ]
+        existing = set(ProductNew.objects.filter(
+            pk__in={line.product_id for line in lines if line.product_id}
+        ).values_list("pk", flat=True))
+        for line in lines:
+            if line.product_id not in existing:
+                line.product_id = None
+        return lines
+
+    @classmethod
+    def replace_for(cls, quotation, products):
+        """Rewrite a quotation's lines from its ``products`` list in two queries."""
+        cls.objects.filter(quotation=quotation).delete()
+        return cls.objects.bulk_create(
+            [cls.from_item(quotation, i, item) for i, item in enumerate(products)]
+        )
+
+    def __str__(self):
+        return f"{self.name} x {self.qty} (Quotation #{self.quotation_id})"
+
+
+# -----------------------------------------------------
+# DASHBOARD SUMMARY COUNTERS
+# -----------------------------------------------------
+class DashboardStat(models.Model):
+    """
+    One precomputed counter, e.g. ("quotations_by_status", "sent"). Kept up
+    to date from model signals (see quotes/dashboard.py); rebuild with
+    `manage.py rebuild_dashboard_stats`.
+    """
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, blank=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key'], name='dashboard_stat_metric_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}[{self.key}] = {self.value}"
+
+
+# -----------------------------------------------------
+# FULL-TEXT SEARCH INDEX
+# -----------------------------------------------------
+class SearchEntry(models.Model):
+    """
+    One searchable client, product or quotation (see quotes/search.py).
+    The full-text index over title/body is database specific and lives
+    outside the model: a generated tsvector column with a GIN index on
+    PostgreSQL, an FTS5 table kept in step by triggers on SQLite.
+    """
+    KIND_CHOICES = (
+        ('client', 'Client'),
+        ('product', 'Product'),
+        ('quotation', 'Quotation'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+
+    # Visibility: owner for clients/quotations, country for products
+    salesperson = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, db_index=False)
+    country = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entry_kind_object'),
+        ]
+        indexes = [
+            models.Index(fields=['salesperson', 'kind'], name='search_entry_sp_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
+
+
+# -----------------------------------------------------
+# CACHE VERSION COUNTERS
+# -----------------------------------------------------
+class CacheVersion(models.Model):
+    """
+    Shared version number for a per-process cache (e.g. the product catalog
+    in quotes/catalog.py). Writers bump it; readers compare it with the
+    version they loaded and reload only when it moved.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, name):
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(version=F("version") + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, version=1)
+                except IntegrityError:
+                    cls.objects.filter(name=name).update(version=F("version") + 1)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+# -----------------------------------------------------
+# BACKGROUND PDF RENDER JOBS
+# -----------------------------------------------------
+class PdfRenderJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    quotation = models.ForeignKey(Quotation, on_delete=models.CASCADE, null=True, blank=True, related_name='render_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    # Everything needed to (re)render: generate_quotation_pdf input + letterhead file
+    payload = models.JSONField()
+    letterhead = models.CharField(max_length=255, blank=True)   # storage name, blank = default
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    cache_key = models.CharField(max_length=64, blank=True)   # pdf_cache key once rendered
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Render job #{self.id} ({self.status})"
+
+
 # -----------------------------------------------------
 # COUNTER FOR QUOTATION NUMBERING
 # -----------------------------------------------------
 class QuotationCounter(models.Model):
-    year = models.IntegerField()
-    counter = models.IntegerField()
+    year = models.IntegerField(unique=True)
+    counter = models.IntegerField()   # last number handed out
+
+    @classmethod
+    def reserve(cls, count=1, year=None):
+        """
+        Atomically take ``count`` consecutive numbers for ``year`` and return
+        them as a range. The increment happens in the database (F() update),
+        so concurrent callers never receive the same number.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        year = year or datetime.now().year
+
+        with transaction.atomic():
+            updated = cls.objects.filter(year=year).update(counter=F("counter") + count)
+            if not updated:
+                try:
+                    # First number of the year; a savepoint lets a racing
+                    # insert fall back to the update below
+                    with transaction.atomic():
+                        cls.objects.create(year=year, counter=count)
+                except IntegrityError:
+                    cls.objects.filter(year=year).update(counter=F("counter") + count)
+
+            # Our update holds the row lock until commit, so this is our value
+            last = cls.objects.filter(year=year).values_list("counter", flat=True).get()
+
+        return range(last - count + 1, last + 1)
 
     def __str__(self):
         return f"{self.year}-{self.counter}"
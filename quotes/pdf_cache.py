@@ -0,0 +1,182 @@
+# quotes/pdf_cache.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+from .pdf_generator import generate_quotation_pdf, get_letterhead
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever pdf_generator output changes so stale renders are not served
+RENDER_VERSION = 1
+
+CACHE_DIR = getattr(settings, "QUOTATION_PDF_CACHE_DIR", os.path.join(settings.BASE_DIR, "pdf_cache"))
+CACHE_MAX_BYTES = getattr(settings, "QUOTATION_PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+
+# Eviction trims to this fraction of the limit, so the next few writes
+# do not each trigger another sweep
+CACHE_LOW_WATER = 0.9
+
+# Writes between full rescans; other workers' writes are only seen then
+RESCAN_EVERY = 100
+
+_evict_lock = threading.Lock()
+_usage = {"bytes": None, "writes": 0}   # this process's running estimate
+
+
+# -----------------------------------------------------
+# CONTENT-ADDRESSED RENDERED PDF CACHE
+# -----------------------------------------------------
+def render_key(data, letterhead):
+    """Stable hash of everything that affects the rendered PDF bytes."""
+    payload = json.dumps(
+        {
+            "render_version": RENDER_VERSION,
+            "letterhead": str(letterhead.version),
+            "data": data,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    # Two-level fan-out keeps directories small on big caches
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.pdf")
+
+
+def _read(key):
+    path = _path(key)
+    try:
+        with open(path, "rb") as fh:
+            pdf = fh.read()
+    except FileNotFoundError:
+        return None
+
+    # Refresh mtime so eviction drops the least recently served renders first
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return pdf
+
+
+def _write(key, pdf):
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write under a temp name and rename so readers never see partial files
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(pdf)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def evict(max_bytes=None, target_bytes=None):
+    """
+    Delete least recently used renders once the cache is over ``max_bytes``,
+    down to ``target_bytes`` (default: the same). Scans the whole directory
+    and resets the running size estimate.
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    target_bytes = max_bytes if target_bytes is None else target_bytes
+
+    with _evict_lock:
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(CACHE_DIR):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        if total > max_bytes:
+            for _mtime, size, path in sorted(entries):
+                if total <= target_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+
+        _usage["bytes"], _usage["writes"] = total, 0
+        return removed
+
+
+def _note_write(size):
+    """
+    Add a new render to the running total and sweep only when it crosses
+    the limit (or every ``RESCAN_EVERY`` writes), instead of walking the
+    whole cache on every miss.
+    """
+    with _evict_lock:
+        if _usage["bytes"] is not None and _usage["writes"] < RESCAN_EVERY:
+            _usage["bytes"] += size
+            _usage["writes"] += 1
+            if _usage["bytes"] <= CACHE_MAX_BYTES:
+                return
+    evict(CACHE_MAX_BYTES, int(CACHE_MAX_BYTES * CACHE_LOW_WATER))
+
+
+def read_cached(key):
+    """Return the stored render for ``key``, or ``None`` if it was evicted."""
+    return _read(key)
+
+
+def _render_and_store(key, data, letterhead):
+    pdf = generate_quotation_pdf(data, letterhead=letterhead).getvalue()
+
+    try:
+        _write(key, pdf)
+        _note_write(len(pdf))
+    except OSError:
+        # A read-only or full disk must never break the preview itself
+        logger.exception("Could not store rendered quotation %s", key)
+
+    return pdf
+
+
+def render_to_cache(data, letterhead=None):
+    """Make sure a render of ``data`` is stored and return its cache key."""
+    letterhead = letterhead or get_letterhead()
+    key = render_key(data, letterhead)
+
+    if not os.path.exists(_path(key)):
+        _render_and_store(key, data, letterhead)
+    return key
+
+
+def render_quotation_pdf(data, letterhead=None):
+    """
+    Return the quotation PDF bytes for ``data``, serving an earlier render
+    when nothing that affects the output has changed.
+    """
+    letterhead = letterhead or get_letterhead()
+    key = render_key(data, letterhead)
+
+    pdf = _read(key)
+    if pdf is not None:
+        return pdf
+
+    return _render_and_store(key, data, letterhead)
@@ -0,0 +1,206 @@
+# quotes/pdf_export.py
+import multiprocessing
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .models import Country, Quotation
+from .pdf_worker import init_worker, render_pdf
+
+EXPORT_WORKERS = getattr(settings, "QUOTATION_EXPORT_WORKERS", 4)
+
+# Downloads from the web share one pool per process and run one at a time;
+# bigger selections go through `manage.py export_quotations`
+WEB_EXPORT_SLOTS = getattr(settings, "QUOTATION_WEB_EXPORT_SLOTS", 1)
+WEB_EXPORT_LIMIT = getattr(settings, "QUOTATION_WEB_EXPORT_LIMIT", 500)
+
+_web_slots = threading.BoundedSemaphore(WEB_EXPORT_SLOTS)
+_web_pool = None
+_web_pool_lock = threading.Lock()
+
+# Terms are not stored on Quotation; use the same defaults as create_quotation
+DEFAULT_VALIDITY = 30
+DEFAULT_DELIVERY = "7 Days"
+DEFAULT_PAYMENT_TERMS = "Advance Payment"
+
+
+# -----------------------------------------------------
+# EXPORT SELECTION
+# -----------------------------------------------------
+def export_queryset(status="approved", month=None, salesperson=None):
+    """
+    Quotations to export. ``month`` is "YYYY-MM"; raises ValueError when it
+    is malformed.
+    """
+    quotations = Quotation.objects.order_by("date_created", "id")
+
+    if status:
+        quotations = quotations.filter(status=status)
+    if salesperson:
+        quotations = quotations.filter(salesperson__username=salesperson)
+    if month:
+        year, month_number = (int(part) for part in month.split("-"))
+        if not 1 <= month_number <= 12:
+            raise ValueError(f"Invalid month: {month}")
+        quotations = quotations.filter(date_created__year=year, date_created__month=month_number)
+
+    return quotations
+
+
+# -----------------------------------------------------
+# QUOTATION -> PDF INPUT
+# -----------------------------------------------------
+def quotation_pdf_data(quotation):
+    client = quotation.client
+    products = quotation.products or []
+
+    subtotal = sum(float(p.get("total", 0) or 0) for p in products)
+    vat = round(subtotal * 0.05, 3)
+
+    return {
+        "date": quotation.date_created.strftime("%d-%m-%Y"),
+        "qtn_no": f"QTN-{quotation.id}",
+        "client_company": client.company_name if client else "",
+        "client_email": client.email if client else "",
+        "client_name": client.contact_person if client else "",
+        "client_phone": client.phone if client else "",
+        "products": products,
+        "subtotal": subtotal,
+        "vat": vat,
+        "grand_total": subtotal + vat,
+        "salesperson": quotation.salesperson_username,
+        "intro_text": quotation.intro_text,
+        "closing_text": quotation.closing_text,
+        "validity": DEFAULT_VALIDITY,
+        "delivery": DEFAULT_DELIVERY,
+        "payment_terms": DEFAULT_PAYMENT_TERMS,
+    }
+
+
+# -----------------------------------------------------
+# PARALLEL RENDERING
+# -----------------------------------------------------
+def _new_pool(workers):
+    # Spawn, not fork: web workers have threads and open database connections
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker
+    )
+
+
+def _shared_pool():
+    global _web_pool
+    with _web_pool_lock:
+        if _web_pool is None:
+            _web_pool = _new_pool(EXPORT_WORKERS)
+        return _web_pool
+
+
+def _render(quotations, pool, workers):
+    letterhead_files = dict(Country.objects.values_list("name", "letterhead"))
+    pending = deque()
+    try:
+        for quotation in quotations.select_related("client", "salesperson").iterator(chunk_size=200):
+            future = pool.submit(
+                render_pdf,
+                quotation_pdf_data(quotation),
+                letterhead_files.get(quotation.country) or "",
+            )
+            pending.append((f"QTN-{quotation.id}.pdf", future))
+
+            if len(pending) >= workers * 2:
+                name, future = pending.popleft()
+                yield name, future.result()
+
+        while pending:
+            name, future = pending.popleft()
+            yield name, future.result()
+    finally:
+        # Client disconnected or a render failed: drop the queued work
+        for _name, future in pending:
+            future.cancel()
+
+
+def render_quotations(quotations, workers=None):
+    """
+    Yield ``(filename, pdf_bytes)`` for each quotation, in order, rendered
+    across a process pool of its own. At most ``2 * workers`` renders are
+    in flight, so memory stays bounded however slowly the caller consumes them.
+    """
+    workers = workers or EXPORT_WORKERS
+    with _new_pool(workers) as pool:
+        yield from _render(quotations, pool, workers)
+
+
+def acquire_web_export():
+    """Take a web export slot without waiting; False when all are busy."""
+    return _web_slots.acquire(blocking=False)
+
+
+class _WebExport:
+    """
+    The ZIP stream of a web export. Django calls ``close()`` when the
+    response ends or the client goes away, even before the first chunk,
+    which is when the slot from ``acquire_web_export`` is given back.
+    """
+
+    def __init__(self, quotations):
+        self._chunks = stream_zip(_render(quotations, _shared_pool(), EXPORT_WORKERS))
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        try:
+            self._chunks.close()
+        finally:
+            if not self._released:
+                self._released = True
+                _web_slots.release()
+
+
+def web_export(quotations):
+    """Streamed ZIP of ``quotations`` on this process's shared pool; needs a slot."""
+    try:
+        return _WebExport(quotations)
+    except BaseException:
+        _web_slots.release()
+        raise
+
+
+# -----------------------------------------------------
+# STREAMED ZIP
+# -----------------------------------------------------
+class _ZipChunks:
+    # Write-only sink: ZipFile appends, the generator drains after each entry
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(files):
+    """Yield a ZIP archive of ``(name, bytes)`` pairs chunk by chunk."""
+    sink = _ZipChunks()
+    # PDFs are already compressed; storing them avoids burning CPU for ~0 gain
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
@@ -1,5 +1,6 @@
 from io import BytesIO
 import os
+import threading
 from django.conf import settings
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
@@ -8,11 +9,296 @@ from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, KeepTogether
 )
 from reportlab.lib.units import mm
-from PyPDF2 import PdfReader, PdfWriter, PageObject
+from reportlab.pdfbase.pdfdoc import PDFObject
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject, DecodedStreamObject, DictionaryObject, EncodedStreamObject,
+    IndirectObject, NameObject, StreamObject
+)
 from num2words import num2words
 
 
-def generate_quotation_pdf(data):
+LETTERHEAD_PATH = os.path.join(settings.BASE_DIR, "quotes", "static", "quotes", "GIC Letterhead new.pdf")
+
+# Resource name the letterhead overlay is registered under on every page
+LETTERHEAD_XOBJECT = "/GICLetterhead"
+
+# Form name the letterhead is registered under inside a ReportLab document
+LETTERHEAD_FORM = "GICLetterhead"
+
+
+# ------------------------------------------------------
+# PyPDF2 OBJECTS -> REPORTLAB DOCUMENT
+# ------------------------------------------------------
+# The letterhead import relies on private APIs: ReportLab's canvas._doc,
+# PDFDocument.Reference and pdfdoc.PDFObject, and PyPDF2's
+# PdfWriter._add_object and StreamObject._data. Both libraries are pinned in
+# requirements.txt (reportlab==5.0.1, PyPDF2==3.0.1); QuotationPdfTests
+# checks the pins and the rendered output, so run it before moving either.
+def _pdf_bytes(obj):
+    out = BytesIO()
+    obj.write_to_stream(out, None)
+    return out.getvalue()
+
+
+def _serialize(obj, parts, refs):
+    """
+    Append the PDF syntax for ``obj`` to ``parts``. Indirect references are
+    appended as their source object number, to be swapped for the target
+    document's own reference at write time, and collected in ``refs``.
+    """
+    if isinstance(obj, IndirectObject):
+        parts.append(obj.idnum)
+        refs.append(obj)
+    elif isinstance(obj, DictionaryObject):
+        parts.append(b"<<")
+        for key, value in obj.items():
+            if isinstance(obj, StreamObject) and key == "/Length":
+                continue
+            parts.append(_pdf_bytes(key) + b" ")
+            _serialize(value, parts, refs)
+            parts.append(b"\n")
+        if not isinstance(obj, StreamObject):
+            parts.append(b">>")
+    elif isinstance(obj, ArrayObject):
+        parts.append(b"[")
+        for value in obj:
+            _serialize(value, parts, refs)
+            parts.append(b" ")
+        parts.append(b"]")
+    else:
+        parts.append(_pdf_bytes(obj))
+
+
+class _ImportedObject(PDFObject):
+    """One pre-serialised letterhead object living in a ReportLab document."""
+
+    def __init__(self, parts, data, references):
+        self.parts = parts
+        self.data = data
+        self.references = references
+
+    def format(self, document):
+        body = b"".join(
+            part if isinstance(part, bytes) else self.references[part].format(document)
+            for part in self.parts
+        )
+        if self.data is None:
+            return body
+
+        data = document.encrypt.encode(self.data)
+        return body + b"/Length %d>>\nstream\n" % len(data) + data + b"\nendstream\n"
+
+
+# ------------------------------------------------------
+# LETTERHEAD CACHE (ONE PARSE PER PROCESS)
+# ------------------------------------------------------
+class Letterhead:
+    """
+    The first page of a letterhead PDF, parsed once and flattened into a
+    form XObject so it can be stamped under any number of content pages
+    without re-parsing its content stream.
+    """
+
+    def __init__(self, source, version=None):
+        # ``source`` is a path or binary file object; ``version`` identifies
+        # the file contents (mtime, storage name) for cache invalidation.
+        self.version = version
+
+        # The raw file, for the original PyPDF2 page merge (single_pass=False)
+        if hasattr(source, "read"):
+            self.source = source.read()
+        else:
+            with open(source, "rb") as fh:
+                self.source = fh.read()
+
+        page = PdfReader(BytesIO(self.source)).pages[0]
+        self.width = page.mediabox.width
+        self.height = page.mediabox.height
+
+        # Everything the overlay references is copied into this in-memory
+        # writer, so renders never touch the source file (or its reader).
+        self._holder = PdfWriter()
+        self.form = self._holder._add_object(self._flatten(page))
+        self._objects = self._compile()
+
+    def _flatten(self, page):
+        contents = page.get_contents()
+        if isinstance(contents, EncodedStreamObject):
+            # Keep the compressed bytes as-is; nothing is decoded or parsed
+            form = EncodedStreamObject()
+            form._data = contents._data
+            for key in ("/Filter", "/DecodeParms"):
+                if key in contents:
+                    form[NameObject(key)] = contents[key].clone(self._holder)
+        else:
+            form = DecodedStreamObject()
+            if isinstance(contents, ArrayObject):
+                form.set_data(b"\n".join(s.get_object().get_data() for s in contents))
+            elif contents is not None:
+                form.set_data(contents.get_data())
+
+        form[NameObject("/Type")] = NameObject("/XObject")
+        form[NameObject("/Subtype")] = NameObject("/Form")
+        form[NameObject("/BBox")] = page.mediabox
+        form[NameObject("/Resources")] = page.get("/Resources", DictionaryObject()).clone(self._holder)
+        if "/Group" in page:
+            form[NameObject("/Group")] = page["/Group"].clone(self._holder)
+        return form
+
+    def _compile(self):
+        # Serialise the overlay and everything it references once, keyed by
+        # object number, so ReportLab documents can embed it without walking
+        # PyPDF2 objects on every render.
+        objects = {}
+        pending = [self.form]
+        while pending:
+            ref = pending.pop()
+            if ref.idnum in objects:
+                continue
+            obj = ref.get_object()
+            parts, refs = [], []
+            _serialize(obj, parts, refs)
+            data = obj._data if isinstance(obj, StreamObject) else None
+            objects[ref.idnum] = (parts, data)
+            pending.extend(refs)
+        return objects
+
+    def stamp(self, page, output):
+        """
+        Resize ``page`` to the letterhead and draw the overlay beneath its
+        content. ``output`` is the writer the page is about to be added to.
+        """
+        page.mediabox.lower_left = (0, 0)
+        page.mediabox.upper_right = (self.width, self.height)
+        for box in ("/CropBox", "/TrimBox", "/BleedBox", "/ArtBox"):
+            if box in page:
+                del page[box]
+
+        resources = page.setdefault(NameObject("/Resources"), DictionaryObject()).get_object()
+        xobjects = resources.setdefault(NameObject("/XObject"), DictionaryObject()).get_object()
+        xobjects[NameObject(LETTERHEAD_XOBJECT)] = self.form
+
+        underlay = DecodedStreamObject()
+        underlay.set_data(f"q {LETTERHEAD_XOBJECT} Do Q\n".encode())
+
+        contents = page.get("/Contents")
+        streams = ArrayObject([output._add_object(underlay)])
+        if contents is not None:
+            contents = contents.get_object()
+            if isinstance(contents, ArrayObject):
+                streams.extend(contents)
+            else:
+                streams.append(page["/Contents"])
+        page[NameObject("/Contents")] = streams
+
+    def draw(self, canvas):
+        """
+        Draw the letterhead on the current page of a ReportLab ``canvas``.
+        The overlay is copied into the canvas' document on first use and
+        every later page reuses the same form XObject.
+        """
+        document = canvas._doc
+        if not canvas.hasForm(LETTERHEAD_FORM):
+            references = {}
+            for idnum, (parts, data) in self._objects.items():
+                name = document.getXObjectName(LETTERHEAD_FORM) if idnum == self.form.idnum else None
+                references[idnum] = document.Reference(
+                    _ImportedObject(parts, data, references), name
+                )
+
+        canvas.setPageSize((float(self.width), float(self.height)))
+        canvas.doForm(LETTERHEAD_FORM)
+
+
+_letterheads = {}
+_letterheads_lock = threading.Lock()
+
+
+def get_letterhead(path=LETTERHEAD_PATH):
+    """
+    Return the cached :class:`Letterhead` for ``path``, re-parsing it only
+    when the file's mtime changes.
+    """
+    mtime = os.path.getmtime(path)
+    letterhead = _letterheads.get(path)
+    if letterhead is not None and letterhead.version == mtime:
+        return letterhead
+
+    with _letterheads_lock:
+        letterhead = _letterheads.get(path)
+        if letterhead is None or letterhead.version != mtime:
+            letterhead = Letterhead(path, mtime)
+            _letterheads[path] = letterhead
+        return letterhead
+
+
+def clear_letterhead_cache():
+    with _letterheads_lock:
+        _letterheads.clear()
+
+
+def generate_quotation_pdf(data, single_pass=True, letterhead=None):
+    """
+    Render ``data`` on ``letterhead`` (default: the GIC letterhead). With
+    ``single_pass=False`` the original two-pass render runs instead: build
+    the content, then merge the letterhead page into each page with PyPDF2.
+    """
+    letterhead = letterhead or get_letterhead()
+
+    # ------------------------------------------------------
+    # SINGLE PASS: LETTERHEAD DRAWN AS A PAGE TEMPLATE
+    # ------------------------------------------------------
+    if single_pass:
+        return build_quotation_content(data, on_page=lambda canvas, doc: letterhead.draw(canvas))
+
+    return merge_letterhead(build_quotation_content(data), letterhead)
+
+
+# ------------------------------------------------------
+# TWO PASS: BUILD CONTENT, THEN MERGE OR STAMP WITH PyPDF2
+# ------------------------------------------------------
+def _write(output):
+    final_buffer = BytesIO()
+    output.write(final_buffer)
+    final_buffer.seek(0)
+
+    return final_buffer
+
+
+def merge_letterhead(content, letterhead):
+    """The original render: merge a freshly parsed letterhead page under each content page."""
+    content_pdf = PdfReader(content)
+    letterhead_pdf = PdfReader(BytesIO(letterhead.source))
+
+    output = PdfWriter()
+
+    for page in content_pdf.pages:
+        merged_page = PageObject.create_blank_page(
+            width=letterhead_pdf.pages[0].mediabox.width,
+            height=letterhead_pdf.pages[0].mediabox.height
+        )
+        merged_page.merge_page(letterhead_pdf.pages[0])
+        merged_page.merge_page(page)
+        output.add_page(merged_page)
+
+    return _write(output)
+
+
+def stamp_letterhead(content, letterhead):
+    """Draw the cached letterhead XObject under each content page, without re-parsing it."""
+    content_pdf = PdfReader(content)
+
+    output = PdfWriter()
+
+    for page in content_pdf.pages:
+        letterhead.stamp(page, output)
+        output.add_page(page)
+
+    return _write(output)
+
+
+def build_quotation_content(data, on_page=None):
     buffer = BytesIO()
 
     # ------------------------------------------------------
@@ -159,35 +445,10 @@ def generate_quotation_pdf(data):
 
     elements.append(KeepTogether(signature_block))
 
-    # ------------------------------------------------------
-    # BUILD PDF CONTENT (WITHOUT LETTERHEAD)
-    # ------------------------------------------------------
-    doc.build(elements)
+    if on_page:
+        doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
+    else:
+        doc.build(elements)
 
-    # ------------------------------------------------------
-    # MERGE WITH LETTERHEAD PDF
-    # ------------------------------------------------------
     buffer.seek(0)
-    content_pdf = PdfReader(buffer)
-
-    letterhead_path = os.path.join(settings.BASE_DIR, "quotes", "static", "quotes", "GIC Letterhead new.pdf")
-    letterhead_pdf = PdfReader(letterhead_path)
-
-    output = PdfWriter()
-
-    for page_number in range(len(content_pdf.pages)):
-        merged_page = PageObject.create_blank_page(
-            width=letterhead_pdf.pages[0].mediabox.width,
-            height=letterhead_pdf.pages[0].mediabox.height
-        )
-
-        merged_page.merge_page(letterhead_pdf.pages[0])
-        merged_page.merge_page(content_pdf.pages[page_number])
-
-        output.add_page(merged_page)
-
-    final_buffer = BytesIO()
-    output.write(final_buffer)
-    final_buffer.seek(0)
-
-    return final_buffer
+    return buffer
@@ -0,0 +1,113 @@
+# quotes/pdf_jobs.py
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import PdfRenderJob
+from .pdf_worker import init_worker, render_job
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = getattr(settings, "QUOTATION_PDF_WORKERS", 2)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# -----------------------------------------------------
+# LOCAL PROCESS POOL
+# -----------------------------------------------------
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawn, not fork: a web worker has threads and open database
+            # connections that a forked child would inherit mid-use
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return _executor
+
+
+def _reset_executor():
+    # A crashed pool (worker killed, OOM) refuses new work; start a fresh one
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _finish(job_id, future, submitter):
+    try:
+        key = future.result()
+        PdfRenderJob.objects.filter(pk=job_id).update(
+            status="done", cache_key=key, finished_at=timezone.now()
+        )
+    except Exception as exc:
+        logger.exception("PDF render job %s failed", job_id)
+        PdfRenderJob.objects.filter(pk=job_id).update(
+            status="failed", error=str(exc) or exc.__class__.__name__, finished_at=timezone.now()
+        )
+    finally:
+        # Normally on the executor's callback thread, which owns its own
+        # connection. A future that was already done when the callback was
+        # added runs it on the submitting (request) thread: keep that one open.
+        if threading.get_ident() != submitter:
+            connection.close()
+
+
+# -----------------------------------------------------
+# PUBLIC API
+# -----------------------------------------------------
+def enqueue_render(data, letterhead_name, user, quotation=None):
+    """
+    Record a render job and hand it to the process pool. Returns the job
+    immediately; the status endpoint reports when the PDF is ready.
+    """
+    job = PdfRenderJob.objects.create(
+        quotation=quotation,
+        requested_by=user,
+        payload=data,
+        letterhead=letterhead_name or "",
+    )
+    submit(job)
+    return job
+
+
+def submit(job):
+    try:
+        future = _get_executor().submit(render_job, job.payload, job.letterhead)
+    except Exception:
+        # Leave the job queued; `process_pdf_jobs` will pick it up
+        logger.exception("Could not submit PDF render job %s", job.pk)
+        _reset_executor()
+        return False
+
+    PdfRenderJob.objects.filter(pk=job.pk, status="queued").update(status="running")
+    job.status = "running"
+    future.add_done_callback(
+        lambda f, job_id=job.pk, submitter=threading.get_ident(): _finish(job_id, f, submitter)
+    )
+    return True
+
+
+def run_inline(job):
+    """Render a job in the current process (used by the management command)."""
+    job.status = "running"
+    job.save(update_fields=["status"])
+    try:
+        job.cache_key = render_job(job.payload, job.letterhead)
+        job.status = "done"
+    except Exception as exc:
+        logger.exception("PDF render job %s failed", job.pk)
+        job.status = "failed"
+        job.error = str(exc) or exc.__class__.__name__
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "cache_key", "error", "finished_at"])
+    return job
@@ -0,0 +1,40 @@
+# quotes/pdf_worker.py
+#
+# Entry points executed inside the PDF process pool. Kept free of model
+# imports so the module can be unpickled before Django is set up.
+import django
+
+_uploaded_letterheads = {}
+
+
+def init_worker():
+    django.setup()
+
+
+def resolve_letterhead(file_name):
+    from .letterheads import parse_upload
+    from .pdf_generator import get_letterhead
+
+    if not file_name:
+        return get_letterhead()
+
+    # Uploads always get a fresh storage name, so the name alone is a safe key
+    letterhead = _uploaded_letterheads.get(file_name)
+    if letterhead is None:
+        letterhead = parse_upload(file_name)
+        _uploaded_letterheads[file_name] = letterhead
+    return letterhead
+
+
+def render_job(data, letterhead_name):
+    """Render ``data`` into the rendered-PDF cache and return its cache key."""
+    from .pdf_cache import render_to_cache
+
+    return render_to_cache(data, resolve_letterhead(letterhead_name))
+
+
+def render_pdf(data, letterhead_name):
+    """Render ``data`` and return the PDF bytes (bulk export, bypasses the cache)."""
+    from .pdf_generator import generate_quotation_pdf
+
+    return generate_quotation_pdf(data, letterhead=resolve_letterhead(letterhead_name)).getvalue()
@@ -0,0 +1,182 @@
+# quotes/pricing.py
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .catalog import invalidate_catalog
+from .dashboard import invalidate_salesperson_stats
+from .models import ProductNew, ProductPrice, Quotation, QuotationLine
+
+VAT_RATE = Decimal("0.05")
+CENTS = Decimal("0.001")
+
+REVALUE_CHUNK_SIZE = 200
+
+
+def end_of_day(day):
+    """The last moment of ``day`` in the current time zone, for "as of" lookups."""
+    start = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start - timedelta(microseconds=1)
+
+
+# -----------------------------------------------------
+# PRICE AS OF
+# -----------------------------------------------------
+def price_as_of(product_id, when=None):
+    """List price of one product at ``when`` (default now); ``None`` if it had none yet."""
+    return (
+        ProductPrice.objects.filter(product_id=product_id, effective_from__lte=when or timezone.now())
+        .order_by("-effective_from", "-id")
+        .values_list("unit_price", flat=True)
+        .first()
+    )
+
+
+def prices_as_of(product_ids=None, when=None):
+    """
+    ``{product_id: price}`` at ``when`` for ``product_ids`` (all products when
+    None), in one query: a per-product index lookup on (product, effective_from).
+    """
+    latest = ProductPrice.objects.filter(
+        product=OuterRef("pk"), effective_from__lte=when or timezone.now()
+    ).order_by("-effective_from", "-id")
+
+    products = ProductNew.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    return {
+        # SQLite hands the subquery value back unscaled (10 rather than 10.000)
+        pk: price.quantize(CENTS) if price is not None else None
+        for pk, price in products.annotate(price=Subquery(latest.values("unit_price")[:1])).values_list("pk", "price")
+    }
+
+
+def record_prices(products, when=None, user=None):
+    """Append the current ``unit_price`` of each product (after bulk writes)."""
+    when = when or timezone.now()
+    return ProductPrice.objects.bulk_create([
+        ProductPrice(product_id=p.pk, unit_price=p.unit_price, effective_from=when, created_by=user)
+        for p in products
+    ])
+
+
+@receiver(post_save, sender=ProductNew)
+def product_saved(sender, instance, created, **kwargs):
+    # A new product, or an edit that moved the price, starts a new price row
+    try:
+        price = Decimal(str(instance.unit_price))
+    except InvalidOperation:
+        return
+    if created or price_as_of(instance.pk) != price:
+        ProductPrice.objects.create(product=instance, unit_price=price)
+
+
+def sync_catalog_prices(when=None, dry_run=False):
+    """
+    Copy the price in effect at ``when`` onto ProductNew.unit_price wherever
+    a dated price has since taken effect. Returns the changed product ids.
+    """
+    current = {pk: price for pk, price in prices_as_of(when=when).items() if price is not None}
+    stale = [
+        p for p in ProductNew.objects.filter(pk__in=current).only("id", "unit_price")
+        if p.unit_price != current[p.pk]
+    ]
+    for product in stale:
+        product.unit_price = current[product.pk]
+
+    if stale and not dry_run:
+        # bulk_update skips post_save, so no duplicate price rows are appended
+        ProductNew.objects.bulk_update(stale, ["unit_price"], batch_size=500)
+        invalidate_catalog()
+    return [p.pk for p in stale]
+
+
+# -----------------------------------------------------
+# DRAFT REVALUATION
+# -----------------------------------------------------
+def _decimal(value, default="0"):
+    try:
+        return Decimal(str(value if value not in (None, "") else default))
+    except InvalidOperation:
+        return Decimal(default)
+
+
+def revalue_items(items, prices):
+    """
+    Reprice the ``Quotation.products`` lines whose product is in ``prices``,
+    keeping each line's discount and quantity. Returns True if any changed.
+    """
+    changed = False
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        price = prices.get(item.get("product_id"))
+        if price is None or _decimal(item.get("unit_price")) == price:
+            continue
+        discount = _decimal(item.get("discount"))
+        qty = _decimal(item.get("qty"), "1")
+        total = (price * (1 - discount / 100) * qty).quantize(CENTS)
+
+        item["unit_price"] = float(price)
+        item["total"] = float(total)
+        changed = True
+    return changed
+
+
+def quotation_total(items):
+    subtotal = sum((_decimal(item.get("total")) for item in items), Decimal("0"))
+    return subtotal + (subtotal * VAT_RATE).quantize(CENTS)
+
+
+def revalue_drafts(product_ids=None, when=None, dry_run=False, chunk_size=REVALUE_CHUNK_SIZE):
+    """
+    Reprice every draft quotation line for ``product_ids`` (default: every
+    product on a draft) at the list price in effect at ``when``. Drafts are
+    rewritten a chunk at a time with bulk updates. Returns the ids of the
+    drafts that changed (or would change, on a dry run).
+    """
+    line_filter = {"lines__product__isnull": False}
+    if product_ids is not None:
+        line_filter = {"lines__product_id__in": product_ids}
+    drafts = Quotation.objects.filter(status="draft", **line_filter)
+    draft_ids = list(drafts.order_by("id").values_list("id", flat=True).distinct())
+
+    if product_ids is None:
+        product_ids = QuotationLine.objects.filter(
+            quotation__status="draft", product__isnull=False
+        ).values_list("product_id", flat=True).distinct()
+    prices = {pk: price for pk, price in prices_as_of(product_ids, when).items() if price is not None}
+
+    revalued = []
+    for start in range(0, len(draft_ids), chunk_size):
+        with transaction.atomic():
+            # Re-read under lock; a draft sent meanwhile is left alone
+            batch = list(
+                Quotation.objects.select_for_update()
+                .filter(id__in=draft_ids[start:start + chunk_size], status="draft")
+                .only("id", "products", "total_amount", "salesperson_id")
+            )
+            changed = []
+            for quotation in batch:
+                if revalue_items(quotation.products, prices):
+                    quotation.total_amount = quotation_total(quotation.products)
+                    changed.append(quotation)
+            revalued.extend(q.id for q in changed)
+
+            if dry_run or not changed:
+                continue
+
+            Quotation.objects.bulk_update(changed, ["products", "total_amount"])
+            QuotationLine.objects.filter(quotation__in=changed).delete()
+            QuotationLine.objects.bulk_create(QuotationLine.build_for(changed))
+
+        if not dry_run:
+            for salesperson_id in {q.salesperson_id for q in changed}:
+                invalidate_salesperson_stats(salesperson_id)
+
+    return revalued
@@ -0,0 +1,297 @@
+# quotes/product_io.py
+import csv
+import io
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .catalog import GLOBAL, invalidate_catalog
+from .dashboard import adjust_stat
+from .models import ProductNew
+from .pricing import record_prices
+from .search import index_entries, product_entry
+
+# Column order of exports; imports accept them in any order
+COLUMNS = ["name", "pack_size", "country", "description", "unit_price", "unit"]
+REQUIRED_COLUMNS = {"name", "unit_price"}
+
+# Everything except the natural key (name, pack_size, country)
+UPDATABLE_FIELDS = ["description", "unit_price", "unit"]
+
+CHUNK_SIZE = 500        # rows per lookup/bulk write; below SQLite's 999 variable limit
+MAX_REPORTED = 100      # changes and errors listed individually in a report
+
+FORMATS = ("csv", "xlsx")
+
+
+def file_format(filename, fmt=None):
+    """``fmt`` if given, else the file extension; ValueError when unsupported."""
+    fmt = (fmt or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt or '(none)'!r}; use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def _load_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("XLSX files need the openpyxl package (pip install openpyxl).")
+    return openpyxl
+
+
+# -----------------------------------------------------
+# READING (ONE ROW AT A TIME)
+# -----------------------------------------------------
+def _records(header, rows):
+    if header is None:
+        raise ValueError("The file is empty.")
+
+    header = [str(cell or "").strip().lower() for cell in header]
+    missing = REQUIRED_COLUMNS - set(header)
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+    for line, values in enumerate(rows, start=2):
+        if all(value in (None, "") for value in values):
+            continue
+        yield line, {
+            name: values[i] if i < len(values) else None
+            for i, name in enumerate(header) if name in COLUMNS
+        }
+
+
+def read_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        yield from _records(next(reader, None), reader)
+    finally:
+        text.detach()   # leave the caller's file open
+
+
+def read_xlsx(fileobj):
+    workbook = _load_openpyxl().load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        yield from _records(next(rows, None), rows)
+    finally:
+        workbook.close()
+
+
+def read_products(fileobj, fmt):
+    """``(line number, {column: value})`` for each non-blank row of a binary file."""
+    return read_xlsx(fileobj) if fmt == "xlsx" else read_csv(fileobj)
+
+
+# -----------------------------------------------------
+# VALIDATION
+# -----------------------------------------------------
+def _text(data, column):
+    value = data.get(column)
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)   # spreadsheets turn a pack size of 20 into 20.0
+    return str(value).strip()
+
+
+def clean_record(data):
+    """Model field values for one row; ValueError describes the first problem."""
+    values = {
+        "name": _text(data, "name"),
+        "pack_size": _text(data, "pack_size"),
+        "country": _text(data, "country") or GLOBAL,
+        "description": _text(data, "description"),
+        "unit": _text(data, "unit") or ProductNew._meta.get_field("unit").default,
+    }
+    if not values["name"]:
+        raise ValueError("name is required")
+
+    for field, value in values.items():
+        max_length = ProductNew._meta.get_field(field).max_length
+        if max_length and len(value) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters")
+
+    raw_price = _text(data, "unit_price")
+    try:
+        price = Decimal(raw_price).quantize(Decimal("0.001"))
+    except InvalidOperation:
+        raise ValueError(f"unit_price {raw_price!r} is not a number")
+    if not price.is_finite() or price < 0 or price >= Decimal("10000000"):
+        raise ValueError(f"unit_price {raw_price!r} is out of range")
+    values["unit_price"] = price
+
+    return values
+
+
+def natural_key(name, pack_size, country):
+    return (name, pack_size or "", country)
+
+
+def _comparable(value):
+    return "" if value is None else value
+
+
+# -----------------------------------------------------
+# IMPORT
+# -----------------------------------------------------
+class ImportReport:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.changes = []   # (line, "create"/"update", key, changed fields)
+        self.errors = []    # (line, message)
+
+    def change(self, line, action, key, fields=()):
+        if len(self.changes) < MAX_REPORTED:
+            self.changes.append((line, action, key, list(fields)))
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED:
+            self.errors.append((line, message))
+
+    def summary(self):
+        verb = "would be" if self.dry_run else "were"
+        return (
+            f"{self.created} product(s) {verb} created, {self.updated} {verb} updated, "
+            f"{self.unchanged} unchanged, {self.error_count} row(s) skipped with errors."
+        )
+
+    def lines(self):
+        """The summary followed by the listed changes and errors, for printing."""
+        yield self.summary()
+        for line, action, (name, pack, country), fields in self.changes:
+            detail = f" ({', '.join(fields)})" if fields else ""
+            yield f"  line {line}: {action} {name} / {pack or '-'} / {country}{detail}"
+        for line, message in self.errors:
+            yield f"  line {line}: error: {message}"
+        hidden = (self.created + self.updated - len(self.changes)) + (self.error_count - len(self.errors))
+        if hidden > 0:
+            yield f"  ... and {hidden} more"
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _import_chunk(chunk, report, seen, dry_run):
+    rows = []
+    for line, data in chunk:
+        try:
+            values = clean_record(data)
+        except ValueError as exc:
+            report.error(line, str(exc))
+            continue
+
+        key = natural_key(values["name"], values["pack_size"], values["country"])
+        if key in seen:
+            report.error(line, f"same name/pack size/country as line {seen[key]}")
+            continue
+        seen[key] = line
+        rows.append((line, key, values))
+
+    existing = {}
+    for product in ProductNew.objects.filter(
+        name__in={v["name"] for _, _, v in rows},
+        country__in={v["country"] for _, _, v in rows},
+    ).order_by("id"):
+        # Older duplicates of a key (the table has no unique constraint) keep the first
+        existing.setdefault(natural_key(product.name, product.pack_size, product.country), product)
+
+    to_create, to_update, repriced = [], [], set()
+    for line, key, values in rows:
+        product = existing.get(key)
+        if product is None:
+            to_create.append(ProductNew(**values))
+            report.created += 1
+            report.change(line, "create", key)
+            continue
+
+        changed = [f for f in UPDATABLE_FIELDS if _comparable(getattr(product, f)) != values[f]]
+        if not changed:
+            report.unchanged += 1
+            continue
+        for field in changed:
+            setattr(product, field, values[field])
+        if "unit_price" in changed:
+            repriced.add(product.pk)
+        to_update.append(product)
+        report.updated += 1
+        report.change(line, "update", key, changed)
+
+    if not dry_run:
+        ProductNew.objects.bulk_create(to_create)
+        ProductNew.objects.bulk_update(to_update, UPDATABLE_FIELDS)
+        record_prices(to_create + [p for p in to_update if p.pk in repriced])
+        index_entries(product_entry(p) for p in to_create + to_update)
+
+
+def import_products(records, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Create or update products from ``records`` (see ``read_products``),
+    matching on name + pack size + country. Invalid rows are skipped and
+    reported. Applied in one transaction; nothing is written on a dry run.
+    """
+    report = ImportReport(dry_run)
+    seen = {}
+
+    with transaction.atomic():
+        for chunk in _chunks(records, chunk_size):
+            _import_chunk(chunk, report, seen, dry_run)
+
+        if not dry_run and (report.created or report.updated):
+            # bulk_create/bulk_update skip the model signals (price rows and
+            # search entries are written per chunk above)
+            invalidate_catalog()
+            adjust_stat("products", report.created)
+
+    return report
+
+
+# -----------------------------------------------------
+# EXPORT
+# -----------------------------------------------------
+def export_rows(country=None):
+    """The header, then one list per product; read from the database in batches."""
+    products = ProductNew.objects.order_by("country", "name", "pack_size", "id")
+    if country:
+        products = products.filter(country=country)
+
+    yield list(COLUMNS)
+    for row in products.values_list(*COLUMNS).iterator(chunk_size=2000):
+        yield ["" if value is None else value for value in row]
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(rows, fileobj):
+    # write_only keeps memory flat; rows go to disk as they are appended
+    workbook = _load_openpyxl().Workbook(write_only=True)
+    sheet = workbook.create_sheet("Products")
+    for row in rows:
+        sheet.append(row)
+    workbook.save(fileobj)
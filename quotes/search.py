@@ -0,0 +1,232 @@
+# quotes/search.py
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .catalog import GLOBAL
+from .models import Client, ProductNew, Quotation, SearchEntry
+
+SEARCH_PAGE_SIZE = getattr(settings, "SEARCH_PAGE_SIZE", 20)
+MAX_SEARCH_PAGE_SIZE = 100
+INDEX_BATCH_SIZE = 500
+
+KINDS = [kind for kind, _label in SearchEntry.KIND_CHOICES]
+TERM = re.compile(r"\w+")
+
+
+# -----------------------------------------------------
+# DOCUMENTS
+# -----------------------------------------------------
+def _join(*parts):
+    return "\n".join(str(part) for part in parts if part)
+
+
+def client_entry(client):
+    return SearchEntry(
+        kind="client", object_id=client.pk,
+        title=client.company_name[:255],
+        body=_join(client.contact_person, client.email, client.phone),
+        salesperson_id=client.salesperson_id,
+    )
+
+
+def product_entry(product):
+    return SearchEntry(
+        kind="product", object_id=product.pk,
+        title=product.name[:255],
+        body=_join(product.pack_size, product.description),
+        country=product.country or "",
+    )
+
+
+def quotation_entry(quotation, client_name=None):
+    if client_name is None and quotation.client_id:
+        client_name = quotation.client.company_name
+    lines = [
+        _join(item.get("name"), item.get("desc"))
+        for item in quotation.products or [] if isinstance(item, dict)
+    ]
+    return SearchEntry(
+        kind="quotation", object_id=quotation.pk,
+        title=f"Quotation #{quotation.pk}",
+        body=_join(quotation.pk, client_name, *lines),
+        salesperson_id=quotation.salesperson_id,
+        country=quotation.country or "",
+    )
+
+
+# -----------------------------------------------------
+# KEEPING THE INDEX CURRENT
+# -----------------------------------------------------
+def index_entries(entries, using=DEFAULT_DB_ALIAS):
+    """Replace the index rows for ``entries`` (delete + bulk insert, in batches)."""
+    entries = list(entries)
+    index = SearchEntry.objects.using(using)
+    for start in range(0, len(entries), INDEX_BATCH_SIZE):
+        batch = entries[start:start + INDEX_BATCH_SIZE]
+        for kind in {e.kind for e in batch}:
+            index.filter(kind=kind, object_id__in=[e.object_id for e in batch if e.kind == kind]).delete()
+        index.bulk_create(batch)
+
+
+def index_client_quotations(client, using=DEFAULT_DB_ALIAS):
+    """A renamed client changes the text of all of its quotations."""
+    quotations = Quotation.objects.using(using).filter(client=client).only(
+        "id", "products", "salesperson_id", "country", "client_id"
+    )
+    index_entries((quotation_entry(q, client.company_name) for q in quotations.iterator()), using)
+
+
+def index_clients(clients, renamed=()):
+    """Index ``clients`` and the quotations of ``renamed`` ones, after bulk writes."""
+    index_entries(client_entry(c) for c in clients)
+    names = {c.pk: c.company_name for c in renamed}
+    quotations = Quotation.objects.filter(client_id__in=names).only(
+        "id", "products", "salesperson_id", "country", "client_id"
+    )
+    index_entries(quotation_entry(q, names[q.client_id]) for q in quotations.iterator())
+
+
+def unindex(kind, object_ids, using=DEFAULT_DB_ALIAS):
+    SearchEntry.objects.using(using).filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+
+def rebuild_index():
+    """Reindex every client, product and quotation from scratch."""
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        index_entries(client_entry(c) for c in Client.objects.iterator())
+        index_entries(product_entry(p) for p in ProductNew.objects.iterator())
+        index_entries(
+            quotation_entry(q) for q in Quotation.objects.select_related("client").iterator(chunk_size=INDEX_BATCH_SIZE)
+        )
+    return SearchEntry.objects.count()
+
+
+# The receivers index into the database the change was written to (``using``)
+@receiver(pre_save, sender=Client)
+def client_before_save(sender, instance, update_fields=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    # The name as stored, so post_save reindexes quotations only on a rename
+    renaming = instance.pk and (update_fields is None or "company_name" in update_fields)
+    instance._search_previous_name = (
+        sender.objects.using(using).filter(pk=instance.pk).values_list("company_name", flat=True).first()
+        if renaming else None
+    )
+
+
+@receiver(post_save, sender=Client)
+def client_saved(sender, instance, created, using=DEFAULT_DB_ALIAS, **kwargs):
+    index_entries([client_entry(instance)], using)
+    previous = getattr(instance, "_search_previous_name", None)
+    if not created and previous is not None and previous != instance.company_name:
+        index_client_quotations(instance, using)
+
+
+@receiver(post_save, sender=ProductNew)
+def product_saved(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    index_entries([product_entry(instance)], using)
+
+
+@receiver(post_save, sender=Quotation)
+def quotation_saved(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    index_entries([quotation_entry(instance)], using)
+
+
+@receiver(pre_delete, sender=Client)
+def client_before_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # SET_NULL detaches the client's quotations with a plain UPDATE (no signals)
+    instance._search_quotation_ids = list(
+        Quotation.objects.using(using).filter(client=instance).values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Client)
+def client_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    unindex("client", [instance.pk], using)
+    quotations = Quotation.objects.using(using).filter(id__in=getattr(instance, "_search_quotation_ids", []))
+    index_entries((quotation_entry(q, "") for q in quotations.iterator()), using)
+
+
+@receiver(post_delete, sender=ProductNew)
+@receiver(post_delete, sender=Quotation)
+def object_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    kind = {ProductNew: "product", Quotation: "quotation"}[sender]
+    unindex(kind, [instance.pk], using)
+
+
+# -----------------------------------------------------
+# QUERYING
+# -----------------------------------------------------
+def visible_entries(user):
+    """Index rows ``user`` may see, mirroring the client/quotation/product views."""
+    entries = SearchEntry.objects.all()
+    if user.role == "salesperson":
+        entries = entries.filter(
+            Q(kind__in=["client", "quotation"], salesperson=user)
+            | Q(kind="product", country__in=[user.country, GLOBAL])
+        )
+    elif user.role != "admin":
+        entries = entries.filter(~Q(kind="product") | Q(country__in=[user.country, GLOBAL]))
+    return entries
+
+
+def _postgres_ranked(entries, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+    # Every term as a prefix: "acm oil" finds "ACME Trading" quoting "Oil Filter"
+    query = SearchQuery(" & ".join(f"{t}:*" for t in terms), search_type="raw", config="simple")
+    vector = RawSQL('"quotes_searchentry"."search_vector"', [], output_field=SearchVectorField())
+    return entries.annotate(vector=vector, rank=SearchRank(vector, query)).filter(vector=query)
+
+
+def _sqlite_ranked(entries, terms):
+    match = " ".join(f'"{t}"*' for t in terms)
+    # A plain join against the FTS5 table; bm25() is lower-is-better and
+    # weighs title hits ten times body hits
+    return entries.extra(
+        tables=["quotes_searchentry_fts"],
+        where=["quotes_searchentry_fts.rowid = quotes_searchentry.id", "quotes_searchentry_fts MATCH %s"],
+        params=[match],
+        select={"rank": "-bm25(quotes_searchentry_fts, 10.0, 1.0)"},
+    )
+
+
+def _fallback_ranked(entries, terms):
+    for term in terms:
+        entries = entries.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return entries.annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search(user, query, kinds=None):
+    """Index rows matching every word of ``query`` that ``user`` may see, best first."""
+    terms = TERM.findall((query or "").lower())
+    if not terms:
+        return SearchEntry.objects.none()
+
+    entries = visible_entries(user)
+    if kinds:
+        entries = entries.filter(kind__in=kinds)
+
+    ranked = {"postgresql": _postgres_ranked, "sqlite": _sqlite_ranked}.get(connection.vendor, _fallback_ranked)
+    return ranked(entries, terms).order_by("-rank", "-id")
+
+
+def search_page(results, params):
+    """``(rows, page, has_more)`` for the ``page``/``limit`` in ``params``."""
+    try:
+        size = max(1, min(int(params.get("limit", SEARCH_PAGE_SIZE)), MAX_SEARCH_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = SEARCH_PAGE_SIZE
+    try:
+        page = max(1, int(params.get("page", 1)))
+    except (TypeError, ValueError):
+        page = 1
+
+    offset = (page - 1) * size
+    rows = list(results[offset:offset + size + 1])
+    return rows[:size], page, len(rows) > size
@@ -1,36 +1,37 @@
 # quotes/signals.py
+import ipaddress
+
 from django.contrib.auth.signals import user_logged_in
 from django.dispatch import receiver
 from .models import LoginIP
-import requests
+from .geolocation import PENDING, resolve_location, schedule_resolution
+
+def _valid_ip(value):
+    try:
+        return str(ipaddress.ip_address((value or "").strip()))
+    except ValueError:
+        return None
 
 def get_client_ip(request):
+    # X-Forwarded-For is client-controlled: a malformed value must not reach
+    # the GenericIPAddressField (inet on Postgres) and fail the login
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+        ip = _valid_ip(x_forwarded_for.split(',')[0])
+        if ip:
+            return ip
+    return _valid_ip(request.META.get('REMOTE_ADDR'))
 
 def get_ip_location(ip):
-    # Handle local IP for development
-    if ip in ('127.0.0.1', '::1'):
-        return "Localhost, Development"
-
-    # Query external API for real IPs
-    try:
-        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=5)
-        data = response.json()
-        if data['status'] == 'success':
-            country = data.get('country', '')
-            city = data.get('city', '')
-            return f"{city}, {country}" if city else country
-        return "Unknown"
-    except requests.RequestException:
-        return "Unknown"
+    # Synchronous lookup through the configured resolver (see quotes/geolocation.py)
+    return resolve_location(ip)
 
 @receiver(user_logged_in)
 def save_login_ip(sender, request, user, **kwargs):
-    ip = get_client_ip(request)
-    location = get_ip_location(ip)
-    LoginIP.objects.create(user=user, ip_address=ip, location=location)
+    # ⚡ Never wait on the geolocation API during login: store the row now,
+    # fill in the location from a background thread
+    ip = get_client_ip(request) if request is not None else None
+    if not ip:
+        return   # e.g. programmatic logins without a client address
+    login_ip = LoginIP.objects.create(user=user, ip_address=ip, location=PENDING)
+    schedule_resolution(login_ip)
@@ -1,3 +1,1489 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import PyPDF2
+import reportlab
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas as pdf_canvas
+
+from .catalog import clear_catalog_cache, get_catalog
+from .dashboard import (
+    compute_salesperson_stats, dashboard_stats, invalidate_salesperson_stats, rebuild_stats, salesperson_breakdown,
+    salesperson_stats,
+)
+from .geolocation import (
+    LOCALHOST, PENDING, UNKNOWN, CachedResolver, CidrFileResolver, LocationResolver, StaticResolver,
+    resolve_and_store, resolve_location, set_resolver,
+)
+from . import letterheads, pdf_cache, pdf_export, pdf_jobs
+from .management.commands import benchmark_quotation_queries as benchmark
+from .letterheads import clear_letterhead_registry, letterhead_for_country, preload_letterheads
+from .pdf_generator import (
+    LETTERHEAD_XOBJECT, Letterhead, build_quotation_content, clear_letterhead_cache, generate_quotation_pdf,
+    get_letterhead, stamp_letterhead,
+)
+from .models import (
+    Client, Country, CustomUser, IPLocation, PdfRenderJob, LoginDailyRollup, LoginIP, ProductNew, ProductPrice, Quotation,
+    QuotationCounter, QuotationLine, SearchEntry,
+)
+from .pricing import end_of_day, price_as_of, revalue_drafts
+from .search import rebuild_index, search
+from .views import generate_qtn_number, reserve_qtn_numbers
+
+
+# -----------------------------------------------------
+# CREATE QUOTATION
+# -----------------------------------------------------
+class CreateQuotationProductLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="sales1", password="pass", role="salesperson", country="Oman"
+        )
+        cls.client_obj = Client.objects.create(
+            company_name="ACME", email="acme@example.com", phone="123",
+            address="Muscat", salesperson=cls.user,
+        )
+        cls.products = [
+            ProductNew.objects.create(name=f"Product {i}", unit_price=10, country="Oman")
+            for i in range(60)
+        ]
+
+    def setUp(self):
+        clear_catalog_cache()
+        self.client.login(username="sales1", password="pass")
+
+    def post_lines(self, product_ids):
+        n = len(product_ids)
+        return self.client.post(reverse("create_quotation"), {
+            "action": "save",
+            "client_id": self.client_obj.id,
+            "intro_text": "Dear Sir",
+            "closing_text": "Regards",
+            "product_id[]": product_ids,
+            "desc": ["desc"] * n,
+            "pack_size": ["20L"] * n,
+            "unit_price[]": ["10"] * n,
+            "discount[]": ["0"] * n,
+            "qty[]": ["1"] * n,
+            "total[]": ["10"] * n,
+        })
+
+    def count_queries(self, product_ids):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post_lines(product_ids)
+        self.assertRedirects(response, reverse("draft_list"), fetch_redirect_response=False)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        self.count_queries([self.products[0].id])   # creates the dashboard counter rows
+        one_line = self.count_queries([self.products[0].id])
+        sixty_lines = self.count_queries([p.id for p in self.products])
+
+        self.assertEqual(one_line, sixty_lines)
+        quotation = Quotation.objects.last()
+        self.assertEqual(len(quotation.products), 60)
+        self.assertEqual(quotation.lines.count(), 60)
+
+    def test_missing_product_is_rejected(self):
+        response = self.post_lines([self.products[0].id, 999999])
+
+        self.assertRedirects(response, reverse("create_quotation"), fetch_redirect_response=False)
+        self.assertFalse(Quotation.objects.exists())
+
+    def test_foreign_country_product_is_rejected(self):
+        foreign = ProductNew.objects.create(name="UAE Only", unit_price=5, country="UAE")
+        response = self.post_lines([self.products[0].id, foreign.id])
+
+        self.assertRedirects(response, reverse("create_quotation"), fetch_redirect_response=False)
+        self.assertFalse(Quotation.objects.exists())
+
+    def test_another_salespersons_client_is_rejected(self):
+        other = CustomUser.objects.create_user(username="sales2", password="pass", role="salesperson")
+        self.client_obj.salesperson = other
+        self.client_obj.save()
+
+        self.assertEqual(self.post_lines([self.products[0].id]).status_code, 404)
+        self.assertFalse(Quotation.objects.exists())
+
+
+# -----------------------------------------------------
+# CLIENT TYPE-AHEAD
+# -----------------------------------------------------
+class ClientSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+        other = CustomUser.objects.create_user(username="sales2", password="pass", role="salesperson")
+        CustomUser.objects.create_user(username="mgr", password="pass", role="salesmanager")
+        for i in range(3):
+            Client.objects.create(company_name=f"Acme {i}", contact_person=f"Person {i}",
+                                  email=f"{i}@acme.test", phone="1", address="-", salesperson=cls.user)
+        # Same company name under another salesperson
+        cls.rival = Client.objects.create(company_name="Acme 0", email="x@rival.test", phone="2",
+                                          address="-", salesperson=other)
+        Client.objects.create(company_name="Beta", email="b@beta.test", phone="3", address="-",
+                              salesperson=cls.user)
+
+    def test_results_are_scoped_paged_and_carry_contact_details(self):
+        self.client.login(username="sales1", password="pass")
+        data = self.client.get(reverse("client_search"), {"q": "acme", "limit": 2}).json()
+
+        self.assertEqual([c["company_name"] for c in data["results"]], ["Acme 0", "Acme 1"])
+        self.assertEqual(data["results"][0]["contact_person"], "Person 0")
+        self.assertEqual(data["results"][0]["email"], "0@acme.test")
+        more = self.client.get(data["next"]).json()
+        self.assertEqual([c["company_name"] for c in more["results"]], ["Acme 2"])
+        self.assertIsNone(more["next"])
+
+        self.client.login(username="mgr", password="pass")
+        data = self.client.get(reverse("client_search"), {"q": "acme 0"}).json()
+        self.assertEqual(len(data["results"]), 2)
+
+    def test_details_are_looked_up_by_id_within_scope(self):
+        self.client.login(username="sales1", password="pass")
+        mine = Client.objects.get(company_name="Acme 0", salesperson=self.user)
+
+        data = self.client.get(reverse("get-client-details"), {"id": mine.id}).json()
+        self.assertEqual(data["email"], "0@acme.test")
+        response = self.client.get(reverse("get-client-details"), {"id": self.rival.id})
+        self.assertEqual(response.status_code, 404)
+
+
+# -----------------------------------------------------
+# CLIENT BATCH API
+# -----------------------------------------------------
+class ClientBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+        cls.other = CustomUser.objects.create_user(username="sales2", password="pass", role="salesperson")
+        cls.mine = Client.objects.create(company_name="Acme", email="a@acme.test", phone="1", address="-",
+                                         salesperson=cls.user)
+        cls.theirs = Client.objects.create(company_name="Rival", email="r@rival.test", phone="2", address="-",
+                                           salesperson=cls.other)
+
+    def setUp(self):
+        self.client.login(username="sales1", password="pass")
+
+    def post(self, payload, url=None):
+        return self.client.post(url or reverse("client_batch"), payload, content_type="application/json")
+
+    def test_batch_is_applied_in_bulk_with_results_per_item(self):
+        quotation = Quotation.objects.create(salesperson=self.user, client=self.mine)
+        rows = [{"company_name": f"New {i}", "email": f"{i}@new.test", "phone": "9", "address": "-"}
+                for i in range(50)]
+
+        with CaptureQueriesContext(connection) as ten:
+            self.post({"create": rows[:10]})
+        with CaptureQueriesContext(connection) as fifty:
+            response = self.post({"create": rows[10:], "update": [{"id": self.mine.id, "company_name": "Acme Oman"}]})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["created"] * 40 + ["updated"])
+        self.assertEqual(Client.objects.filter(salesperson=self.user).count(), 51)
+        self.assertLessEqual(len(fifty.captured_queries), len(ten.captured_queries) + 6)
+        self.assertEqual(dashboard_stats()["clients"][""], 52)
+        self.assertEqual(
+            [(r.kind, r.object_id) for r in search(self.user, "oman")],
+            [("client", self.mine.id), ("quotation", quotation.id)],
+        )
+
+        response = self.post({"delete": [self.mine.id]})
+        self.assertEqual(response.json()["results"], [{"op": "delete", "index": 0, "id": self.mine.id,
+                                                       "status": "deleted"}])
+        self.assertFalse(Client.objects.filter(id=self.mine.id).exists())
+
+    def test_invalid_or_foreign_items_write_nothing(self):
+        response = self.post({
+            "create": [{"company_name": "Ok", "email": "ok@ok.test", "phone": "1", "address": "-"},
+                       {"company_name": "Bad", "email": "not-an-email", "phone": "1", "address": "-"}],
+            "update": [{"id": self.theirs.id, "company_name": "Mine now"}],
+            "delete": [self.mine.id],
+        })
+
+        self.assertEqual(response.status_code, 400)
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["skipped", "error", "error", "skipped"])
+        self.assertIn("email", results[1]["errors"])
+        self.assertEqual(results[2]["errors"], {"id": ["Client not found."]})
+        self.assertEqual(Client.objects.count(), 2)
+        self.theirs.refresh_from_db()
+        self.assertEqual(self.theirs.company_name, "Rival")
+
+    def test_single_row_endpoints_check_ownership(self):
+        response = self.post({"company_name": "x"}, reverse("edit_client_ajax", args=[self.theirs.id]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.delete(reverse("delete_client_ajax", args=[self.theirs.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Client.objects.filter(id=self.theirs.id).exists())
+
+        response = self.post({"company_name": "Solo", "contact_person": "", "email": "s@solo.test",
+                              "phone": "3", "address": "-"}, reverse("add_client_ajax"))
+        self.assertEqual(response.json()["client"]["company_name"], "Solo")
+
+
+# -----------------------------------------------------
+# PRODUCT SEARCH
+# -----------------------------------------------------
+class ProductSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="sales1", password="pass", role="salesperson", country="Oman"
+        )
+        ProductNew.objects.create(name="Hydraulic Oil", pack_size="20L", unit_price=10, country="Oman")
+        ProductNew.objects.create(name="Gear Oil", pack_size="200L", unit_price=12, country="Global")
+        ProductNew.objects.create(name="Oil Filter", description="Spin-on", unit_price=3, country="Oman")
+        ProductNew.objects.create(name="Oil Drum", pack_size="20L", unit_price=9, country="UAE")
+
+    def setUp(self):
+        clear_catalog_cache()
+        self.client.login(username="sales1", password="pass")
+
+    def search(self, **params):
+        return self.client.get(reverse("product_search"), params).json()
+
+    def test_scoped_to_country_and_prefix_matches_first(self):
+        names = [p["name"] for p in self.search(q="oil")["results"]]
+
+        self.assertEqual(names, ["Oil Filter", "Gear Oil", "Hydraulic Oil"])
+
+    def test_every_term_must_match_some_field(self):
+        self.assertEqual([p["name"] for p in self.search(q="oil 20l")["results"]], ["Hydraulic Oil"])
+        self.assertEqual([p["name"] for p in self.search(q="spin")["results"]], ["Oil Filter"])
+
+    def test_paging(self):
+        first = self.search(q="oil", limit=2)
+        second = self.client.get(first["next"]).json()
+
+        self.assertEqual(len(first["results"]), 2)
+        self.assertEqual([p["name"] for p in second["results"]], ["Hydraulic Oil"])
+        self.assertIsNone(second["next"])
+
+    def test_user_without_a_country_sees_only_global_products(self):
+        nowhere = CustomUser.objects.create_user(username="nowhere", password="pass", role="salesperson")
+        self.client.login(username="nowhere", password="pass")
+
+        self.assertEqual([p["name"] for p in self.search(q="oil")["results"]], ["Gear Oil"])
+        listed = [p.name for p in self.client.get(reverse("product_list")).context["products"]]
+        self.assertEqual(listed, ["Gear Oil"])
+        self.assertEqual([r.title for r in search(nowhere, "oil", kinds=["product"])], ["Gear Oil"])
+
+    def test_catalog_is_reused_until_a_product_changes(self):
+        catalog = get_catalog("Oman")
+        with self.assertNumQueries(1):   # the version check only
+            self.assertIs(get_catalog("Oman"), catalog)
+
+        product = ProductNew.objects.get(name="Gear Oil")
+        product.unit_price = 15
+        product.save()
+
+        reloaded = get_catalog("Oman")
+        self.assertIsNot(reloaded, catalog)
+        self.assertEqual([p.unit_price for p in reloaded.products if p.name == "Gear Oil"], [15])
+
+
+# -----------------------------------------------------
+# PRODUCT IMPORT / EXPORT
+# -----------------------------------------------------
+PRICE_LIST = (
+    "name,pack_size,country,unit_price,unit,description\n"
+    "Hydraulic Oil,20L,Oman,11.5,Litre,ISO 68\n"      # price change
+    "Gear Oil,200L,,12,Litre,\n"                      # unchanged (blank country = Global)
+    "Coolant,5L,Oman,4.250,Litre,Long life\n"         # new
+    "Coolant,5L,Oman,4.300,Litre,Long life\n"         # duplicate key
+    "Grease,,Oman,abc,KG,\n"                          # bad price
+)
+
+
+class ProductImportExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ProductNew.objects.create(name="Hydraulic Oil", pack_size="20L", unit_price=10, country="Oman",
+                                  description="ISO 68")
+        ProductNew.objects.create(name="Gear Oil", pack_size="200L", unit_price=12, country="Global")
+
+    def write_price_list(self):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w") as fh:
+            fh.write(PRICE_LIST)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_dry_run_reports_without_writing(self):
+        out = io.StringIO()
+        call_command("import_products", self.write_price_list(), dry_run=True, stdout=out)
+
+        self.assertIn("1 product(s) would be created, 1 would be updated, 1 unchanged, 2 row(s)", out.getvalue())
+        self.assertIn("line 5: error: same name/pack size/country as line 4", out.getvalue())
+        self.assertEqual(ProductNew.objects.count(), 2)
+
+    def test_import_applies_changes_and_refreshes_counters(self):
+        rebuild_stats()
+        call_command("import_products", self.write_price_list(), chunk_size=2, stdout=io.StringIO())
+
+        self.assertEqual(ProductNew.objects.get(name="Hydraulic Oil").unit_price, Decimal("11.500"))
+        self.assertEqual(ProductNew.objects.get(name="Coolant").unit_price, Decimal("4.250"))
+        self.assertEqual(dashboard_stats()["products"][""], 3)
+
+    def test_admin_upload_and_csv_export_round_trip(self):
+        admin = CustomUser.objects.create_superuser(username="root", password="pass", email="root@example.com")
+        self.client.force_login(admin)
+
+        response = self.client.post(reverse("admin:quotes_productnew_import"), {
+            "file": SimpleUploadedFile("prices.csv", PRICE_LIST.encode()),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["report"].created, 1)
+
+        response = self.client.get(reverse("admin:quotes_productnew_export"), {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "name,pack_size,country,description,unit_price,unit")
+        self.assertEqual(len(lines), 4)
+
+
+# -----------------------------------------------------
+# PRODUCT PRICE HISTORY
+# -----------------------------------------------------
+class ProductPriceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="sales1", password="pass", role="salesperson", country="Oman"
+        )
+        cls.product = ProductNew.objects.create(name="Hydraulic Oil", unit_price=10, country="Oman")
+        ProductPrice.objects.filter(product=cls.product).update(effective_from=timezone.now() - timedelta(days=30))
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def quote(self, status, discount=10, qty=2):
+        quotation = Quotation.objects.create(salesperson=self.user, status=status, products=[{
+            "product_id": self.product.id, "name": "Hydraulic Oil",
+            "unit_price": 10.0, "discount": discount, "qty": qty, "total": 18.0,
+        }])
+        QuotationLine.replace_for(quotation, quotation.products)
+        return quotation
+
+    def test_price_edits_are_appended_and_queryable_by_date(self):
+        self.product.unit_price = Decimal("12.5")
+        self.product.save()
+
+        last_week = timezone.localdate() - timedelta(days=7)
+        self.assertEqual(ProductPrice.objects.filter(product=self.product).count(), 2)
+        self.assertEqual(price_as_of(self.product.id, end_of_day(last_week)), Decimal("10"))
+        self.assertEqual(price_as_of(self.product.id), Decimal("12.5"))
+
+        self.client.login(username="sales1", password="pass")
+        data = self.client.get(reverse("product_prices"), {"ids": self.product.id, "date": last_week}).json()
+        self.assertEqual(data["prices"], {str(self.product.id): "10.000"})
+
+    def test_rows_cannot_be_edited(self):
+        price = ProductPrice.objects.get(product=self.product)
+        price.unit_price = 1
+        with self.assertRaises(ValueError):
+            price.save()
+
+    def test_dated_price_reaches_catalog_and_open_drafts(self):
+        draft, sent = self.quote("draft"), self.quote("sent")
+        ProductPrice.objects.create(product=self.product, unit_price=20,
+                                    effective_from=timezone.now() - timedelta(minutes=1))
+
+        call_command("revalue_drafts", stdout=io.StringIO())
+
+        self.product.refresh_from_db()
+        draft.refresh_from_db()
+        sent.refresh_from_db()
+        self.assertEqual(self.product.unit_price, Decimal("20"))
+        self.assertEqual(draft.products[0]["total"], 36.0)   # 20 less 10%, x 2
+        self.assertEqual(draft.total_amount, Decimal("37.800"))
+        self.assertEqual(draft.lines.get().unit_price, Decimal("20"))
+        self.assertEqual(sent.products[0]["unit_price"], 10.0)
+
+    def test_drafts_referencing_a_deleted_product_are_still_revalued(self):
+        gone = ProductNew.objects.create(name="Discontinued", unit_price=5, country="Oman")
+        draft = self.quote("draft")
+        draft.products.append({"product_id": gone.id, "name": "Discontinued", "unit_price": 5.0, "qty": 1, "total": 5.0})
+        draft.save()
+        QuotationLine.replace_for(draft, draft.products)
+        gone.delete()
+        ProductPrice.objects.create(product=self.product, unit_price=20,
+                                    effective_from=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(revalue_drafts(), [draft.id])
+
+        lines = list(draft.lines.all())
+        self.assertEqual([(line.product_id, line.unit_price) for line in lines], [
+            (self.product.id, Decimal("20")), (None, Decimal("5")),
+        ])
+        self.assertEqual(lines[1].name, "Discontinued")
+
+
+# -----------------------------------------------------
+# SITE SEARCH
+# -----------------------------------------------------
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="sales1", password="pass", role="salesperson", country="Oman"
+        )
+        cls.other = CustomUser.objects.create_user(username="sales2", password="pass", role="salesperson")
+        cls.acme = Client.objects.create(
+            company_name="Acme Trading", contact_person="Sara Ali", email="sara@acme.test",
+            phone="1", address="-", salesperson=cls.user,
+        )
+        Client.objects.create(company_name="Acme Rival", email="x@rival.test", phone="2", address="-",
+                              salesperson=cls.other)
+        cls.oil = ProductNew.objects.create(name="Hydraulic Oil", description="Acme approved", unit_price=10, country="Oman")
+        ProductNew.objects.create(name="Hydraulic Pump", unit_price=10, country="UAE")
+        cls.draft = Quotation.objects.create(
+            salesperson=cls.user, client=cls.acme, status="draft",
+            products=[{"product_id": cls.oil.id, "name": "Hydraulic Oil"}],
+        )
+
+    def hits(self, query, user=None, **kwargs):
+        return [(r.kind, r.object_id) for r in search(user or self.user, query, **kwargs)]
+
+    def test_results_are_scoped_and_title_matches_rank_first(self):
+        hits = self.hits("acme")
+        self.assertEqual(hits[0], ("client", self.acme.id))
+        self.assertCountEqual(hits, [
+            ("client", self.acme.id), ("product", self.oil.id), ("quotation", self.draft.id),
+        ])
+        self.assertEqual(self.hits("hydraulic", kinds=["product"]), [("product", self.oil.id)])
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(self.hits("acm sar"), [("client", self.acme.id)])
+        self.assertEqual(self.hits("acme pump"), [])
+
+    def test_index_follows_renames_and_deletes(self):
+        self.acme.company_name = "Zenith Supplies"
+        self.acme.save()
+        self.assertCountEqual(self.hits("zenith"), [("client", self.acme.id), ("quotation", self.draft.id)])
+
+        self.oil.delete()
+        self.assertEqual(self.hits("oil"), [("quotation", self.draft.id)])
+        self.assertEqual(rebuild_index(), SearchEntry.objects.count())
+
+    def test_client_quotations_are_reindexed_only_on_rename(self):
+        quotation_rows = SearchEntry.objects.filter(kind="quotation")
+        self.acme.phone = "999"
+        with mock.patch("quotes.search.index_client_quotations") as reindex:
+            self.acme.save()
+            self.acme.save(update_fields=["phone"])
+        reindex.assert_not_called()
+        self.assertIn("999", SearchEntry.objects.get(kind="client", object_id=self.acme.id).body)
+
+        self.acme.company_name = "Zenith Supplies"
+        self.acme.save(update_fields=["company_name"])
+        self.assertIn("Zenith Supplies", quotation_rows.get(object_id=self.draft.id).body)
+
+    def test_endpoint_pages_and_links_results(self):
+        self.client.login(username="sales1", password="pass")
+        data = self.client.get(reverse("search"), {"q": "acme", "limit": 2}).json()
+
+        self.assertEqual(data["results"][0]["url"], reverse("view_client", args=[self.acme.id]))
+        self.assertIn("page=2", data["next"])
+        last = self.client.get(data["next"]).json()
+        self.assertEqual(len(last["results"]), 1)
+        urls = {r["kind"]: r["url"] for r in data["results"] + last["results"]}
+        self.assertEqual(urls["quotation"], reverse("resume_draft", args=[self.draft.id]))
+        self.assertEqual(urls["product"], reverse("product_detail", args=[self.oil.id]))
+        self.assertIsNone(last["next"])
+
+
+# -----------------------------------------------------
+# QUOTATION LISTING
+# -----------------------------------------------------
+class QuotationListingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="sales1", password="pass", role="salesperson", country="Oman"
+        )
+        cls.client_obj = Client.objects.create(
+            company_name="ACME", email="acme@example.com", phone="123",
+            address="Muscat", salesperson=cls.user,
+        )
+        # Every row shares date_created, so only the id tie-breaker orders them
+        Quotation.objects.bulk_create([
+            Quotation(client=cls.client_obj, salesperson=cls.user, status="draft" if i % 2 else "sent")
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client.login(username="sales1", password="pass")
+
+    def fetch_all(self, **params):
+        ids, url = [], reverse("my_quotations")
+        params = {"format": "json", "limit": 10, **params}
+        while url:
+            data = self.client.get(url, params).json()
+            ids.extend(row["id"] for row in data["results"])
+            url, params = data["next"], {}
+        return ids
+
+    def test_pages_cover_every_row_once(self):
+        ids = self.fetch_all()
+
+        self.assertEqual(ids, sorted(Quotation.objects.values_list("id", flat=True), reverse=True))
+
+    def test_filters_apply_across_pages(self):
+        ids = self.fetch_all(status="draft")
+
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(set(Quotation.objects.filter(id__in=ids).values_list("status", flat=True)), {"draft"})
+
+    def test_html_page_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("my_quotations"), {"limit": 20})
+
+        self.assertEqual(len(response.context["quotations"]), 20)
+        self.assertLess(len(ctx.captured_queries), 10)
+
+    def test_client_filter_renders_only_the_selected_client(self):
+        admin = CustomUser.objects.create_user(username="boss", password="pass", role="admin")
+        Client.objects.create(
+            company_name="Zenith", email="z@example.com", phone="1", address="Doha", salesperson=admin,
+        )
+        self.client.login(username="boss", password="pass")
+
+        unfiltered = self.client.get(reverse("my_quotations"))
+        filtered = self.client.get(reverse("my_quotations"), {"client": self.client_obj.id})
+
+        self.assertNotContains(unfiltered, "Zenith")
+        self.assertNotContains(unfiltered, ">ACME</option>")
+        self.assertEqual(filtered.context["selected_client"], self.client_obj)
+        self.assertContains(filtered, ">ACME</option>")
+        self.assertNotContains(filtered, "Zenith")
+        self.assertEqual(len(filtered.context["quotations"]), 25)
+
+
+# -----------------------------------------------------
+# SALESPERSON DASHBOARD
+# -----------------------------------------------------
+class SalespersonDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="sales1", password="pass", role="salesperson", country="Oman"
+        )
+        for status, amount in (("draft", 10), ("sent", 20), ("sent", 30), ("approved", 40)):
+            Quotation.objects.create(salesperson=cls.user, status=status, total_amount=amount)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="sales1", password="pass")
+
+    def test_counts_and_current_month_trend(self):
+        stats = compute_salesperson_stats(self.user)
+
+        self.assertEqual((stats["total"], stats["draft"], stats["sent"], stats["approved"]), (4, 1, 2, 1))
+        self.assertEqual(len(stats["monthly_counts"]), 12)
+        self.assertEqual(stats["monthly_counts"][-1], 4)
+        self.assertEqual(stats["monthly_amounts"][-1], 100.0)
+
+    def test_status_change_invalidates_cache(self):
+        self.client.get(reverse("salesperson_dashboard"))
+        with self.assertNumQueries(1):   # the version counter only
+            salesperson_stats(self.user)
+
+        draft = Quotation.objects.get(status="draft")
+        draft.status = "sent"
+        draft.save()
+
+        self.assertEqual(salesperson_stats(self.user)["sent"], 3)
+
+    def test_change_in_another_worker_retires_this_workers_copy(self):
+        self.assertEqual(salesperson_stats(self.user)["approved"], 1)
+
+        # Another worker's save: its cache is not ours, only the counter is shared
+        with mock.patch("quotes.dashboard.cache"):
+            Quotation.objects.filter(status="draft").update(status="approved")
+            invalidate_salesperson_stats(self.user.pk)
+
+        self.assertEqual(salesperson_stats(self.user)["approved"], 2)
+
+
+# -----------------------------------------------------
+# ADMIN / MANAGER DASHBOARD COUNTERS
+# -----------------------------------------------------
+class DashboardCounterTests(TestCase):
+
+    def snapshot(self):
+        return {metric: dict(keys) for metric, keys in dashboard_stats().items()}
+
+    def test_signals_keep_counters_equal_to_a_rebuild(self):
+        manager = CustomUser.objects.create_user(username="mgr", password="pass", role="salesmanager")
+        seller = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson", country="Oman")
+        client = Client.objects.create(company_name="ACME", email="a@example.com", phone="1", address="x")
+        ProductNew.objects.create(name="Oil", unit_price=1)
+
+        first = Quotation.objects.create(salesperson=seller, client=client)
+        second = Quotation.objects.create(salesperson=seller, client=client)
+        first.status = "sent"
+        first.save()
+        second.delete()
+
+        seller.country = "UAE"
+        seller.save()
+        manager.role = "admin"
+        manager.save()
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental["quotations_by_status"], {"sent": 1})
+        self.assertEqual(incremental["users_by_role"], {"admin": 1, "salesperson": 1})
+        self.assertEqual(incremental["salespersons_by_country"], {"UAE": 1})
+
+        rebuild_stats()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_benchmark_refuses_the_default_database(self):
+        # The test database listed again under another alias is still the default one
+        with mock.patch.dict(settings.DATABASES, {"copy": settings.DATABASES["default"]}):
+            for alias in ("default", "missing", "copy"):
+                with self.subTest(alias=alias), self.assertRaises(CommandError):
+                    call_command("benchmark_quotation_queries", database=alias, rows=10, stdout=io.StringIO())
+
+        self.assertFalse(CustomUser.objects.filter(username__startswith=benchmark.BENCH_PREFIX).exists())
+
+    def test_benchmark_cleanup_deletes_in_bulk_without_receivers(self):
+        seller = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+        kept = Quotation.objects.create(salesperson=seller, status="sent")
+        before = self.snapshot()
+        benchmark.seed(200, "default", salespeople=5)
+
+        with CaptureQueriesContext(connection) as ctx:
+            benchmark.cleanup("default")
+
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertEqual(list(Quotation.objects.all()), [kept])
+        self.assertFalse(CustomUser.objects.filter(username__startswith=benchmark.BENCH_PREFIX).exists())
+        self.assertEqual(self.snapshot(), before)
+        self.assertTrue(SearchEntry.objects.filter(kind="quotation", object_id=kept.id).exists())
+        # The receivers are connected again afterwards
+        seller.delete()
+        self.assertEqual(salesperson_breakdown(dashboard_stats()), [("Unassigned", 1)])
+
+    def test_deleting_a_user_moves_their_quotations_to_unassigned(self):
+        seller = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+        Quotation.objects.create(salesperson=seller)
+        seller.delete()
+
+        self.assertEqual(salesperson_breakdown(dashboard_stats()), [("Unassigned", 1)])
+
+    def test_admin_dashboard_reads_counters(self):
+        CustomUser.objects.create_user(username="boss", password="pass", role="admin")
+        self.client.login(username="boss", password="pass")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("admin_dashboard"))
+
+        self.assertEqual(response.context["admins"], 1)
+        self.assertLess(len(ctx.captured_queries), 8)
+
+
+# -----------------------------------------------------
+# LOGIN IP GEOLOCATION
+# -----------------------------------------------------
+class ExplodingResolver(LocationResolver):
+    def resolve(self, ip):
+        raise AssertionError("resolver must not run inside the login request")
+
+
+class LoginIPTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+
+    def tearDown(self):
+        set_resolver(None)
+
+    def test_login_stores_pending_row_without_resolving(self):
+        set_resolver(ExplodingResolver())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse("login"), {"username": "sales1", "password": "pass"}, REMOTE_ADDR="203.0.113.7"
+            )
+
+        self.assertEqual(response.status_code, 302)
+        login_ip = LoginIP.objects.get()
+        self.assertEqual((login_ip.ip_address, login_ip.location), ("203.0.113.7", PENDING))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_malformed_forwarded_for_falls_back_to_remote_addr(self):
+        set_resolver(StaticResolver())
+
+        for header, stored in (("not-an-ip, 10.0.0.1", "203.0.113.7"), ("2001:db8::1 , 10.0.0.1", "2001:db8::1")):
+            with self.subTest(header=header):
+                response = self.client.post(
+                    reverse("login"), {"username": "sales1", "password": "pass"},
+                    REMOTE_ADDR="203.0.113.7", HTTP_X_FORWARDED_FOR=header,
+                )
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(LoginIP.objects.latest("id").ip_address, stored)
+                self.client.logout()
+
+        response = self.client.post(reverse("login"), {"username": "sales1", "password": "pass"},
+                                    REMOTE_ADDR="garbage", HTTP_X_FORWARDED_FOR="<script>")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(LoginIP.objects.count(), 2)
+
+    def test_background_step_fills_location(self):
+        set_resolver(StaticResolver({"203.0.113.7": "Muscat, Oman"}))
+        login_ip = LoginIP.objects.create(user=self.user, ip_address="203.0.113.7", location=PENDING)
+
+        resolve_and_store(login_ip.pk, login_ip.ip_address)
+
+        login_ip.refresh_from_db()
+        self.assertEqual(login_ip.location, "Muscat, Oman")
+
+    def test_unresolvable_and_loopback_addresses(self):
+        set_resolver(StaticResolver())
+
+        self.assertEqual(resolve_location("198.51.100.1"), UNKNOWN)
+        self.assertEqual(resolve_location("127.0.0.1"), LOCALHOST)
+
+
+class CountingResolver(StaticResolver):
+    calls = 0
+
+    def resolve(self, ip):
+        self.calls += 1
+        return super().resolve(ip)
+
+
+class IPLocationCacheTests(TestCase):
+
+    def test_cidr_file_lookup(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write("# offline ranges\n")
+            fh.write("203.0.113.0/24,Muscat, Oman\n")
+            fh.write("198.51.100.10,198.51.100.20,Dubai, UAE\n")
+            fh.write("2001:db8::/32,Documentation\n")
+            fh.write("not-an-ip,Nowhere\n")
+        self.addCleanup(os.remove, fh.name)
+
+        resolver = CidrFileResolver(fh.name)
+
+        self.assertEqual(len(resolver), 3)
+        self.assertEqual(resolver.resolve("203.0.113.255"), "Muscat, Oman")
+        self.assertEqual(resolver.resolve("198.51.100.15"), "Dubai, UAE")
+        self.assertIsNone(resolver.resolve("198.51.100.21"))
+        self.assertIsNone(resolver.resolve("10.0.0.1"))
+        self.assertEqual(resolver.resolve("2001:db8::1"), "Documentation")
+
+    def test_repeat_lookups_skip_the_inner_resolver(self):
+        inner = CountingResolver({"203.0.113.7": "Muscat, Oman"})
+        resolver = CachedResolver(inner)
+
+        self.assertEqual(resolver.resolve("203.0.113.7"), "Muscat, Oman")
+        self.assertEqual(resolver.resolve("203.0.113.7"), "Muscat, Oman")
+        self.assertEqual(inner.calls, 1)
+
+        # A fresh process reads the persisted entry instead of the API
+        self.assertEqual(CachedResolver(inner).resolve("203.0.113.7"), "Muscat, Oman")
+        self.assertEqual(inner.calls, 1)
+
+    def test_expired_and_failed_lookups_are_retried(self):
+        inner = CountingResolver()
+        resolver = CachedResolver(inner, ttl=timedelta(days=1))
+
+        self.assertIsNone(resolver.resolve("198.51.100.1"))
+        self.assertIsNone(resolver.resolve("198.51.100.1"))
+        self.assertEqual(inner.calls, 2)
+
+        IPLocation.objects.create(
+            ip_address="203.0.113.7", location="Old", resolved_at=timezone.now() - timedelta(days=2)
+        )
+        inner.locations["203.0.113.7"] = "Muscat, Oman"
+        self.assertEqual(resolver.resolve("203.0.113.7"), "Muscat, Oman")
+        self.assertEqual(IPLocation.objects.get(ip_address="203.0.113.7").location, "Muscat, Oman")
+
+
+class BackfillLoginLocationsTests(TransactionTestCase):
+
+    def tearDown(self):
+        set_resolver(None)
+
+    def test_unknown_and_stuck_rows_are_resolved_per_distinct_ip(self):
+        user = CustomUser.objects.create_user(username="sales1", password="pass")
+        rows = [
+            LoginIP.objects.create(user=user, ip_address="203.0.113.7", location=UNKNOWN),
+            LoginIP.objects.create(user=user, ip_address="203.0.113.7", location=UNKNOWN),
+            LoginIP.objects.create(user=user, ip_address="198.51.100.1", location=PENDING),
+            LoginIP.objects.create(user=user, ip_address="192.0.2.1", location=UNKNOWN),
+            LoginIP.objects.create(user=user, ip_address="203.0.113.8", location="Muscat, Oman"),
+        ]
+        LoginIP.objects.filter(pk=rows[2].pk).update(timestamp=timezone.now() - timedelta(hours=1))
+
+        inner = CountingResolver({"203.0.113.7": "Muscat, Oman", "198.51.100.1": "Dubai, UAE"})
+        set_resolver(inner)
+        call_command("backfill_login_locations", batch_size=2, workers=2, rate=0, stdout=io.StringIO())
+
+        locations = dict(LoginIP.objects.values_list("pk", "location"))
+        self.assertEqual(
+            [locations[row.pk] for row in rows],
+            ["Muscat, Oman", "Muscat, Oman", "Dubai, UAE", UNKNOWN, "Muscat, Oman"],
+        )
+        self.assertEqual(inner.calls, 3)   # one lookup per distinct unresolved IP
+
+
+class PruneLoginIPsTests(TestCase):
+
+    def test_old_rows_are_rolled_up_then_deleted(self):
+        user = CustomUser.objects.create_user(username="sales1", password="pass")
+        old = timezone.now() - timedelta(days=120)
+        for location, when in [
+            ("Muscat, Oman", old),
+            ("Muscat, Oman", old + timedelta(minutes=5)),
+            ("Dubai, UAE", old),
+            ("Muscat, Oman", timezone.now()),
+        ]:
+            row = LoginIP.objects.create(user=user, ip_address="203.0.113.7", location=location)
+            LoginIP.objects.filter(pk=row.pk).update(timestamp=when)
+        # An earlier run already counted one Muscat login that day
+        LoginDailyRollup.objects.create(
+            day=old.date(), user=user, location="Muscat, Oman", logins=1,
+            first_login=old - timedelta(hours=1), last_login=old - timedelta(hours=1),
+        )
+
+        call_command("prune_login_ips", keep_days=90, chunk_size=2, stdout=io.StringIO())
+
+        self.assertEqual(LoginIP.objects.count(), 1)
+        rollups = {r.location: r for r in LoginDailyRollup.objects.all()}
+        self.assertEqual(rollups["Muscat, Oman"].logins, 3)
+        self.assertEqual(rollups["Muscat, Oman"].first_login, old - timedelta(hours=1))
+        self.assertEqual(rollups["Muscat, Oman"].last_login, old + timedelta(minutes=5))
+        self.assertEqual(rollups["Dubai, UAE"].logins, 1)
+
+
+# -----------------------------------------------------
+# QUOTATION NUMBERING
+# -----------------------------------------------------
+class QuotationNumberTests(TestCase):
+
+    def test_numbers_are_sequential(self):
+        first = generate_qtn_number()
+        second = generate_qtn_number()
+
+        self.assertTrue(first.endswith("-001"))
+        self.assertTrue(second.endswith("-002"))
+
+    def test_block_reservation(self):
+        generate_qtn_number()
+        block = reserve_qtn_numbers(5)
+
+        self.assertEqual([n[-3:] for n in block], ["002", "003", "004", "005", "006"])
+        self.assertEqual(QuotationCounter.objects.get().counter, 6)
+
+
+class QuotationNumberConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_allocations_never_collide(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("threads cannot share an in-memory SQLite database")
+
+        threads, per_thread, block = 8, 20, 3
+        results = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(threads)
+
+        def worker():
+            taken = []
+            try:
+                start.wait()
+                for i in range(per_thread):
+                    count = block if i % 2 else 1
+                    taken.extend(QuotationCounter.reserve(count, year=2030))
+            except Exception as exc:   # surfaced in the main thread below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+            with lock:
+                results.extend(taken)
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+
+        self.assertEqual(errors, [])
+        expected = threads * (per_thread // 2) * (1 + block)
+        self.assertEqual(len(results), expected)
+        self.assertEqual(sorted(results), list(range(1, expected + 1)))
+        self.assertEqual(QuotationCounter.objects.get(year=2030).counter, expected)
+
+
+# -----------------------------------------------------
+# QUOTATION PDF
+# -----------------------------------------------------
+LETTERHEAD_SIZE = (612, 792)   # US Letter, so a resized A4 page is easy to spot
+
+
+def make_letterhead(path, text="GIC LETTERHEAD"):
+    page = pdf_canvas.Canvas(path, pagesize=LETTERHEAD_SIZE)
+    page.rect(20, 700, 572, 72)
+    page.drawString(40, 730, text)
+    page.save()
+
+
+def quotation_data(lines=40):
+    return {
+        "date": "01-01-2030", "qtn_no": "GIC/2030/0001",
+        "client_company": "Acme", "client_email": "a@acme.test", "client_name": "Sara", "client_phone": "1",
+        "products": [
+            {"name": f"Product {i}", "desc": "desc", "pack_size": "20L", "qty": 2, "unit_price": 10}
+            for i in range(lines)
+        ],
+        "validity": "30 days", "delivery": "7 Days", "payment_terms": "Advance", "salesperson": "sales1",
+    }
+
+
+def letterhead_forms(page):
+    """Decoded content of each form XObject on ``page``."""
+    xobjects = page["/Resources"].get_object().get("/XObject", {})
+    return [
+        obj.get_data() for obj in (ref.get_object() for ref in xobjects.get_object().values())
+        if obj.get("/Subtype") == "/Form"
+    ]
+
+
+class QuotationPdfTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "letterhead.pdf")
+        make_letterhead(self.path)
+        self.letterhead = Letterhead(self.path)
+        self.overlay = self.letterhead.form.get_object().get_data()
+        clear_letterhead_cache()
+        self.addCleanup(clear_letterhead_cache)
+
+    def render(self, **kwargs):
+        return PdfReader(generate_quotation_pdf(quotation_data(), letterhead=self.letterhead, **kwargs))
+
+    def stamp(self):
+        return PdfReader(stamp_letterhead(build_quotation_content(quotation_data()), self.letterhead))
+
+    def test_two_pass_stamps_every_page(self):
+        pdf = self.stamp()
+
+        self.assertGreater(len(pdf.pages), 1)
+        for page in pdf.pages:
+            self.assertEqual((page.mediabox.width, page.mediabox.height), LETTERHEAD_SIZE)
+            self.assertIn(LETTERHEAD_XOBJECT, page["/Resources"]["/XObject"])
+            self.assertIn(self.overlay, letterhead_forms(page))
+        # One shared overlay object, not a copy per page
+        self.assertEqual(len({page["/Resources"]["/XObject"].raw_get(LETTERHEAD_XOBJECT).idnum
+                              for page in pdf.pages}), 1)
+
+    def test_single_pass_matches_two_pass(self):
+        single, stamped = self.render(single_pass=True), self.stamp()
+
+        self.assertEqual(len(single.pages), len(stamped.pages))
+        self.assertIn("Product 0", single.pages[0].extract_text())
+        for one, other in zip(single.pages, stamped.pages):
+            self.assertEqual((one.mediabox.width, one.mediabox.height), (other.mediabox.width, other.mediabox.height))
+            self.assertEqual(one.extract_text(), other.extract_text())
+            self.assertIn(self.overlay, letterhead_forms(one))
+        # ReportLab embeds the overlay once and every page points at it
+        self.assertEqual(len({page["/Resources"]["/XObject"].raw_get(name).idnum
+                              for page in single.pages for name in page["/Resources"]["/XObject"]}), 1)
+
+    def test_stamped_multi_page_pdfs_keep_every_page_and_the_letterhead(self):
+        data = quotation_data(lines=80)
+        content_pages = len(PdfReader(build_quotation_content(data)).pages)
+        letterhead_content = PdfReader(self.path).pages[0].get_contents().get_data()
+
+        for pdf in (
+            PdfReader(generate_quotation_pdf(data, letterhead=self.letterhead)),
+            PdfReader(stamp_letterhead(build_quotation_content(data), self.letterhead)),
+        ):
+            self.assertGreater(content_pages, 2)
+            self.assertEqual(len(pdf.pages), content_pages)
+            for page in pdf.pages:
+                self.assertEqual(letterhead_forms(page), [letterhead_content])
+
+    def test_private_apis_match_the_pinned_versions(self):
+        # Letterhead uses private ReportLab/PyPDF2 APIs; see pdf_generator.py
+        with open(os.path.join(settings.BASE_DIR, "requirements.txt")) as fh:
+            pins = dict(line.strip().split("==") for line in fh if "==" in line)
+
+        self.assertEqual(pins["PyPDF2"], PyPDF2.__version__)
+        self.assertEqual(pins["reportlab"], reportlab.Version)
+
+    def test_single_pass_false_runs_the_original_merge(self):
+        single, merged = self.render(), self.render(single_pass=False)
+
+        self.assertEqual(len(merged.pages), len(single.pages))
+        for page in merged.pages:
+            self.assertEqual((page.mediabox.width, page.mediabox.height), LETTERHEAD_SIZE)
+            # Merged into the page's own content, not referenced as an overlay
+            self.assertNotIn(LETTERHEAD_XOBJECT, page["/Resources"].get("/XObject", {}))
+            self.assertIn(b"(GIC\\040LETTERHEAD) Tj", page.get_contents().get_data())
+        self.assertIn("Product 0", merged.pages[0].extract_text())
+
+    def test_letterhead_is_reparsed_only_when_the_file_changes(self):
+        first = get_letterhead(self.path)
+        self.assertIs(get_letterhead(self.path), first)
+
+        mtime = os.path.getmtime(self.path)
+        os.utime(self.path, (mtime + 10, mtime + 10))
+        reloaded = get_letterhead(self.path)
+        self.assertIsNot(reloaded, first)
+        self.assertIs(get_letterhead(self.path), reloaded)
+
+
+class CountryLetterheadTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = self.settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        clear_letterhead_registry()
+        self.addCleanup(clear_letterhead_registry)
+
+    def upload(self, text):
+        buffer = io.BytesIO()
+        make_letterhead(buffer, text)
+        return SimpleUploadedFile("letterhead.pdf", buffer.getvalue(), content_type="application/pdf")
+
+    def overlay(self, letterhead):
+        return letterhead.form.get_object().get_data()
+
+    def test_letterhead_is_picked_by_country_without_queries(self):
+        oman = Country.objects.create(name="Oman", currency="OMR", letterhead=self.upload("OMAN LETTERHEAD"))
+        Country.objects.create(name="UAE", currency="AED", letterhead=self.upload("UAE LETTERHEAD"))
+        clear_letterhead_registry()
+        preload_letterheads()
+
+        with self.assertNumQueries(0), mock.patch("quotes.letterheads.parse_upload") as parse:
+            letterhead = letterhead_for_country("Oman")
+            uae = letterhead_for_country("UAE")
+            india = letterhead_for_country("India")
+        parse.assert_not_called()
+
+        self.assertEqual(letterhead.version, oman.letterhead.name)
+        self.assertIn(b"OMAN LETTERHEAD", self.overlay(letterhead))
+        self.assertIn(b"UAE LETTERHEAD", self.overlay(uae))
+        self.assertIs(india, get_letterhead())
+
+    def test_falls_back_to_the_default_letterhead(self):
+        Country.objects.create(name="India", currency="INR")
+        with self.assertLogs("quotes.letterheads", "ERROR"):
+            Country.objects.create(
+                name="Qatar", currency="QAR", letterhead=SimpleUploadedFile("broken.pdf", b"not a pdf"),
+            )
+
+        self.assertIs(letterhead_for_country("India"), get_letterhead())
+        with mock.patch("quotes.letterheads.parse_upload") as parse:
+            self.assertIs(letterhead_for_country("Qatar"), get_letterhead())
+        parse.assert_not_called()   # the failure is remembered, not retried per PDF
+
+    def test_replacing_or_deleting_a_letterhead_drops_the_entry(self):
+        oman = Country.objects.create(name="Oman", currency="OMR", letterhead=self.upload("OLD LETTERHEAD"))
+        old_name = oman.letterhead.name
+        self.assertIn(b"OLD LETTERHEAD", self.overlay(letterhead_for_country("Oman")))
+
+        oman.letterhead = self.upload("NEW LETTERHEAD")
+        oman.save()
+        self.assertIn(b"NEW LETTERHEAD", self.overlay(letterhead_for_country("Oman")))
+        self.assertNotIn(("Oman", old_name), letterheads._registry)
+
+        oman.delete()
+        self.assertIs(letterhead_for_country("Oman"), get_letterhead())
+        self.assertFalse([key for key in letterheads._registry if key[0] == "Oman"])
+
+    def test_other_workers_pick_up_an_upload_on_refresh(self):
+        oman = Country.objects.create(name="Oman", currency="OMR", letterhead=self.upload("OLD LETTERHEAD"))
+        letterhead_for_country("Oman")
+        new_name = Country._meta.get_field("letterhead").storage.save("letterheads/new.pdf", self.upload("NEW LETTERHEAD"))
+        # As saved by another worker: this process's receivers never run
+        Country.objects.filter(pk=oman.pk).update(letterhead=new_name)
+
+        self.assertIn(b"OLD LETTERHEAD", self.overlay(letterhead_for_country("Oman")))
+        with mock.patch.object(letterheads, "REFRESH_SECONDS", 0):
+            self.assertIn(b"NEW LETTERHEAD", self.overlay(letterhead_for_country("Oman")))
+
+
+class PdfCacheTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("CACHE_DIR", tmp.name), ("CACHE_MAX_BYTES", 1000)):
+            patcher = mock.patch.object(pdf_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        pdf_cache._usage.update(bytes=None, writes=0)
+        self.letterhead = SimpleNamespace(version=1.0)
+
+    def store(self, key, size, age):
+        pdf_cache._write(key, b"x" * size)
+        when = timezone.now().timestamp() - age
+        os.utime(pdf_cache._path(key), (when, when))
+
+    def test_render_key_depends_only_on_the_inputs(self):
+        key = pdf_cache.render_key({"qtn_no": "1", "products": [{"qty": 1}]}, self.letterhead)
+
+        self.assertEqual(pdf_cache.render_key({"products": [{"qty": 1}], "qtn_no": "1"}, self.letterhead), key)
+        self.assertNotEqual(pdf_cache.render_key({"qtn_no": "2", "products": [{"qty": 1}]}, self.letterhead), key)
+        self.assertNotEqual(pdf_cache.render_key({"qtn_no": "1", "products": [{"qty": 1}]},
+                                                 SimpleNamespace(version=2.0)), key)
+
+    def test_repeat_render_is_served_from_the_cache(self):
+        with mock.patch.object(pdf_cache, "generate_quotation_pdf", return_value=io.BytesIO(b"%PDF-1")) as render:
+            first = pdf_cache.render_quotation_pdf({"qtn_no": "1"}, letterhead=self.letterhead)
+            second = pdf_cache.render_quotation_pdf({"qtn_no": "1"}, letterhead=self.letterhead)
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_least_recently_served_renders_are_evicted_first(self):
+        for key, age in (("aa1", 300), ("aa2", 200), ("aa3", 100)):
+            self.store(key, 400, age)
+        pdf_cache._read("aa1")   # served just now
+
+        self.assertEqual(pdf_cache.evict(), 1)
+        self.assertTrue(os.path.exists(pdf_cache._path("aa1")))
+        self.assertFalse(os.path.exists(pdf_cache._path("aa2")))
+
+    def test_writes_under_the_limit_do_not_rescan(self):
+        pdf_cache.evict()   # first sweep seeds the running total
+        with mock.patch.object(pdf_cache, "evict") as sweep:
+            for i in range(2):
+                pdf_cache._note_write(400)
+            sweep.assert_not_called()
+            pdf_cache._note_write(400)
+            sweep.assert_called_once()
+
+
+class PdfJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+        CustomUser.objects.create_user(username="sales2", password="pass", role="salesperson")
+
+    def setUp(self):
+        self.client.login(username="sales1", password="pass")
+
+    def done_job(self, **kwargs):
+        return PdfRenderJob.objects.create(requested_by=self.user, payload={"qtn_no": "Q-1"},
+                                           status="done", cache_key="k" * 64, **kwargs)
+
+    def test_pool_uses_spawned_processes(self):
+        with mock.patch.object(pdf_jobs, "_executor", None):
+            executor = pdf_jobs._get_executor()
+            self.addCleanup(executor.shutdown)
+            self.assertEqual(executor._mp_context.get_start_method(), "spawn")
+
+    def test_enqueued_job_is_finished_by_the_pool_callback(self):
+        future = Future()
+        pool = mock.Mock(**{"submit.return_value": future})
+        with mock.patch.object(pdf_jobs, "_get_executor", return_value=pool):
+            job = pdf_jobs.enqueue_render({"qtn_no": "Q-1"}, "", self.user)
+
+        self.assertEqual(PdfRenderJob.objects.get(pk=job.pk).status, "running")
+        future.set_result("k" * 64)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.cache_key), ("done", "k" * 64))
+
+    def test_callback_on_the_pool_thread_closes_its_own_connection(self):
+        future = Future()
+        pool = mock.Mock(**{"submit.return_value": future})
+        with mock.patch.object(pdf_jobs, "_get_executor", return_value=pool):
+            pdf_jobs.enqueue_render({"qtn_no": "Q-1"}, "", self.user)
+
+        # That thread cannot see this test's transaction, so the update is stubbed
+        with mock.patch.object(pdf_jobs, "PdfRenderJob") as jobs, \
+                mock.patch.object(pdf_jobs, "connection") as callback_connection:
+            pool_thread = threading.Thread(target=future.set_result, args=["k" * 64])
+            pool_thread.start()
+            pool_thread.join()
+
+        jobs.objects.filter.return_value.update.assert_called_once()
+        callback_connection.close.assert_called_once()
+
+    def test_job_finished_before_the_callback_keeps_the_request_connection(self):
+        future = Future()
+        future.set_result("k" * 64)
+        pool = mock.Mock(**{"submit.return_value": future})
+        with mock.patch.object(pdf_jobs, "_get_executor", return_value=pool), \
+                mock.patch.object(pdf_jobs.connection, "close") as close:
+            job = pdf_jobs.enqueue_render({"qtn_no": "Q-1"}, "", self.user)
+
+        close.assert_not_called()
+        self.assertEqual(PdfRenderJob.objects.get(pk=job.pk).status, "done")
+
+    def test_job_left_queued_when_the_pool_is_down_is_rendered_by_the_command(self):
+        with mock.patch.object(pdf_jobs, "_get_executor", side_effect=OSError("no pool")), \
+                self.assertLogs("quotes.pdf_jobs", "ERROR"):
+            job = pdf_jobs.enqueue_render({"qtn_no": "Q-1"}, "", self.user)
+        self.assertEqual(PdfRenderJob.objects.get(pk=job.pk).status, "queued")
+
+        with mock.patch.object(pdf_jobs, "render_job", return_value="k" * 64):
+            call_command("process_pdf_jobs", stdout=io.StringIO())
+        self.assertEqual(PdfRenderJob.objects.get(pk=job.pk).status, "done")
+
+    def test_status_and_download_are_for_the_requester_only(self):
+        job = self.done_job()
+        status = self.client.get(reverse("pdf_job_status", args=[job.id])).json()
+        self.assertEqual(status["download_url"], reverse("pdf_job_download", args=[job.id]))
+
+        with mock.patch("quotes.views.read_cached", return_value=b"%PDF-1.4 cached"):
+            response = self.client.get(status["download_url"])
+        self.assertEqual(response.content, b"%PDF-1.4 cached")
+        self.assertIn('filename="Q-1.pdf"', response["Content-Disposition"])
+
+        self.client.login(username="sales2", password="pass")
+        self.assertEqual(self.client.get(reverse("pdf_job_status", args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("pdf_job_download", args=[job.id])).status_code, 404)
+
+    def test_download_waits_for_the_render(self):
+        job = self.done_job()
+        PdfRenderJob.objects.filter(pk=job.pk).update(status="running")
+        self.assertEqual(self.client.get(reverse("pdf_job_download", args=[job.id])).status_code, 404)
+
+
+class QuotationExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        CustomUser.objects.create_user(username="mgr", password="pass", role="salesmanager")
+        cls.seller = CustomUser.objects.create_user(username="sales1", password="pass", role="salesperson")
+        other = CustomUser.objects.create_user(username="sales2", password="pass", role="salesperson")
+        client = Client.objects.create(company_name="Acme", email="a@acme.test", phone="1", address="-")
+        lines = [{"name": "Oil", "qty": 1, "unit_price": 10, "total": 10}]
+        cls.approved = Quotation.objects.create(salesperson=cls.seller, client=client, status="approved", products=lines)
+        Quotation.objects.create(salesperson=cls.seller, client=client, status="draft", products=lines)
+        Quotation.objects.create(salesperson=other, client=client, status="approved", products=lines)
+        Quotation.objects.filter(salesperson=other).update(date_created="2020-01-15")
+
+    def setUp(self):
+        # Threads stand in for the shared process pool
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        patcher = mock.patch.object(pdf_export, "_shared_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.login(username="mgr", password="pass")
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_quotations"), params)
+        if response.status_code != 200:
+            return response, None
+        # Reading to the end closes the response, as a finished download does
+        content = b"".join(response.streaming_content)
+        return response, zipfile.ZipFile(io.BytesIO(content))
+
+    def test_zip_holds_one_pdf_per_filtered_quotation(self):
+        _response, archive = self.export(salesperson="sales1")
+
+        self.assertEqual(archive.namelist(), [f"QTN-{self.approved.id}.pdf"])
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b"%PDF"))
+
+    def test_filters(self):
+        self.assertEqual(len(self.export()[1].namelist()), 2)
+        self.assertEqual(len(self.export(status="")[1].namelist()), 3)
+        self.assertEqual(len(self.export(month="2020-01")[1].namelist()), 1)
+        self.assertEqual(self.export(month="2020-13")[0].status_code, 400)
+
+    def test_web_exports_are_capped(self):
+        self.assertTrue(pdf_export.acquire_web_export())
+        try:
+            self.assertEqual(self.export()[0].status_code, 429)
+        finally:
+            pdf_export._web_slots.release()
+
+        with mock.patch("quotes.views.WEB_EXPORT_LIMIT", 1):
+            self.assertEqual(self.export()[0].status_code, 413)
+
+        # Slots come back when the stream is closed, even unread
+        response = self.client.get(reverse("export_quotations"))
+        request_finished.disconnect(close_old_connections)   # as the test client does
+        try:
+            response.close()
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertEqual(self.export()[0].status_code, 200)
+
+
+# -----------------------------------------------------
+# QUOTATION LINES
+# -----------------------------------------------------
+class QuotationLineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oil = ProductNew.objects.create(name="Hydraulic Oil", unit_price=10, country="Oman")
+        cls.quotation = Quotation.objects.create(country="Oman")
+
+    def test_replace_for_rewrites_lines_in_order(self):
+        QuotationLine.replace_for(self.quotation, [{"name": "Old"}] * 3)
+
+        with self.assertNumQueries(2):
+            QuotationLine.replace_for(self.quotation, [
+                {"product_id": self.oil.id, "name": "Hydraulic Oil", "desc": "20L", "pack_size": "20L",
+                 "unit_price": 10.5, "discount": 5, "qty": 2, "total": 19.95},
+                {"name": "Freight", "qty": "", "unit_price": "n/a"},
+            ])
+
+        first, second = self.quotation.lines.all()
+        self.assertEqual((first.position, first.product, first.description), (0, self.oil, "20L"))
+        self.assertEqual((first.qty, first.unit_price, first.discount), (2, Decimal("10.5"), 5))
+        self.assertEqual(first.line_total, Decimal("19.95"))
+        self.assertEqual((second.position, second.product, second.name), (1, None, "Freight"))
+        self.assertEqual((second.qty, second.unit_price), (1, 0))
+
+    def test_replace_for_with_no_products_clears_lines(self):
+        QuotationLine.replace_for(self.quotation, [{"name": "Old"}])
+        QuotationLine.replace_for(self.quotation, [])
+
+        self.assertFalse(self.quotation.lines.exists())
+
+
+# -----------------------------------------------------
+# DATA MIGRATIONS
+# -----------------------------------------------------
+def migration(name):
+    return importlib.import_module(f"quotes.migrations.{name}")
+
+
+class BackfillQuotationSalespersonTests(TestCase):
+    backfill = migration("0010_backfill_quotation_salesperson")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol, cls.carol_upper = (
+            CustomUser.objects.create_user(username=name, password="pass")
+            for name in ("alice", "Bob", "carol", "Carol")
+        )
+
+    def quotation(self, name, salesperson=None):
+        return Quotation.objects.create(salesperson_name=name, salesperson=salesperson)
+
+    def run_backfill(self):
+        # Small batches so the keyset scan has to continue across several
+        with mock.patch.object(self.backfill, "BATCH_SIZE", 2):
+            self.backfill.backfill_salesperson(django_apps, None)
+
+    def salesperson_of(self, quotation):
+        quotation.refresh_from_db()
+        return quotation.salesperson
+
+    def test_usernames_are_matched(self):
+        exact, other_case = self.quotation("alice"), self.quotation("BOB")
+
+        self.run_backfill()
+
+        self.assertEqual(self.salesperson_of(exact), self.alice)
+        self.assertEqual(self.salesperson_of(other_case), self.bob)
+
+    def test_unmatched_and_ambiguous_names_stay_unset(self):
+        ghost, blank = self.quotation("ghost"), self.quotation("")
+        ambiguous, exact = self.quotation("CAROL"), self.quotation("Carol")
+
+        self.run_backfill()
+
+        self.assertIsNone(self.salesperson_of(ghost))
+        self.assertIsNone(self.salesperson_of(blank))
+        self.assertIsNone(self.salesperson_of(ambiguous))
+        self.assertEqual(self.salesperson_of(exact), self.carol_upper)
+        self.assertEqual(ghost.salesperson_name, "ghost")
+
+    def test_rerun_only_fills_unset_rows(self):
+        reassigned = self.quotation("alice", salesperson=self.bob)
+        pending = [self.quotation("alice") for _ in range(3)]
+
+        self.run_backfill()
+        Quotation.objects.filter(id=pending[0].id).update(salesperson=None)
+        with CaptureQueriesContext(connection) as ctx:
+            self.run_backfill()
+
+        self.assertEqual(self.salesperson_of(reassigned), self.bob)
+        self.assertEqual({self.salesperson_of(q) for q in pending}, {self.alice})
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+
+class BackfillQuotationLineTests(TestCase):
+    backfill = migration("0006_backfill_quotationline")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oil = ProductNew.objects.create(name="Hydraulic Oil", unit_price=10, country="Oman")
+        cls.grease = ProductNew.objects.create(name="Grease", unit_price=4, country="Global")
+        for country in ("Oman", "Oman", "Global"):
+            ProductNew.objects.create(name="Filter", unit_price=2, country=country)
+
+    def lines_for(self, products):
+        quotation = Quotation.objects.create(country="Oman", products=products)
+        self.backfill.backfill_lines(django_apps, None)
+        return list(quotation.lines.all())
+
+    def test_lines_match_by_product_id_then_name(self):
+        lines = self.lines_for([
+            {"product_id": self.oil.id, "name": "Renamed since", "qty": 2, "total": 20},
+            {"product_id": str(self.oil.id), "name": "Hydraulic Oil"},
+            {"product_id": 999999, "name": "Hydraulic Oil"},
+            {"name": "Grease", "qty": "abc"},
+        ])
+
+        self.assertEqual([line.product for line in lines], [self.oil, self.oil, self.oil, self.grease])
+        self.assertEqual([line.position for line in lines], [0, 1, 2, 3])
+        self.assertEqual((lines[0].name, lines[0].qty, lines[0].line_total), ("Renamed since", 2, 20))
+        self.assertEqual(lines[3].qty, 1)
+
+    def test_unmatched_and_ambiguous_lines_stay_unlinked(self):
+        lines = self.lines_for(["not a line", {"name": "Filter"}, {"name": "Unknown"}])
+
+        self.assertEqual([(line.position, line.name, line.product) for line in lines], [
+            (1, "Filter", None), (2, "Unknown", None),
+        ])
+
+    def test_rerun_skips_quotations_with_lines(self):
+        lines = self.lines_for([{"name": "Grease"}])
+        self.backfill.backfill_lines(django_apps, None)
+
+        self.assertEqual(QuotationLine.objects.filter(quotation=lines[0].quotation_id).count(), 1)
@@ -24,6 +24,9 @@ urlpatterns = [
 
     # Quotation
     path('create/', views.create_quotation, name='create_quotation'),
+    path('quotation/pdf-jobs/<int:job_id>/', views.pdf_job_status, name='pdf_job_status'),
+    path('quotation/pdf-jobs/<int:job_id>/download/', views.pdf_job_download, name='pdf_job_download'),
+    path('quotation/export/', views.export_quotations, name='export_quotations'),
     path('drafts/', views.draft_list, name='draft_list'),
     path('drafts/delete/<int:id>/', views.draft_delete, name='draft_delete'),
     path('drafts/resume/<int:id>/', views.draft_resume, name='resume_draft'),
@@ -34,13 +37,18 @@ urlpatterns = [
 
     # AJAX
     path("get-client-details/", views.get_client_details, name="get-client-details"),
+    path("clients/search/", views.client_search, name="client_search"),
     path("clients/add/ajax/", views.add_client_ajax, name="add_client_ajax"),
     path("clients/<int:id>/edit/ajax/", views.edit_client_ajax, name="edit_client_ajax"),
     path("clients/<int:id>/delete/ajax/", views.delete_client_ajax, name="delete_client_ajax"),
+    path("clients/batch/", views.client_batch, name="client_batch"),
     path('quotation/send/<int:pk>/', views.send_for_approval, name='send_for_approval'),
     path('quotation/approve/<int:pk>/', views.approve_quotation, name='approve_quotation'),
     path("products/", views.product_list_view, name="product_list"),
+    path("products/search/", views.product_search, name="product_search"),
+    path("products/prices/", views.product_prices, name="product_prices"),
     path("products/<int:pk>/", views.product_detail, name="product_detail"),
+    path("search/", views.search_view, name="search"),
     path('salesmanager/sales-team/', views.salesperson_list_view, name='salesperson_list'),
     path('my_quotations/', views.my_quotations, name='my_quotations'),
     path('salesmanager/quotations/', views.all_quotations_view, name='all_quotations'),
@@ -2,10 +2,13 @@
 #   IMPORTS
 # ==========================
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Count, Q, Sum
 from datetime import datetime, date
 import json
@@ -16,14 +19,26 @@ from .models import (
     CustomUser, Client, Quotation,
     LoginIP, Country, QuotationCounter, DraftQuotation,
     ProductNew,   # ← REPLACED Product
-    IntroText, ClosingText
+    IntroText, ClosingText, PdfRenderJob, QuotationLine
 )
 
 # FORMS
 from .forms import SignUpForm, LoginForm
 
 # PDF
-from .pdf_generator import generate_quotation_pdf
+from .pdf_cache import read_cached, render_quotation_pdf
+from .pdf_jobs import enqueue_render
+from .pdf_export import (
+    WEB_EXPORT_LIMIT, acquire_web_export, export_queryset, web_export
+)
+from .catalog import ALL_PRODUCTS, catalog_for, get_catalog, product_row, search_page
+from .clients import ClientBatch, client_row, search_clients, visible_clients
+from .pricing import end_of_day, prices_as_of
+from . import search as site_search
+from .listing import filter_quotations, keyset_page, page_size, quotation_row
+from .dashboard import dashboard_stats, salesperson_breakdown, salesperson_stats
+from .pdf_worker import resolve_letterhead
+from .letterheads import letterhead_file_for_country, letterhead_for_country
 
 
 # ==========================
@@ -59,15 +74,16 @@ def logout_view(request):
 #   QUOTATION NUMBER GENERATOR
 # ==========================
 def generate_qtn_number():
-    year = datetime.now().year
-    try:
-        record = QuotationCounter.objects.get(year=year)
-        record.counter += 1
-        record.save()
-    except QuotationCounter.DoesNotExist:
-        record = QuotationCounter.objects.create(year=year, counter=1)
+    return reserve_qtn_numbers(1)[0]
+
 
-    return f"QTN-{year}-{str(record.counter).zfill(3)}"
+def reserve_qtn_numbers(count):
+    """Take a block of ``count`` QTN numbers at once (bulk imports)."""
+    year = datetime.now().year
+    return [
+        f"QTN-{year}-{str(number).zfill(3)}"
+        for number in QuotationCounter.reserve(count, year)
+    ]
 
 
 # ==========================
@@ -144,24 +160,37 @@ def client_delete(request, id):
 
 
 
+# AJAX — Client type-ahead for the quotation form
+@login_required
+def client_search(request):
+    # 🔍 Company-name prefix search, contact details included, so picking a
+    # client needs no second request
+    clients = search_clients(request.user, request.GET.get("q", ""))
+    rows, page, has_more = search_page(clients, request.GET)
+
+    next_url = None
+    if has_more:
+        params = request.GET.copy()
+        params["page"] = page + 1
+        next_url = f"{request.path}?{params.urlencode()}"
+
+    return JsonResponse({
+        "results": [client_row(c) for c in rows],
+        "page": page,
+        "next": next_url,
+    })
+
+
 # AJAX — Get client details
 @login_required
 def get_client_details(request):
-    company_name = request.GET.get("company")
+    client_id = request.GET.get("id", "")
 
-    try:
-        client = Client.objects.get(
-            company_name=company_name,
-            salesperson=request.user  # 🔥 important
-        )
-        return JsonResponse({
-            "contact_person": client.contact_person,
-            "email": client.email,
-            "phone": client.phone,
-            "address": client.address,
-        })
-    except Client.DoesNotExist:
+    # 🔥 by primary key, and only the user's own clients (or all, for managers)
+    client = visible_clients(request.user).filter(id=client_id).first() if client_id.isdigit() else None
+    if client is None:
         return JsonResponse({"error": "Client not found"}, status=404)
+    return JsonResponse(client_row(client))
 
 #=================================
 # Products Section
@@ -169,14 +198,89 @@ def get_client_details(request):
 
 @login_required
 def product_list_view(request):
-    products = ProductNew.objects.filter(
-        Q(country=request.user.country) | Q(country="Global")
-    )
+    products = get_catalog(request.user.country).products
     return render(request, "quotes/product_list.html", {
         "products": products
     })
 
 
+@login_required
+def product_search(request):
+    # 🔍 Type-ahead for the quotation form; replaces the inlined catalog
+    products = catalog_for(request.user).search(request.GET.get("q", ""))
+    rows, page, has_more = search_page(products, request.GET)
+
+    next_url = None
+    if has_more:
+        params = request.GET.copy()
+        params["page"] = page + 1
+        next_url = f"{request.path}?{params.urlencode()}"
+
+    return JsonResponse({
+        "results": [product_row(p) for p in rows],
+        "page": page,
+        "next": next_url,
+    })
+
+
+@login_required
+def product_prices(request):
+    # 📅 List prices as of a date: ?ids=1,2,3&date=YYYY-MM-DD (default now)
+    try:
+        ids = [int(pk) for pk in request.GET.get("ids", "").split(",") if pk.strip()]
+        day = parse_date(request.GET.get("date") or "")
+    except ValueError:
+        return JsonResponse({"error": "ids must be numbers and date YYYY-MM-DD"}, status=400)
+    if not ids:
+        return JsonResponse({"error": "ids is required"}, status=400)
+
+    # Only products the user can quote
+    visible = catalog_for(request.user).by_id
+    ids = [pk for pk in ids if pk in visible]
+
+    prices = prices_as_of(ids, end_of_day(day) if day else None)
+    return JsonResponse({
+        "date": day.isoformat() if day else None,
+        "prices": {str(pk): str(price) if price is not None else None for pk, price in prices.items()},
+    })
+
+
+@login_required
+def search_view(request):
+    # 🔎 One box over clients, products and quotations: ?q=&kind=&page=&limit=
+    kinds = [k for k in request.GET.getlist("kind") if k in site_search.KINDS]
+    results = site_search.search(request.user, request.GET.get("q", ""), kinds)
+    rows, page, has_more = site_search.search_page(results, request.GET)
+
+    # Only the user's own drafts can be reopened from a result
+    drafts = set(Quotation.objects.filter(
+        pk__in=[r.object_id for r in rows if r.kind == "quotation"],
+        status="draft", salesperson=request.user,
+    ).values_list("pk", flat=True))
+
+    def url_for(row):
+        if row.kind == "client":
+            return reverse("view_client", args=[row.object_id])
+        if row.kind == "product":
+            return reverse("product_detail", args=[row.object_id])
+        return reverse("resume_draft", args=[row.object_id]) if row.object_id in drafts else None
+
+    next_url = None
+    if has_more:
+        params = request.GET.copy()
+        params["page"] = page + 1
+        next_url = f"{request.path}?{params.urlencode()}"
+
+    return JsonResponse({
+        "results": [
+            {"kind": r.kind, "id": r.object_id, "title": r.title, "rank": round(float(r.rank or 0), 4), "url": url_for(r)}
+            for r in rows
+        ],
+        "page": page,
+        "next": next_url,
+    })
+
+
 def product_detail(request, pk):
     product = get_object_or_404(ProductNew, pk=pk)
     return render(request, "quotes/product_detail.html", {
@@ -198,7 +302,7 @@ def create_quotation(request, id=None):
         draft = get_object_or_404(
             Quotation,
             id=id,
-            salesperson=request.user.username
+            salesperson=request.user
         )
 
         # 🔒 Lock edit if not draft
@@ -218,7 +322,7 @@ def create_quotation(request, id=None):
         closing_text = request.POST.get("closing_text", "").strip()
         product_ids = request.POST.getlist("product_id[]")
 
-        if not client_id:
+        if not client_id or not client_id.isdigit():
             messages.error(request, "Please select a client.")
             return redirect(request.path)
 
@@ -237,8 +341,35 @@ def create_quotation(request, id=None):
             messages.error(request, "Please add at least one product.")
             return redirect(request.path)
 
+        # 🔍 ONE QUERY FOR ALL LINES (instead of one per product row)
+        try:
+            product_ids = [int(pid) for pid in product_ids]
+        except ValueError:
+            messages.error(request, "Invalid product selected.")
+            return redirect(request.path)
+
+        # Served from the in-process catalog; see quotes/catalog.py. Every
+        # country's products, so foreign ones are reported as such below
+        product_map = get_catalog(ALL_PRODUCTS).by_id
+
+        missing = sorted({pid for pid in product_ids if pid not in product_map})
+        if missing:
+            messages.error(request, f"Product(s) not found: {', '.join(map(str, missing))}.")
+            return redirect(request.path)
+
+        # 🔒 Only admins may quote products outside their own country
+        if request.user.role != "admin":
+            allowed_countries = {request.user.country, "Global"}
+            foreign = sorted({
+                str(product_map[pid]) for pid in product_ids
+                if product_map[pid].country not in allowed_countries
+            })
+            if foreign:
+                messages.error(request, f"Product(s) not available in your country: {', '.join(foreign)}.")
+                return redirect(request.path)
+
         # ✅ SAFE TO CONTINUE
-        client = get_object_or_404(Client, id=client_id)
+        client = get_object_or_404(visible_clients(request.user), id=client_id)
 
         # Product fields
         descs = request.POST.getlist("desc")
@@ -257,12 +388,13 @@ def create_quotation(request, id=None):
         for pid, desc, pack, price, disc, qty, total in zip(
             product_ids, descs, pack_sizes, unit_prices, discounts, qtys, totals
         ):
-            product_obj = ProductNew.objects.get(id=pid)
+            product_obj = product_map[pid]
 
             line_total = float(total or 0)
             subtotal += line_total
 
             products.append({
+                "product_id": product_obj.id,
                 "name": product_obj.name,
                 "desc": desc,
                 "pack_size": pack,
@@ -278,7 +410,8 @@ def create_quotation(request, id=None):
         quotation = draft if draft else Quotation()
 
         quotation.client = client
-        quotation.salesperson = request.user.username
+        quotation.salesperson = request.user
+        quotation.salesperson_name = request.user.username
         quotation.products = products
         quotation.subtotal = subtotal
         quotation.vat = vat
@@ -287,10 +420,14 @@ def create_quotation(request, id=None):
         quotation.currency = "OMR"
         quotation.status = "draft"   # always draft here
         quotation.valid_until = date.today()
-        quotation.save()
+
+        # Lines mirror the JSON in an indexed table for product-level reports
+        with transaction.atomic():
+            quotation.save()
+            QuotationLine.replace_for(quotation, products)
 
         if action == "preview":
-            pdf = generate_quotation_pdf({
+            pdf_data = {
                 "date": date.today().strftime("%d-%m-%Y"),
                 "qtn_no": f"QTN-{quotation.id}",
                 "client_company": client.company_name,
@@ -301,12 +438,28 @@ def create_quotation(request, id=None):
                 "subtotal": subtotal,
                 "vat": vat,
                 "grand_total": grand_total,
-                "salesperson": quotation.salesperson,
+                "salesperson": quotation.salesperson_username,
                 "validity": validity,
                 "delivery":delivery,
                 "payment_terms": payment_terms,
                 
-            })
+            }
+
+            # ⚡ AJAX preview → render in the background, poll for the PDF
+            if request.headers.get("x-requested-with") == "XMLHttpRequest":
+                job = enqueue_render(
+                    pdf_data,
+                    letterhead_file_for_country(quotation.country),
+                    request.user,
+                    quotation,
+                )
+                return JsonResponse({
+                    "job_id": job.id,
+                    "status": job.status,
+                    "status_url": reverse("pdf_job_status", args=[job.id]),
+                }, status=202)
+
+            pdf = render_quotation_pdf(pdf_data, letterhead=letterhead_for_country(quotation.country))
             return HttpResponse(pdf, content_type="application/pdf")
 
         return redirect("draft_list")
@@ -314,16 +467,9 @@ def create_quotation(request, id=None):
     # =========================
     # GET
     # =========================
-    if request.user.role == "admin":
-        products = ProductNew.objects.all()
-    else:
-        products = ProductNew.objects.filter(
-            Q(country=request.user.country) | Q(country="Global")
-        )
-
+    # Neither products nor clients are rendered into the page; the form
+    # searches `product_search` and `client_search` as the user types
     return render(request, "quotes/create_quotation.html", {
-        "clients": Client.objects.all(),
-        "products": products,
         "draft": draft,
         "intro_texts": IntroText.objects.all(),
         "closing_texts": ClosingText.objects.all(),
@@ -331,6 +477,77 @@ def create_quotation(request, id=None):
 
 
 
+# ================================
+#      BACKGROUND PDF JOBS
+# ================================
+@login_required
+def pdf_job_status(request, job_id):
+    job = get_object_or_404(PdfRenderJob, id=job_id, requested_by=request.user)
+
+    data = {"job_id": job.id, "status": job.status}
+    if job.status == "done":
+        data["download_url"] = reverse("pdf_job_download", args=[job.id])
+    elif job.status == "failed":
+        data["error"] = job.error
+
+    return JsonResponse(data)
+
+
+@login_required
+def pdf_job_download(request, job_id):
+    job = get_object_or_404(PdfRenderJob, id=job_id, requested_by=request.user)
+    if job.status != "done":
+        raise Http404("PDF is not ready yet")
+
+    pdf = read_cached(job.cache_key)
+    if pdf is None:
+        # Evicted since it was rendered; the stored payload rebuilds it
+        pdf = render_quotation_pdf(job.payload, letterhead=resolve_letterhead(job.letterhead))
+
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = f'inline; filename="{job.payload.get("qtn_no", "quotation")}.pdf"'
+    return response
+
+
+# ================================
+#      BULK PDF EXPORT (ZIP)
+# ================================
+@login_required
+def export_quotations(request):
+    if request.user.role not in ('salesmanager', 'admin'):
+        return redirect('salesperson_dashboard')
+
+    status = request.GET.get("status", "approved")
+    month = request.GET.get("month")   # YYYY-MM
+
+    try:
+        quotations = export_queryset(
+            status=status,
+            month=month,
+            salesperson=request.GET.get("salesperson"),
+        )
+    except ValueError:
+        return HttpResponseBadRequest("month must look like YYYY-MM")
+
+    filename = "-".join(part for part in ("quotations", status, month) if part)
+
+    # 🚦 Keep render processes bounded: big selections go to the command,
+    # and a worker runs one web export at a time
+    if quotations.count() > WEB_EXPORT_LIMIT:
+        return HttpResponse(
+            f"More than {WEB_EXPORT_LIMIT} quotations; narrow the filters or run "
+            "`manage.py export_quotations`.", status=413, content_type="text/plain",
+        )
+    if not acquire_web_export():
+        return HttpResponse("Another export is running; try again shortly.", status=429,
+                            content_type="text/plain")
+
+    # Rendered in parallel and zipped on the fly; never held in memory whole
+    response = StreamingHttpResponse(web_export(quotations), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.zip"'
+    return response
+
+
 # ================================
 #           DRAFT QUOTATIONS
 # ================================
@@ -338,7 +555,7 @@ def create_quotation(request, id=None):
 def draft_list(request):
     drafts = Quotation.objects.filter(
         status="draft",
-        salesperson=request.user.username
+        salesperson=request.user
     ).order_by("-date_created")
 
     return render(request, "quotes/draft.html", {"drafts": drafts})
@@ -346,19 +563,17 @@ def draft_list(request):
 
 @login_required
 def draft_delete(request, id):
-    draft = get_object_or_404(Quotation, id=id, salesperson=request.user.username)
+    draft = get_object_or_404(Quotation, id=id, salesperson=request.user)
     draft.delete()
     return redirect("draft_list")
 
 
 @login_required
 def draft_resume(request, id):
-    draft = get_object_or_404(Quotation, id=id, salesperson=request.user.username)
+    draft = get_object_or_404(Quotation, id=id, salesperson=request.user)
 
     return render(request, "quotes/create_quotation.html", {
         "draft": draft,
-        "clients": Client.objects.filter(salesperson=request.user),
-        "products": ProductNew.objects.all(),
     })
 
 
@@ -376,31 +591,28 @@ from .models import Quotation
 def salesperson_dashboard(request):
     user = request.user
 
-    # Correct field from your model
-    qs = Quotation.objects.filter(salesperson=user)
-
-    total_quotations = qs.count()
-    sent_quotations = qs.filter(status='sent').count()
-    approved_quotations = qs.filter(status='approved').count()
-    draft_quotations = qs.filter(status='draft').count()
+    stats = salesperson_stats(user)   # cached per user, one aggregate + one trend query
+    sent_quotations = stats['sent']
+    approved_quotations = stats['approved']
 
     # Safe conversion calculation
     conversion_rate = round(
         (approved_quotations / sent_quotations) * 100, 1
     ) if sent_quotations > 0 else 0
 
-    # Temporary chart data (trial hosting safe)
-    monthly_data = [1, 2, 3, 4, 5, 3, 6, 7, 5, 6, 8, 9]
-    status_data = [approved_quotations, sent_quotations, draft_quotations]
+    status_data = [approved_quotations, sent_quotations, stats['draft']]
 
     context = {
-        'total_quotations': total_quotations,
+        'total_quotations': stats['total'],
         'sent_quotations': sent_quotations,
         'approved_quotations': approved_quotations,
         'conversion_rate': conversion_rate,
-        'monthly_data': monthly_data,
+        'monthly_labels': json.dumps(stats['monthly_labels']),
+        'monthly_data': stats['monthly_counts'],
+        'monthly_amounts': stats['monthly_amounts'],
         'status_data': status_data,
-        'recent_quotations': qs.order_by('-date_created')[:5],
+        'recent_quotations': Quotation.objects.filter(salesperson=user)
+                             .select_related('client').order_by('-date_created', '-id')[:5],
     }
 
     return render(request, "quotes/salesperson_dashboard.html", context)
@@ -421,35 +633,27 @@ from django.db.models import Count
 def salesmanager_dashboard(request):
     if request.user.role != 'salesmanager':
         return redirect('salesperson_dashboard')
-    # KPIs
-    total_quotations = Quotation.objects.count()
-    pending_approval = Quotation.objects.filter(status='sent').count()
-    approved_count = Quotation.objects.filter(status='approved').count()
+    # KPIs – precomputed counters, one query (see quotes/dashboard.py)
+    stats = dashboard_stats()
+    by_status = stats['quotations_by_status']
+
+    total_quotations = stats['quotations'].get('', 0)
+    pending_approval = by_status.get('sent', 0)
+    approved_count = by_status.get('approved', 0)
 
-    total_salespersons = User.objects.filter(role='salesperson').count()
+    total_salespersons = stats['users_by_role'].get('salesperson', 0)
 
     # Recent quotations
-    recent_quotations = Quotation.objects.select_related('client').order_by('-date_created')[:5]
+    recent_quotations = Quotation.objects.select_related('client', 'salesperson').order_by('-date_created')[:5]
 
     # 🔥 Salesperson vs Quotations (GRAPH DATA)
-    salesperson_data = (
-        Quotation.objects
-        .values('salesperson')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
+    salesperson_data = salesperson_breakdown(stats)
 
-    salesperson_labels = [item['salesperson'] for item in salesperson_data]
-    salesperson_totals = [item['total'] for item in salesperson_data]
+    salesperson_labels = [name for name, _ in salesperson_data]
+    salesperson_totals = [total for _, total in salesperson_data]
     # 🔥 Quotation Status Distribution (GRAPH DATA)
-    status_data = (
-    Quotation.objects
-    .values('status')
-    .annotate(total=Count('id'))
-    )
-
-    status_labels = [item['status'] for item in status_data if item['status']]
-    status_totals = [item['total'] for item in status_data]
+    status_labels = [value for value, _ in Quotation.STATUS_CHOICES if by_status.get(value)]
+    status_totals = [by_status[value] for value in status_labels]
 
     context = {
         'total_quotations': total_quotations,
@@ -474,57 +678,44 @@ from django.db.models import Count
 def admin_dashboard(request):
     today = date.today()
 
-    # ---------------- Country Salespersons ----------------
-    country_sales_raw = (
-        CustomUser.objects.filter(role="salesperson")
-        .values("country")
-        .annotate(total=Count("id"))
-    )
+    stats = dashboard_stats()   # precomputed counters, one query
 
+    # ---------------- Country Salespersons ----------------
     FLAG = {"Oman": "🇴🇲", "UAE": "🇦🇪", "India": "🇮🇳"}
     CURRENCY = {"Oman": "OMR", "UAE": "AED", "India": "INR"}
 
     country_sales = [
         {
-            "name": c["country"],
-            "flag": FLAG.get(c["country"], "🌍"),
-            "currency": CURRENCY.get(c["country"], "—"),
-            "count": c["total"],
+            "name": country or None,
+            "flag": FLAG.get(country, "🌍"),
+            "currency": CURRENCY.get(country, "—"),
+            "count": total,
         }
-        for c in country_sales_raw
+        for country, total in stats["salespersons_by_country"].items()
     ]
 
     # ---------------- Status Distribution (GRAPH 1) ----------------
-    status_data = (
-        Quotation.objects
-        .values("status")
-        .annotate(total=Count("id"))
-    )
+    by_status = stats["quotations_by_status"]
 
-    status_labels = [s["status"] for s in status_data]
-    status_totals = [s["total"] for s in status_data]
+    status_labels = [value for value, _ in Quotation.STATUS_CHOICES if by_status.get(value)]
+    status_totals = [by_status[value] for value in status_labels]
 
     # ---------------- Salesperson vs Quotations (GRAPH 2) ----------------
-    salesperson_data = (
-        Quotation.objects
-        .values("salesperson")
-        .annotate(total=Count("id"))
-        .order_by("-total")
-    )
+    salesperson_data = salesperson_breakdown(stats)
 
-    salesperson_labels = [s["salesperson"] for s in salesperson_data]
-    salesperson_totals = [s["total"] for s in salesperson_data]
+    salesperson_labels = [name for name, _ in salesperson_data]
+    salesperson_totals = [total for _, total in salesperson_data]
 
     # ---------------- RENDER ----------------
     return render(request, "quotes/admin_dashboard.html", {
         # Cards / KPIs
         "country_sales": country_sales,
-        "managers": CustomUser.objects.filter(role="salesmanager").count(),
-        "admins": CustomUser.objects.filter(role="admin").count(),
-        "total_clients": Client.objects.count(),
-        "total_products": ProductNew.objects.count(),
-        "total_quotations": Quotation.objects.count(),
-        "today_quotations": Quotation.objects.filter(date_created=today).count(),
+        "managers": stats["users_by_role"].get("salesmanager", 0),
+        "admins": stats["users_by_role"].get("admin", 0),
+        "total_clients": stats["clients"].get("", 0),
+        "total_products": stats["products"].get("", 0),
+        "total_quotations": stats["quotations"].get("", 0),
+        "today_quotations": stats["quotations_by_date"].get(today.isoformat(), 0),
         "recent_logins": LoginIP.objects.all().order_by("-timestamp")[:10],
 
         # ✅ GRAPH DATA (THIS WAS MISSING)
@@ -539,36 +730,65 @@ def admin_dashboard(request):
 # ================================
 #      MY QUOTATIONS / CLIENTS
 # ================================
+def _quotation_listing(request, quotations):
+    """
+    Filtered, keyset-paginated quotation listing shared by the salesperson,
+    manager and admin pages. ``?format=json`` returns the same page for
+    infinite scroll.
+    """
+    quotations, filters = filter_quotations(quotations.select_related('client', 'salesperson'), request.GET)
+    rows, next_cursor = keyset_page(quotations, request.GET.get("cursor"), page_size(request.GET))
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params["cursor"] = next_cursor
+        next_query = params.urlencode()
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "results": [quotation_row(q) for q in rows],
+            "next_cursor": next_cursor,
+            "next": f"{request.path}?{next_query}" if next_query else None,
+        })
+
+    # Only the chosen client is rendered; the filter searches `client_search`
+    selected_client = None
+    if filters.get("client"):
+        selected_client = visible_clients(request.user).only("id", "company_name").filter(
+            id=filters["client"]
+        ).first()
+
+    return render(request, "quotes/my_quotations.html", {
+        "quotations": rows,
+        "filters": filters,
+        "next_query": next_query,
+        "is_first_page": not request.GET.get("cursor"),
+        "status_choices": Quotation.STATUS_CHOICES,
+        "selected_client": selected_client,
+    })
+
+
 @login_required
 def my_quotations(request):
     user = request.user
 
-    # ADMIN → see all quotations
-    if user.role == 'admin':
-        quotations = Quotation.objects.all().order_by('-date_created')
-
-    # SALES MANAGER → see all quotations
-    elif user.role == 'salesmanager':
-        quotations = Quotation.objects.all().order_by('-date_created')
+    # ADMIN / SALES MANAGER → see all quotations
+    if user.role in ('admin', 'salesmanager'):
+        quotations = Quotation.objects.all()
 
     # SALESPERSON → only their quotations
     else:
-        quotations = Quotation.objects.filter(
-            salesperson=user.username
-        ).order_by('-date_created')
+        quotations = Quotation.objects.filter(salesperson=user)
 
-    return render(
-        request,
-        "quotes/my_quotations.html",
-        {"quotations": quotations}
-    )
+    return _quotation_listing(request, quotations)
 
 
 
 @login_required
 def my_clients(request):
     client_ids = Quotation.objects.filter(
-        salesperson=request.user.username
+        salesperson=request.user
     ).values_list("client_id", flat=True).distinct()
 
     clients = Client.objects.filter(id__in=client_ids)
@@ -579,56 +799,84 @@ def my_clients(request):
 # ================================
 #         AJAX CLIENT APIs
 # ================================
-from django.views.decorators.csrf import csrf_exempt
+def _run_client_batch(request, payload):
+    """Validate and apply a ClientBatch; ``(results, ok)`` or a 400 message."""
+    batch = ClientBatch(request.user, payload)
+    try:
+        ok = batch.validate()
+    except ValueError as exc:
+        return None, str(exc)
+    if ok:
+        batch.apply()
+    return batch.results(), None
+
+
+@login_required
+def client_batch(request):
+    # 📦 {"create": [...], "update": [...], "delete": [...]} in one request;
+    # all-or-nothing, with one result per item
+    if request.method != "POST":
+        return JsonResponse({"status": "invalid method"}, status=405)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"status": "invalid", "error": "Body must be JSON."}, status=400)
+
+    results, error = _run_client_batch(request, payload)
+    if error:
+        return JsonResponse({"status": "invalid", "error": error}, status=400)
+
+    ok = all(r["status"] != "error" for r in results)
+    return JsonResponse({"status": "success" if ok else "invalid", "results": results}, status=200 if ok else 400)
+
 
-@csrf_exempt
+def _single_client_op(request, op, item):
+    # The one-row endpoints are batches of one, so they get the same
+    # validation and ownership checks
+    results, error = _run_client_batch(request, {op: [item]})
+    if error or results[0]["status"] == "error":
+        status = 404 if results and "id" in results[0].get("errors", {}) else 400
+        return JsonResponse({"status": "invalid", "errors": results[0]["errors"] if results else error}, status=status)
+    return JsonResponse({"status": "success", "client": results[0].get("client")})
+
+
+@login_required
 def add_client_ajax(request):
     if request.method == "POST":
-        data = json.loads(request.body)
-
-        client = Client.objects.create(
-            company_name=data["company_name"],
-            contact_person=data["contact_person"],
-            email=data["email"],
-            phone=data["phone"],
-            address=data["address"],
-            salesperson=request.user
-        )
-
-        return JsonResponse({"status": "success"})
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"status": "invalid"}, status=400)
+        return _single_client_op(request, "create", data)
     return JsonResponse({"status": "invalid"}, status=400)
 
 
-@csrf_exempt
+@login_required
 def edit_client_ajax(request, id):
     if request.method == "POST":
-        data = json.loads(request.body)
-
-        client = Client.objects.get(id=id)
-        client.company_name = data["company_name"]
-        client.contact_person = data["contact_person"]
-        client.email = data["email"]
-        client.phone = data["phone"]
-        client.address = data["address"]
-        client.save()
-
-        return JsonResponse({"status": "success"})
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"status": "invalid"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"status": "invalid"}, status=400)
+        return _single_client_op(request, "update", {**data, "id": id})
     return JsonResponse({"status": "invalid"}, status=400)
 
 
-@csrf_exempt
+@login_required
 def delete_client_ajax(request, id):
     if request.method == "DELETE":
-        Client.objects.get(id=id).delete()
-        return JsonResponse({"status": "success"})
+        return _single_client_op(request, "delete", id)
     return JsonResponse({"status": "invalid method"}, status=400)
 
 
 from django.shortcuts import render
 from .models import ProductNew   # adjust if model name is different
 
+@login_required
 def product_list(request):
-    products = ProductNew.objects.all()
+    products = catalog_for(request.user).products
     return render(request, 'quotes/product_list.html', {
         'products': products
     })
@@ -643,7 +891,7 @@ def send_for_approval(request, pk):
     quotation = get_object_or_404(
         Quotation,
         pk=pk,
-        salesperson=request.user.username  # ✅ STRING MATCH
+        salesperson=request.user
     )
 
     if quotation.status == 'draft':
@@ -663,7 +911,7 @@ def send_for_approval(request, pk):
     quotation = get_object_or_404(
         Quotation,
         pk=pk,
-        salesperson=request.user.username  # ✅ STRING MATCH
+        salesperson=request.user
     )
 
     if quotation.status == 'draft':
@@ -730,13 +978,7 @@ def all_quotations_view(request):
     if request.user.role != 'salesmanager':
         return redirect('salesperson_dashboard')
 
-    quotations = Quotation.objects.all().order_by("-date_created")
-
-    return render(
-        request,
-        "quotes/my_quotations.html",   # ✅ SAME TEMPLATE
-        {"quotations": quotations}
-    )
+    return _quotation_listing(request, Quotation.objects.all())   # ✅ SAME TEMPLATE
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect
 from .models import Quotation
@@ -843,13 +1085,7 @@ def admin_quotations(request):
     if request.user.role != 'admin':
         return redirect('salesperson_dashboard')
 
-    quotations = Quotation.objects.select_related(
-        'client'
-    ).order_by('-date_created')
-
-    return render(request, 'quotes/my_quotations.html', {
-        'quotations': quotations
-    })
+    return _quotation_listing(request, Quotation.objects.all())
 
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required